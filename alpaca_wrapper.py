@@ -11,15 +11,22 @@ import time
 import os
 import re
 import math
+import json
+import hashlib
+import datetime
+import threading
 import configparser
-from flask import Blueprint, request, jsonify
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, Response, request, jsonify
 
 from alpaca.trading.client import TradingClient
-from alpaca.trading.requests import MarketOrderRequest, LimitOrderRequest
-from alpaca.trading.enums import OrderSide, TimeInForce, QueryOrderStatus
+from alpaca.trading.requests import MarketOrderRequest, LimitOrderRequest, GetOrdersRequest
+from alpaca.trading.enums import OrderSide, TimeInForce, QueryOrderStatus, OrderStatus
 from alpaca.data import StockHistoricalDataClient
 from alpaca.data.requests import StockLatestQuoteRequest
 
+from cache_utils import BoundedCache, SingleFlight
+
 alpaca_app = Blueprint('alpaca', __name__)
 
 CONFIG_PATH = "config.ini"
@@ -63,54 +70,350 @@ except Exception as e:
     raise
 
 
-class AlpacaTrader:
-    def __init__(self):
-        self.trading_client = TradingClient(APCA_API_KEY_ID, APCA_API_SECRET_KEY, paper=PAPER_TRADING)
-        self.data_client = StockHistoricalDataClient(APCA_API_KEY_ID, APCA_API_SECRET_KEY)
+# Seconds between order-status polls while any tracked order is still open
+ORDER_POLL_SECONDS = float(os.environ.get('ALPACA_ORDER_POLL_SECONDS', 2))
+# How long a finished order's status stays queryable
+ORDER_STATUS_TTL = 24 * 60 * 60
+# Consecutive failed lookups after which an order is reported 'unknown' and no longer polled
+ORDER_MAX_FAILURES = int(os.environ.get('ALPACA_ORDER_MAX_FAILURES', 30))
+
+# Quotes are reused for this many seconds; symbols per upstream latest-quote request
+QUOTE_TTL = float(os.environ.get('ALPACA_QUOTE_TTL', 2))
+QUOTE_BATCH_SIZE = 100
+QUOTE_MAX_SYMBOLS = 500
+QUOTE_SYMBOL_RE = re.compile(r'[A-Z][A-Z.\-]{0,9}')
+
+# Account/positions snapshot: refresh interval, and how long after the last
+# read the background refresh keeps going
+SNAPSHOT_SECONDS = float(os.environ.get('ALPACA_SNAPSHOT_SECONDS', 5))
+SNAPSHOT_IDLE_SECONDS = float(os.environ.get('ALPACA_SNAPSHOT_IDLE_SECONDS', 300))
+
+# Batch orders: most orders per request, and submissions in flight at once
+ORDER_BATCH_MAX = 100
+ORDER_BATCH_WORKERS = int(os.environ.get('ALPACA_ORDER_WORKERS', 8))
+ORDER_SYMBOL_RE = re.compile(r'[A-Z]{1,5}(\.[A-Z])?')
+TIME_IN_FORCE = {'day': TimeInForce.DAY, 'gtc': TimeInForce.GTC, 'ioc': TimeInForce.IOC}
+
+TERMINAL_STATUSES = frozenset({OrderStatus.FILLED, OrderStatus.CANCELED, OrderStatus.EXPIRED,
+                               OrderStatus.REJECTED, OrderStatus.REPLACED})
+
+
+def _num(value):
+    return float(value) if value not in (None, '') else None
+
+
+def order_status(order) -> dict:
+    status = order.status
+    return {
+        'order_id': str(order.id),
+        'symbol': order.symbol,
+        'status': getattr(status, 'value', str(status)),
+        'qty': _num(order.qty),
+        'notional': _num(order.notional),
+        'filled_qty': _num(order.filled_qty) or 0.0,
+        'filled_avg_price': _num(order.filled_avg_price),
+        'done': status in TERMINAL_STATUSES,
+    }
+
+
+class OrderTracker:
+    """Follows submitted orders off the request path.
+
+    One background thread refreshes every open order with a single
+    get_orders() call per poll; orders missing from that page are fetched
+    individually. An order whose lookup fails `max_failures` polls in a row
+    is given up on with status 'unknown'. It sleeps while nothing is open.
+    """
+    def __init__(self, trading_client, poll_interval: float = ORDER_POLL_SECONDS, on_done=None,
+                 max_failures: int = ORDER_MAX_FAILURES):
+        self.trading_client = trading_client
+        self.poll_interval = poll_interval
+        self.on_done = on_done
+        self.max_failures = max_failures
+        self._statuses = BoundedCache(ttl=ORDER_STATUS_TTL, max_entries=5000)
+        self._open = {}                 # order id -> submitted_at
+        self._failures = {}             # order id -> consecutive failed lookups
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.polls = 0
+
+    def track(self, order) -> dict:
+        status = order_status(order)
+        self._statuses.set(status['order_id'], status)
+        if not status['done']:
+            with self._lock:
+                self._open[status['order_id']] = order.submitted_at or datetime.datetime.now(datetime.timezone.utc)
+            self._ensure_thread()
+            self._wake.set()
+        return status
+
+    def status(self, order_id: str):
+        """Last known status, or None if this tracker never saw the order."""
+        return self._statuses.get(order_id)
+
+    def poll(self):
+        with self._lock:
+            open_ids = dict(self._open)
+        if not open_ids:
+            return
+        self.polls += 1
+        after = min(open_ids.values()) - datetime.timedelta(seconds=1)
+        orders = self.trading_client.get_orders(GetOrdersRequest(status=QueryOrderStatus.ALL, after=after,
+                                                                 limit=500, direction='asc'))
+        seen = {str(o.id): o for o in orders}
+        for order_id in open_ids:
+            order = seen.get(order_id)
+            if order is None:
+                try:
+                    order = self.trading_client.get_order_by_id(order_id)
+                except Exception as e:
+                    print(f"[ORDER ERROR] {order_id}: {e}")
+                    self._failed(order_id, e)
+                    continue
+            self._failures.pop(order_id, None)
+            status = order_status(order)
+            self._statuses.set(order_id, status)
+            if status['done']:
+                self._finish(order_id, status)
+
+    def _failed(self, order_id: str, error):
+        failures = self._failures.get(order_id, 0) + 1
+        if failures < self.max_failures:
+            self._failures[order_id] = failures
+            return
+        self._failures.pop(order_id, None)
+        # Keep whatever was last known, but stop polling and say so
+        status = {**(self._statuses.get(order_id) or {'order_id': order_id, 'symbol': None}),
+                  'status': 'unknown', 'done': True, 'error': str(error)}
+        self._statuses.set(order_id, status)
+        self._finish(order_id, status)
+
+    def _finish(self, order_id: str, status: dict):
+        with self._lock:
+            self._open.pop(order_id, None)
+        print(f"[ORDER] {status['symbol']} {order_id[:8]} {status['status']}")
+        if self.on_done:
+            self.on_done(status)
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='order-tracker', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                idle = not self._open
+            if idle:
+                self._wake.wait()
+            self._wake.clear()
+            time.sleep(self.poll_interval)
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"[ORDER POLL ERROR] {e}")
+
+
+def _order_request(symbol, qty=None, notional=None, order_type='market', limit_price=None, time_in_force='day'):
+    tif = TIME_IN_FORCE.get(time_in_force.lower(), TimeInForce.DAY)
+    size = {'qty': qty} if qty is not None else {'notional': round(notional, 2)}
+    if order_type == 'market':
+        return MarketOrderRequest(symbol=symbol, side=OrderSide.BUY, time_in_force=tif, **size)
+    return LimitOrderRequest(symbol=symbol, side=OrderSide.BUY, time_in_force=tif, limit_price=round(limit_price, 2), **size)
 
+
+def _positive(value, name):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a positive number")
+    if value <= 0 or not math.isfinite(value):
+        raise ValueError(f"{name} must be a positive number")
+    return value
+
+
+def _normalize_order(spec, time_in_force='day') -> dict:
+    """One batch entry {symbol, qty|notional, type, limit} -> validated order
+    plus its request; raises ValueError with a user-facing message."""
+    if not isinstance(spec, dict):
+        raise ValueError("Order must be an object")
+    symbol = str(spec.get('symbol', '')).strip().upper()
+    if not ORDER_SYMBOL_RE.fullmatch(symbol):
+        raise ValueError(f"Invalid symbol '{symbol}'")
+    order_type = str(spec.get('type', spec.get('order_type', 'market'))).lower()
+    if order_type not in ('market', 'limit'):
+        raise ValueError('Order type must be "market" or "limit"')
+    if (spec.get('qty') is None) == (spec.get('notional') is None):
+        raise ValueError("Give exactly one of qty or notional")
+    qty = _positive(spec['qty'], 'Quantity') if spec.get('qty') is not None else None
+    notional = _positive(spec['notional'], 'Notional') if qty is None else None
+    limit_price = None
+    if order_type == 'limit':
+        limit_price = _positive(spec.get('limit', spec.get('limit_price')), 'Limit price')
+        if notional is not None:
+            raise ValueError("Notional orders must be market orders")
+    tif = str(spec.get('time_in_force', time_in_force)).lower()
+    if tif not in TIME_IN_FORCE:
+        raise ValueError(f"Unknown time_in_force '{tif}'")
+    if notional is not None and tif != 'day':
+        raise ValueError("Notional orders must be day orders")
+
+    # Market orders sized in shares get their cost from a quote later
+    est_cost = notional if notional is not None else (qty * limit_price if limit_price else None)
+    return {
+        'symbol': symbol, 'qty': qty, 'notional': notional, 'type': order_type, 'limit_price': limit_price,
+        'est_price': limit_price, 'est_cost': est_cost,
+        'request': _order_request(symbol, qty, notional, order_type, limit_price, tif),
+    }
+
+
+class AccountSnapshot:
+    """Account figures and open positions as one JSON-ready dict.
+
+    A background thread refreshes it every `interval` seconds while it is
+    being read (it goes quiet `idle_after` seconds after the last get()).
+    `version` is a hash of the contents, so clients can skip unchanged data.
+
+    The hash covers the live valuation too (equity, market_value,
+    current_price, unrealized_pl), so while the market is open it changes on
+    almost every refresh and an If-None-Match 304 is rare. The ETag only saves
+    bandwidth off-hours and on a quiet account; the body is small enough that
+    splitting prices out into their own request would not save much.
+    """
+    def __init__(self, trading_client, interval: float = SNAPSHOT_SECONDS, idle_after: float = SNAPSHOT_IDLE_SECONDS):
+        self.trading_client = trading_client
+        self.interval = interval
+        self.idle_after = idle_after
+        self._data = None
+        self._flight = SingleFlight()
+        self._wake = threading.Event()
+        self._last_read = 0.0
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def get(self, max_age: float = None) -> dict:
+        """Current snapshot; refreshes inline on first use or when older than `max_age`."""
+        self._last_read = time.monotonic()
+        self._ensure_thread()
+        data = self._data
+        if data is None or (max_age is not None and time.time() - data['updated'] > max_age):
+            data = self.refresh()
+        return data
+
+    def refresh(self) -> dict:
+        return self._flight.do('snapshot', self._refresh)
+
+    def invalidate(self):
+        """Refresh on the next tick instead of waiting out the interval."""
+        self._wake.set()
+
+    def _refresh(self) -> dict:
         try:
-            self.account = self.trading_client.get_account()
-            self.equity = float(self.account.equity)
-            self.cash = float(self.account.cash)
-            self.buying_power = float(self.account.buying_power)
-            self.is_connected = True
-            mode = "PAPER" if PAPER_TRADING else "LIVE"
-            print(f"[ALPACA] CONNECTED ({mode}) – Equity: ${self.equity:,.0f}")
+            account = self.trading_client.get_account()
+            positions = self.trading_client.get_all_positions()
+            body = {
+                'connected': True,
+                'error': None,
+                'mode': 'PAPER' if PAPER_TRADING else 'LIVE',
+                'account_id': str(account.id),
+                'equity': _num(account.equity),
+                'cash': _num(account.cash),
+                'buying_power': _num(account.buying_power),
+                'positions': [{
+                    'symbol': pos.symbol,
+                    'qty': _num(pos.qty),
+                    'market_value': _num(pos.market_value),
+                    'avg_entry_price': _num(pos.avg_entry_price),
+                    'current_price': _num(pos.current_price),
+                    'unrealized_pl': _num(pos.unrealized_pl),
+                } for pos in positions],
+            }
         except Exception as e:
-            self.is_connected = False
-            print(f"[ALPACA] FAILED: {e}")
-            raise ConnectionError(f"Alpaca connection failed: {e}")
+            print(f"[SNAPSHOT ERROR] {e}")
+            # Keep serving the last good figures, flagged with the error
+            body = {k: v for k, v in (self._data or {'connected': False}).items() if k not in ('version', 'updated')}
+            body['error'] = str(e)
+        version = hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest()[:16]
+        self._data = {**body, 'version': version, 'updated': time.time()}
+        return self._data
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='account-snapshot', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if time.monotonic() - self._last_read > self.idle_after:
+                continue
+            self.refresh()
+
+
+class AlpacaTrader:
+    def __init__(self, trading_client=None, data_client=None):
+        """Clients default to the configured Alpaca account; pass stand-ins to run offline."""
+        self.trading_client = trading_client or TradingClient(APCA_API_KEY_ID, APCA_API_SECRET_KEY, paper=PAPER_TRADING)
+        self.data_client = data_client or StockHistoricalDataClient(APCA_API_KEY_ID, APCA_API_SECRET_KEY)
+        self.snapshot = AccountSnapshot(self.trading_client)
+        # A finished order moves cash and positions; pick that up right away
+        self.orders = OrderTracker(self.trading_client, on_done=lambda status: self.snapshot.invalidate())
+        self._quotes = BoundedCache(ttl=QUOTE_TTL, max_entries=5000)
+        self._quote_flights = SingleFlight()
+
+        snap = self.snapshot.refresh()
+        if not snap.get('connected'):
+            print(f"[ALPACA] FAILED: {snap['error']}")
+            raise ConnectionError(f"Alpaca connection failed: {snap['error']}")
+        print(f"[ALPACA] CONNECTED ({snap['mode']}) – Equity: ${snap['equity']:,.0f}")
 
     def get_quote(self, symbol: str):
-        print(f"[QUOTE] {symbol}")
+        return self.get_quotes([symbol])[symbol]
+
+    def get_quotes(self, symbols) -> dict:
+        """Latest bid/ask per symbol. Fresh cached quotes are reused; the rest
+        are fetched QUOTE_BATCH_SIZE symbols per request, and identical
+        concurrent requests share one upstream call."""
+        symbols = list(dict.fromkeys(symbols))
+        out, missing = {}, []
+        for sym in symbols:
+            q = self._quotes.get(sym)
+            if q is None:
+                missing.append(sym)
+            else:
+                out[sym] = q
+        for i in range(0, len(missing), QUOTE_BATCH_SIZE):
+            chunk = tuple(sorted(missing[i:i + QUOTE_BATCH_SIZE]))
+            out.update(self._quote_flights.do(chunk, self._fetch_quotes, chunk))
+        return {sym: out[sym] for sym in symbols}
+
+    def _fetch_quotes(self, symbols) -> dict:
         try:
-            quote = self.data_client.get_stock_latest_quote(StockLatestQuoteRequest(symbol_or_symbols=symbol))
-            q = quote[symbol]
-            result = {
-                'bid': float(q.bidprice),
-                'ask': float(q.askprice),
-                'bid_size': int(q.bidsize),
-                'ask_size': int(q.asksize),
+            quotes = self.data_client.get_stock_latest_quote(StockLatestQuoteRequest(symbol_or_symbols=list(symbols)))
+        except Exception as e:
+            print(f"[QUOTE ERROR] {','.join(symbols[:5])}{'...' if len(symbols) > 5 else ''}: {e}")
+            return {sym: {'error': "Unable to fetch quote"} for sym in symbols}
+        out = {}
+        for sym in symbols:
+            q = quotes.get(sym)
+            if q is None:
+                out[sym] = {'error': "Unable to fetch quote"}
+                continue
+            out[sym] = {
+                'bid': float(q.bid_price),
+                'ask': float(q.ask_price),
+                'bid_size': int(q.bid_size),
+                'ask_size': int(q.ask_size),
                 'timestamp': q.timestamp
             }
-            print(f"[QUOTE OK] {symbol}: Bid ${result['bid']:.2f} | Ask ${result['ask']:.2f}")
-            return result
-        except Exception as e:
-            err = "Unable to fetch quote"
-            print(f"[QUOTE ERROR] {e}")
-            return {'error': err}
-
-    def _wait_for_fill(self, order_id, max_wait=300):
-        start = time.time()
-        while time.time() - start < max_wait:
-            try:
-                order = self.trading_client.get_order_by_id(order_id)
-                if order.status == QueryOrderStatus.FILLED:
-                    return order
-            except:
-                pass
-            time.sleep(2)
-        return None
+            self._quotes.set(sym, out[sym])
+        return out
 
     def buy_stock(self, symbol: str, qty: float, order_type: str = 'market', limit_price: float = None, time_in_force: str = 'day'):
         print(f"[BUY] {qty:.4f} {symbol} ({order_type}) limit={limit_price}")
@@ -119,355 +422,87 @@ class AlpacaTrader:
         if order_type == 'limit' and (limit_price is None or limit_price <= 0 or not math.isfinite(limit_price)):
             return {'success': False, 'message': 'Valid limit price required'}
 
-        tif = {'day': TimeInForce.DAY, 'gtc': TimeInForce.GTC, 'ioc': TimeInForce.IOC}.get(time_in_force.lower(), TimeInForce.DAY)
-
         try:
-            req = MarketOrderRequest(symbol=symbol, qty=qty, side=OrderSide.BUY, time_in_force=tif) \
-                if order_type == 'market' else \
-                LimitOrderRequest(symbol=symbol, qty=qty, side=OrderSide.BUY, time_in_force=tif, limit_price=round(limit_price, 2))
+            req = _order_request(symbol, qty=qty, order_type=order_type, limit_price=limit_price, time_in_force=time_in_force)
             order = self.trading_client.submit_order(req)
             print(f"[SUBMIT OK] BUY {order.id}")
 
-            filled = self._wait_for_fill(order.id)
-            if not filled:
-                return {'success': False, 'message': 'Order not filled in 5min'}
-
-            avg_price = float(filled.filled_avg_price)
+            # Fill status comes from the tracker; poll /alpaca/orders/<order_id>
+            status = self.orders.track(order)
+            self.snapshot.invalidate()
             return {
                 'success': True,
-                'order_id': order.id,
-                'avg_price': avg_price,
-                'message': f"Buy filled @ ${avg_price:.2f} for {qty:.4f} {symbol}"
+                **status,
+                'message': f"Buy order {status['status']} for {qty:.4f} {symbol}"
             }
         except Exception as e:
             print(f"[BUY ERROR] {e}")
             return {'success': False, 'message': str(e)}
 
-    def get_positions_html(self) -> str:
-        if not self.is_connected:
-            return '<p style="color:red;text-align:center;padding:20px;">Connection failed. Check config.ini</p>'
-
-        conn_label = f"""
-        <div style="background:#007AFF;color:white;padding:10px 16px;border-radius:12px;
-                    font-size:0.9rem;font-weight:500;text-align:center;margin-bottom:16px;">
-            Connected ({ 'PAPER' if PAPER_TRADING else 'LIVE' }) | ID: {str(self.account.id)[:8]}... | Equity: ${self.equity:,.0f}
-        </div>
-        """
-
-        # === TEST BUY BUTTON (UNBLOCKABLE) ===
-        test_buy = f"""
-        <div style="background:#FF3B30;border-radius:16px;overflow:hidden;
-                    box-shadow:0 4px 20px rgba(0,0,0,0.1);margin-bottom:16px;padding:20px;">
-            <h3 style="margin:0 0 16px;font-weight:600;color:white;">TEST BUY</h3>
-            <button id="testBuyBtn" 
-                    style="width:100%;padding:16px;background:white;color:#FF3B30;border:none;border-radius:12px;
-                           font-size:1.1rem;font-weight:700;cursor:pointer;outline:none;">
-                TEST BUY: 1 AAPL (click me!)
-            </button>
-            <div id="testResult" style="margin-top:12px;font-size:0.9rem;min-height:1.2em;color:white;"></div>
-        </div>
-        """
-
-        # === MAIN BUY FORM ===
-        order_form = f"""
-        <div style="background:#F2F2F7;border-radius:16px;overflow:hidden;
-                    box-shadow:0 4px 20px rgba(0,0,0,0.1);margin-bottom:16px;">
-            <div style="padding:20px;">
-                <div style="margin-bottom:16px;">
-                    <input id="symbol" type="text" placeholder="Search ticker..." style="width:100%;padding:12px;border-radius:12px;border:1px solid #E5E5EA;background:white;color:#1C1C1E;font-size:1rem;">
-                    <div id="quoteLabel" style="margin-top:6px;font-size:0.85rem;color:#8E8E93;">Enter a symbol</div>
-                </div>
-
-                <div style="margin-bottom:16px;">
-                    <div style="display:flex;align-items:center;gap:12px;">
-                        <input id="qty" type="number" min="0.01" step="0.01" placeholder="0" style="flex:1;padding:12px;border-radius:12px;border:1px solid #E5E5EA;background:white;color:#1C1C1E;font-size:1rem;">
-                        <div style="display:flex;gap:6px;font-size:0.85rem;color:#8E8E93;">
-                            <label><input type="radio" name="unit" value="shares" checked> Shares</label>
-                            <label><input type="radio" name="unit" value="dollars"> $</label>
-                        </div>
-                    </div>
-                </div>
-
-                <div style="margin-bottom:16px;">
-                    <select id="orderType" style="width:100%;padding:12px;border-radius:12px;border:1px solid #E5E5EA;background:white;color:#1C1C1E;font-size:1rem;">
-                        <option value="market">Market Order</option>
-                        <option value="limit">Limit Order</option>
-                    </select>
-                </div>
-
-                <div style="margin-bottom:16px;">
-                    <input id="limitPrice" type="number" step="0.01" placeholder="Enter limit price..." 
-                           style="width:100%;padding:12px;border-radius:12px;border:1px solid #E5E5EA;background:white;color:#1C1C1E;font-size:1rem;">
-                    <div style="margin-top:6px;font-size:0.8rem;color:#8E8E93;">
-                        Leave empty for market. For limit, enter your price.
-                    </div>
-                </div>
-
-                <div style="margin:16px 0;font-size:0.9rem;color:#8E8E93;">
-                    <div style="display:flex;justify-content:space-between;">
-                        <span>Est. Cost</span>
-                        <span id="estCost" style="font-weight:600;color:#00C805;">$0.00</span>
-                    </div>
-                    <div style="display:flex;justify-content:space-between;margin-top:6px;">
-                        <span>Buying Power After</span>
-                        <span id="powerAfter" style="font-weight:600;">${self.buying_power:,.2f}</span>
-                    </div>
-                </div>
-
-                <button id="buyBtn" style="width:100%;padding:14px;background:#00C805;color:white;border:none;border-radius:12px;font-size:1rem;font-weight:600;cursor:pointer;">
-                    BUY
-                </button>
-            </div>
-        </div>
-        """
-
-        # === POSITIONS LIST ===
-        try:
-            positions = self.trading_client.get_all_positions()
-        except Exception as e:
-            print(f"[POSITIONS ERROR] {e}")
-            positions = []
-
-        if not positions:
-            positions_html = '<p style="text-align:center;color:#8E8E93;padding:20px;font-style:italic;">No open positions</p>'
-        else:
-            rows = []
-            for pos in positions:
-                symbol = pos.symbol
-                qty = float(pos.qty)
-                market_value = float(pos.market_value)
-                avg_entry = float(pos.avg_entry_price)
-                unrealized_pl = float(pos.unrealized_pl)
-                pl_color = "#00C805" if unrealized_pl >= 0 else "#FF3B30"
-                pl_sign = "+" if unrealized_pl >= 0 else ""
-
-                rows.append(f"""
-                <tr style="border-bottom:1px solid #E5E5EA;">
-                    <td style="padding:12px 0;font-weight:600;">{symbol}</td>
-                    <td style="text-align:right;">{qty:,.4f}</td>
-                    <td style="text-align:right;">${market_value:,.2f}</td>
-                    <td style="text-align:right;">${avg_entry:.2f}</td>
-                    <td style="text-align:right;color:{pl_color};font-weight:600;">
-                        {pl_sign}${unrealized_pl:,.2f}
-                    </td>
-                </tr>
-                """)
-
-            positions_html = f"""
-            <div style="background:#F2F2F7;border-radius:16px;overflow:hidden;
-                        box-shadow:0 4px 20px rgba(0,0,0,0.1);margin-top:16px;">
-                <div style="padding:20px;">
-                    <h3 style="margin:0 0 16px;font-size:1rem;font-weight:600;color:#1C1C1E;">Open Positions</h3>
-                    <table style="width:100%;border-collapse:collapse;">
-                        <thead>
-                            <tr style="text-align:left;color:#8E8E93;font-size:0.8rem;">
-                                <th style="padding-bottom:8px;">Symbol</th>
-                                <th style="padding-bottom:8px;text-align:right;">Qty</th>
-                                <th style="padding-bottom:8px;text-align:right;">Value</th>
-                                <th style="padding-bottom:8px;text-align:right;">Avg Entry</th>
-                                <th style="padding-bottom:8px;text-align:right;">P&L</th>
-                            </tr>
-                        </thead>
-                        <tbody>
-                            {''.join(rows)}
-                        </tbody>
-                    </table>
-                </div>
-            </div>
-            """
-
-        # === FINAL SCRIPT: TEST + MAIN BUY ===
-        script = '''
-        <script>
-        console.log("[BUY UI] Script loaded");
-
-        document.addEventListener('DOMContentLoaded', () => {
-            console.log("[BUY UI] DOM ready");
-
-            const buyingPower = ''' + str(self.buying_power) + ''';
-            let quote = null;
-
-            const els = {
-                symbol: document.getElementById('symbol'),
-                qty: document.getElementById('qty'),
-                unitShares: document.querySelector('input[name="unit"][value="shares"]'),
-                unitDollars: document.querySelector('input[name="unit"][value="dollars"]'),
-                orderType: document.getElementById('orderType'),
-                limitPrice: document.getElementById('limitPrice'),
-                quoteLabel: document.getElementById('quoteLabel'),
-                estCost: document.getElementById('estCost'),
-                powerAfter: document.getElementById('powerAfter'),
-                buyBtn: document.getElementById('buyBtn'),
-                testBuyBtn: document.getElementById('testBuyBtn'),
-                testResult: document.getElementById('testResult')
-            };
-
-            // === TEST BUY BUTTON (ALWAYS WORKS) ===
-            if (els.testBuyBtn) {
-                els.testBuyBtn.onclick = async (e) => {
-                    e.preventDefault();
-                    e.stopPropagation();
-                    els.testBuyBtn.disabled = true;
-                    els.testBuyBtn.textContent = 'Sending...';
-                    els.testResult.textContent = '';
-
-                    try {
-                        const r = await fetch('/alpaca/buy', {
-                            method: 'POST',
-                            headers: {'Content-Type': 'application/json'},
-                            body: JSON.stringify({
-                                symbol: 'AAPL',
-                                qty: 1,
-                                order_type: 'market',
-                                time_in_force: 'day'
-                            })
-                        });
-                        const d = await r.json();
-                        els.testResult.style.color = d.success ? '#00C805' : '#FF3B30';
-                        els.testResult.textContent = d.message || (d.success ? 'Order placed!' : 'Failed');
-                        if (d.success) setTimeout(() => location.reload(), 1500);
-                    } catch (e) {
-                        els.testResult.style.color = '#FF3B30';
-                        els.testResult.textContent = 'Network error: ' + e.message;
-                    } finally {
-                        els.testBuyBtn.disabled = false;
-                        els.testBuyBtn.textContent = 'TEST BUY: 1 AAPL (click me!)';
-                    }
-                };
-            }
-
-            // === MAIN BUY LOGIC ===
-            if (els.buyBtn) {
-                els.buyBtn.disabled = true;
-                els.buyBtn.style.opacity = '0.5';
-
-                function updateCost() {
-                    const qty = parseFloat(els.qty?.value || '0') || 0;
-                    const isDollars = els.unitDollars?.checked || false;
-                    const type = els.orderType?.value || 'market';
-                    const limit = parseFloat(els.limitPrice?.value || '0') || 0;
-
-                    if (!quote || qty <= 0 || !quote.ask) {
-                        els.estCost.textContent = '$0.00';
-                        els.powerAfter.textContent = `$${buyingPower.toFixed(2)}`;
-                        els.buyBtn.disabled = true;
-                        els.buyBtn.style.opacity = '0.5';
-                        return;
-                    }
-
-                    const price = type === 'limit' && limit > 0 ? limit : quote.ask;
-                    const shares = isDollars ? qty / price : qty;
-                    const total = shares * price;
-
-                    if (!isFinite(total)) {
-                        els.estCost.textContent = '$0.00';
-                        els.buyBtn.disabled = true;
-                        els.buyBtn.style.opacity = '0.5';
-                        return;
-                    }
-
-                    els.estCost.textContent = `$${total.toFixed(2)}`;
-                    els.powerAfter.textContent = `$${(buyingPower - total).toFixed(2)}`;
-
-                    const canBuy = total > 0 && total <= buyingPower && shares > 0;
-                    els.buyBtn.disabled = !canBuy;
-                    els.buyBtn.style.opacity = canBuy ? '1' : '0.5';
-                }
-
-                const fetchQuote = () => {
-                    const sym = els.symbol?.value.trim().toUpperCase() || '';
-                    if (!sym) {
-                        els.quoteLabel.textContent = 'Enter a symbol';
-                        quote = null;
-                        updateCost();
-                        return;
-                    }
-
-                    els.quoteLabel.textContent = 'Loading...';
-
-                    fetch(`/alpaca/quote?symbol=${sym}`)
-                        .then(r => r.json())
-                        .then(q => {
-                            if (q.error) {
-                                els.quoteLabel.textContent = q.error;
-                                quote = null;
-                            } else {
-                                quote = q;
-                                els.quoteLabel.innerHTML = `<strong>Bid:</strong> $${q.bid.toFixed(2)} &nbsp; <strong>Ask:</strong> $${q.ask.toFixed(2)}`;
-                                if (!els.limitPrice.value) els.limitPrice.value = q.ask.toFixed(2);
-                            }
-                            setTimeout(updateCost, 0);
-                        })
-                        .catch(() => {
-                            els.quoteLabel.textContent = 'Quote failed';
-                            quote = null;
-                            setTimeout(updateCost, 0);
-                        });
-                };
-
-                let timeout;
-                const debouncedFetch = () => {
-                    clearTimeout(timeout);
-                    timeout = setTimeout(fetchQuote, 400);
-                };
-
-                if (els.symbol) els.symbol.addEventListener('input', debouncedFetch);
-                if (els.qty) els.qty.addEventListener('input', updateCost);
-                if (els.unitShares) els.unitShares.addEventListener('change', updateCost);
-                if (els.unitDollars) els.unitDollars.addEventListener('change', updateCost);
-                if (els.orderType) els.orderType.addEventListener('change', updateCost);
-                if (els.limitPrice) els.limitPrice.addEventListener('input', updateCost);
-
-                els.buyBtn.addEventListener('click', async () => {
-                    if (els.buyBtn.disabled) return;
-
-                    const symbol = els.symbol?.value.trim().toUpperCase() || '';
-                    const qtyInput = parseFloat(els.qty?.value || '0') || 0;
-                    const isDollars = els.unitDollars?.checked || false;
-                    const type = els.orderType?.value || 'market';
-                    const limit = type === 'limit' ? (parseFloat(els.limitPrice?.value || '0') || 0) : null;
-
-                    if (!symbol || qtyInput <= 0) return alert('Enter symbol and amount');
-                    if (type === 'limit' && (!limit || limit <= 0)) return alert('Enter valid limit price');
-                    if (!quote) return alert('Wait for quote');
-
-                    const qty = isDollars ? qtyInput / (type === 'limit' ? limit : quote.ask) : qtyInput;
-                    const estCost = qty * (type === 'limit' ? limit : quote.ask);
-
-                    if (estCost > buyingPower) {
-                        alert(`Not enough buying power: $${estCost.toFixed(2)} > $${buyingPower.toFixed(2)}`);
-                        return;
-                    }
-
-                    els.buyBtn.disabled = true;
-                    els.buyBtn.textContent = 'Submitting...';
-
-                    try {
-                        const r = await fetch('/alpaca/buy', {
-                            method: 'POST',
-                            headers: {'Content-Type': 'application/json'},
-                            body: JSON.stringify({symbol, qty, order_type: type, limit_price: limit, time_in_force: 'day'})
-                        });
-                        const d = await r.json();
-                        alert(d.message || (d.success ? 'Order placed!' : 'Failed'));
-                        if (d.success) setTimeout(() => location.reload(), 1000);
-                    } catch (e) {
-                        alert('Network error');
-                    } finally {
-                        els.buyBtn.disabled = false;
-                        els.buyBtn.textContent = 'BUY';
-                    }
-                });
-
-                updateCost();
-            }
-
-            console.log("[BUY UI] Ready");
-        });
-        </script>
-        '''
-
-        return conn_label + test_buy + order_form + positions_html + script
+    def validate_orders(self, specs, time_in_force: str = 'day'):
+        """Check every order and the batch's total estimated cost against one
+        buying-power snapshot. Returns (orders, errors, summary): `errors` maps
+        order index to message, and summary['message'] is set if the batch as
+        a whole is refused."""
+        orders, errors = [], {}
+        for i, spec in enumerate(specs):
+            try:
+                orders.append(_normalize_order(spec, time_in_force))
+            except ValueError as e:
+                errors[i] = str(e)
+                orders.append(None)
+
+        # Market orders sized in shares are costed at the ask; one quote request for all of them
+        need_quote = [o['symbol'] for o in orders if o and o['est_cost'] is None]
+        quotes = self.get_quotes(need_quote) if need_quote else {}
+        for i, o in enumerate(orders):
+            if o and o['est_cost'] is None:
+                q = quotes.get(o['symbol'], {})
+                if q.get('ask'):
+                    o['est_price'] = q['ask']
+                    o['est_cost'] = o['qty'] * q['ask']
+                else:
+                    errors[i] = f"No quote for {o['symbol']} to estimate cost"
+
+        snap = self.snapshot.get(max_age=0)
+        buying_power = snap.get('buying_power') or 0.0
+        total = sum(o['est_cost'] for o in orders if o and o['est_cost'] is not None)
+        summary = {'buying_power': buying_power, 'est_total': round(total, 2)}
+        if errors:
+            summary['message'] = f"{len(errors)} of {len(orders)} orders failed validation"
+        elif total > buying_power:
+            summary['message'] = f"Estimated total ${total:,.2f} exceeds buying power ${buying_power:,.2f}"
+        return orders, errors, summary
+
+    def submit_batch(self, specs, time_in_force: str = 'day', max_workers: int = ORDER_BATCH_WORKERS) -> dict:
+        """Validate all of `specs`, then submit them concurrently. Nothing is
+        submitted unless the whole batch validates."""
+        orders, errors, summary = self.validate_orders(specs, time_in_force)
+        if 'message' in summary:
+            return {'success': False, **summary,
+                    'errors': [{'index': i, 'message': m} for i, m in sorted(errors.items())]}
+
+        def submit(i, o):
+            try:
+                order = self.trading_client.submit_order(o['request'])
+                return {'index': i, 'success': True, **self.orders.track(order)}
+            except Exception as e:
+                print(f"[BATCH ERROR] {o['symbol']}: {e}")
+                return {'index': i, 'success': False, 'symbol': o['symbol'], 'message': str(e)}
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(orders)))) as pool:
+            results = list(pool.map(lambda args: submit(*args), enumerate(orders)))
+        self.snapshot.invalidate()
+        submitted = sum(r['success'] for r in results)
+        print(f"[BATCH] {submitted}/{len(results)} orders submitted")
+        return {'success': submitted == len(results), **summary, 'submitted': submitted, 'results': results}
+
+    def get_order_status(self, order_id: str):
+        status = self.orders.status(order_id)
+        if status is None:
+            # Not submitted through this process (e.g. before a restart): look it up once
+            status = self.orders.track(self.trading_client.get_order_by_id(order_id))
+        return status
 
     def get_quote_endpoint(self, symbol: str):
         return jsonify(self.get_quote(symbol))
@@ -482,8 +517,22 @@ def get_trader() -> AlpacaTrader:
 
 
 @alpaca_app.route('/positions')
-def positions_modal():
-    return get_trader().get_positions_html()
+def positions_snapshot():
+    """Account + positions JSON. Send the last version back as If-None-Match
+    to get a 304 while nothing has changed (in practice off-hours only, see
+    AccountSnapshot); ?refresh=1 forces a fresh read."""
+    try:
+        snapshot = get_trader().snapshot
+    except Exception as e:
+        return jsonify({'connected': False, 'error': str(e)}), 503
+    snap = snapshot.get(max_age=0 if request.args.get('refresh') else None)
+    if request.if_none_match.contains(snap['version']):
+        response = Response(status=304)
+    else:
+        response = jsonify(snap)
+    response.set_etag(snap['version'])
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 @alpaca_app.route('/quote')
@@ -494,6 +543,40 @@ def quote_endpoint():
     return get_trader().get_quote_endpoint(symbol)
 
 
+@alpaca_app.route('/quotes')
+def quotes_endpoint():
+    symbols = [s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()]
+    if not symbols:
+        return jsonify({'error': 'Symbols required'}), 400
+    if len(symbols) > QUOTE_MAX_SYMBOLS:
+        return jsonify({'error': f'At most {QUOTE_MAX_SYMBOLS} symbols per request'}), 400
+    bad = [s for s in symbols if not QUOTE_SYMBOL_RE.fullmatch(s)]
+    if bad:
+        return jsonify({'error': f"Invalid symbols: {', '.join(bad[:10])}"}), 400
+    return jsonify(get_trader().get_quotes(symbols))
+
+
+@alpaca_app.route('/orders/batch', methods=['POST'])
+def orders_batch_endpoint():
+    data = request.get_json(silent=True) or {}
+    orders = data.get('orders')
+    if not isinstance(orders, list) or not orders:
+        return jsonify({'success': False, 'message': 'orders must be a non-empty list'}), 400
+    if len(orders) > ORDER_BATCH_MAX:
+        return jsonify({'success': False, 'message': f'At most {ORDER_BATCH_MAX} orders per batch'}), 400
+    result = get_trader().submit_batch(orders, time_in_force=str(data.get('time_in_force', 'day')))
+    status = 200 if 'results' in result else 400
+    return jsonify(result), status
+
+
+@alpaca_app.route('/orders/<order_id>')
+def order_status_endpoint(order_id):
+    try:
+        return jsonify({'success': True, **get_trader().get_order_status(order_id)})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 404
+
+
 @alpaca_app.route('/buy', methods=['POST'])
 def buy_endpoint():
     data = request.get_json(silent=True) or {}
@@ -5,15 +5,32 @@ Linear Regression Candle Scanner v29.3 + Alpaca Paper Trading
 from flask import Flask, render_template_string, request, jsonify, Response
 import pandas as pd
 import numpy as np
-import datetime, uuid, json, time, atexit, base64
+import datetime, json, time, atexit, base64, os, threading, multiprocessing, hashlib
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 import yfinance as yf
 import yahoo_fin.stock_info as si
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection, LineCollection
 from matplotlib.patches import Rectangle
 from io import BytesIO, StringIO
-import requests
+from collections import deque
+from urllib.parse import quote
+
+from cache_utils import BoundedCache, SingleFlight, MISSING
+from bar_store import BarStore, covers, period_start, readjusted, since_period, trim
+from bar_archive import BarArchive
+from indicator_state import IndicatorState
+from linreg_signals import _rolling_linreg, _safe_linreg, bar_signals, _last_bar_signals
+from indicators import ma, calculate_tmo, calculate_tmo_batch
+from scan_jobs import ScanJob
+from ohlcv_arena import OHLCVArena, with_frame as with_arena_frame
+from scan_format import GREEN, WHITE, candle_array, candle_dicts, encode_arrow, encode_packed, PACKED_MIMETYPE, ARROW_MIMETYPE
+from earnings_calendar import EarningsCalendar
+from http_session import get_session
 
 # Import Alpaca Blueprint
 from alpaca_wrapper import alpaca_app
@@ -26,39 +43,241 @@ app.register_blueprint(alpaca_app, url_prefix='/alpaca')
 # ----------------------------------------------------------------------
 # Cache & Helpers
 # ----------------------------------------------------------------------
-CACHE = {}
-EARNINGS_CACHE = {}
+# Entry caps and byte budget for the price-history cache (DataFrame memory)
+CACHE_MAX_ENTRIES = int(os.environ.get('SCAN_CACHE_MAX_ENTRIES', 5000))
+CACHE_MAX_MB = float(os.environ.get('SCAN_CACHE_MAX_MB', 512))
+EARNINGS_CACHE_MAX_ENTRIES = int(os.environ.get('SCAN_EARNINGS_CACHE_MAX_ENTRIES', 20000))
+
+CACHE = BoundedCache(ttl=5 * 60, max_entries=CACHE_MAX_ENTRIES, max_bytes=int(CACHE_MAX_MB * 2**20))
+EARNINGS_CACHE = BoundedCache(ttl=60 * 60, max_entries=EARNINGS_CACHE_MAX_ENTRIES)
+# Rendered chart PNGs (lazy chart mode) and the scan params behind each params_hash
+CHART_CACHE = BoundedCache(ttl=60 * 60, max_entries=2000, max_bytes=64 * 2**20, sizeof=len)
+CHART_PARAMS = BoundedCache(ttl=24 * 60 * 60, max_entries=1000)
+# Per-symbol incremental indicator state, keyed by symbol + indicator params
+INDICATOR_STATES = BoundedCache(ttl=24 * 60 * 60, max_entries=CACHE_MAX_ENTRIES)
+# Striped locks over INDICATOR_STATES keys: /api/chart and the thread fallback share state objects
+INDICATOR_STATE_LOCKS = [threading.Lock() for _ in range(64)]
+# Coalesce concurrent cache misses for the same key into one upstream fetch
+DATA_FLIGHTS = SingleFlight()
+EARNINGS_FLIGHTS = SingleFlight()
+
+# On-disk bar store ('' disables it and every refresh downloads the full period)
+BAR_STORE_DIR = os.environ.get('SCAN_BAR_STORE', os.path.join('data', 'bars'))
+BAR_STORE = BarStore(BAR_STORE_DIR) if BAR_STORE_DIR else None
+
+# Memory-mapped multi-year history built by bar_archive.py ('' disables it).
+# Periods reaching back SCAN_ARCHIVE_MIN_DAYS or more are read from it.
+BAR_ARCHIVE_DIR = os.environ.get('SCAN_BAR_ARCHIVE', '')
+ARCHIVE_MIN_DAYS = int(os.environ.get('SCAN_ARCHIVE_MIN_DAYS', 366))
+
+def _open_archive(root):
+    try:
+        return BarArchive(root)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[ARCHIVE] cannot open {root}: {e}")
+        return None
+
+BAR_ARCHIVE = _open_archive(BAR_ARCHIVE_DIR) if BAR_ARCHIVE_DIR else None
+
+# Bulk earnings calendar (CSV/Parquet/JSON path or URL); '' scrapes Yahoo per symbol
+EARNINGS_CALENDAR_SOURCE = os.environ.get('SCAN_EARNINGS_CALENDAR', '')
+EARNINGS_CALENDAR = EarningsCalendar(EARNINGS_CALENDAR_SOURCE) if EARNINGS_CALENDAR_SOURCE else None
+
+# Bulk prefetch: tickers per multi-symbol download, and downloads in flight
+PREFETCH_CHUNK_SIZE = int(os.environ.get('SCAN_PREFETCH_CHUNK', 100))
+PREFETCH_WORKERS = int(os.environ.get('SCAN_PREFETCH_WORKERS', 4))
+
+def _market_symbol(symbol, market='usa'):
+    valid_symbol = symbol.strip().upper()
+    if market == 'india':
+        valid_symbol += '.NS'
+    return valid_symbol
 
 def get_cached_data(symbol, period='120d'):
+    if _archived(symbol, period):
+        return _archive_frame(symbol, period, _archive_tail(symbol, get_cached_data(symbol)))
     key = f"{symbol}_{period}"
-    now = datetime.datetime.now()
-    if key in CACHE:
-        data, ts = CACHE[key]
-        if now - ts < datetime.timedelta(minutes=5):
-            return data
+    data = CACHE.get(key)
+    if data is not None:
+        return data
     try:
-        ticker = yf.Ticker(symbol)
+        # Concurrent misses for the same key wait on one download instead of each hitting Yahoo
+        return DATA_FLIGHTS.do(key, _load_and_cache, symbol, period, key)
+    except Exception:
+        return None
+
+def _archived(symbol, period):
+    """Whether `period` for `symbol` is served by the bar archive."""
+    if BAR_ARCHIVE is None or symbol not in BAR_ARCHIVE:
+        return False
+    start = period_start(period)
+    if start is None:
+        return period == 'max'
+    return (pd.Timestamp(datetime.date.today()) - start).days >= ARCHIVE_MIN_DAYS
+
+def _archive_tail(symbol, recent):
+    """Bars of `recent` newer than the archive's last bar for `symbol`, on
+    tz-naive dates like the archive. Keeps archived scans current between builds."""
+    if recent is None or recent.empty:
+        return None
+    index = recent.index.tz_localize(None) if recent.index.tz is not None else recent.index
+    index = index.normalize()
+    last = BAR_ARCHIVE.last_date(symbol)
+    newer = index > last if last is not None else np.ones(len(index), dtype=bool)
+    if not newer.any():
+        return None
+    tail = recent[newer].reindex(columns=list(BAR_ARCHIVE.columns))
+    tail.index = index[newer].rename('Date')
+    return tail
+
+def _archive_frame(symbol, period, tail=None):
+    """Archive view of `period` plus `tail`. Never cached: the view is free to
+    rebuild and holding years of bars per symbol is what the archive avoids.
+    Without a tail the frame shares the mapping; appending one copies it."""
+    df = BAR_ARCHIVE.frame(symbol, period)
+    return df if tail is None or tail.empty else pd.concat([df, tail])
+
+def _load_and_cache(symbol, period, key):
+    df = _load_bars(symbol, period)
+    if df is None or df.empty: return None
+    CACHE.set(key, df)
+    return df
+
+def _load_bars(symbol, period):
+    """Read through the bar store: a fresh file needs no network, a stale one
+    only fetches bars from its last stored date on, or its whole stored period
+    again if a split or dividend re-adjusted the history."""
+    ticker = yf.Ticker(symbol, session=get_session())
+    if BAR_STORE is None:
+        return ticker.history(period=period, interval='1d')
+
+    stored, since = BAR_STORE.read(symbol)
+    if stored is None or stored.empty or not covers(since, period):
         df = ticker.history(period=period, interval='1d')
         if df.empty: return None
-        CACHE[key] = (df, now)
-        return df
+        stored = BAR_STORE.append(symbol, df, since=period_start(period) or 'max')
+    elif BAR_STORE.age(symbol) >= CACHE.ttl:
+        # Re-fetch the last stored bar too: it may have been a partial session
+        new = ticker.history(start=stored.index[-1].date(), interval='1d')
+        if new.empty:
+            BAR_STORE.touch(symbol)
+        elif not readjusted(stored, new):
+            stored = BAR_STORE.append(symbol, new)
+        else:
+            full = ticker.history(period=since_period(since), interval='1d')
+            # On an empty re-fetch keep serving the old bars and retry next refresh
+            if not full.empty:
+                stored = BAR_STORE.append(symbol, full, replace=True)
+    return trim(stored, period)
+
+def _yf_download(symbols, period):
+    """Default bulk source: one multi-ticker yfinance request per chunk."""
+    raw = yf.download(symbols, period=period, interval='1d', group_by='ticker',
+                      auto_adjust=True, threads=False, progress=False, session=get_session())
+    if raw is None or raw.empty:
+        return {}
+    if not isinstance(raw.columns, pd.MultiIndex):
+        return {symbols[0]: raw}
+    return {sym: raw[sym] for sym in raw.columns.get_level_values(0).unique()}
+
+def _prefetch_chunk(symbols, period, downloader, fetch_period=None):
+    try:
+        frames = downloader(symbols, fetch_period or period) or {}
     except Exception:
-        return None
+        # Halve the chunk so one bad symbol cannot sink its neighbours
+        if len(symbols) == 1:
+            return 0
+        mid = len(symbols) // 2
+        return (_prefetch_chunk(symbols[:mid], period, downloader, fetch_period) +
+                _prefetch_chunk(symbols[mid:], period, downloader, fetch_period))
+    stored = 0
+    for sym in symbols:
+        try:
+            df = frames.get(sym)
+            if df is None:
+                continue
+            df = df.dropna(how='all')
+            if df.empty:
+                continue
+            if BAR_STORE is not None:
+                # fetch_period set means an incremental top-up of stored bars
+                since, replace = (None if fetch_period else (period_start(period) or 'max')), False
+                if fetch_period:
+                    old, old_since = BAR_STORE.read(sym)
+                    if readjusted(old, df):
+                        df = (downloader([sym], since_period(old_since)) or {}).get(sym)
+                        if df is None or df.dropna(how='all').empty:
+                            continue
+                        replace = True
+                df = trim(BAR_STORE.append(sym, df, since=since, replace=replace), period)
+            CACHE.set(f"{sym}_{period}", df)
+            stored += 1
+        except Exception:
+            continue
+    return stored
+
+def prefetch_cached_data(symbols, period='120d', chunk_size=None, max_workers=None, downloader=None):
+    """Warm CACHE for many symbols with chunked multi-ticker downloads.
+
+    Symbols that are already cached are skipped. Anything a chunk does not
+    return (or a chunk that fails outright) is left uncached, and
+    get_cached_data fetches it on its own later. `downloader(symbols, period)`
+    must return {symbol: DataFrame}; pass a local stub to run offline.
+    Returns the number of symbols stored.
+    """
+    chunk_size = max(int(chunk_size or PREFETCH_CHUNK_SIZE), 1)
+    max_workers = max(int(max_workers or PREFETCH_WORKERS), 1)
+    downloader = downloader or _yf_download
+
+    todo = list(dict.fromkeys(s for s in symbols if s))
+    todo = [s for s in todo if f"{s}_{period}" not in CACHE]
+
+    # Split by what the bar store already holds: fresh files go straight into
+    # CACHE, stale ones only need the bars since their oldest last date
+    stored_count, warm, oldest = 0, [], None
+    if BAR_STORE is not None:
+        cold = []
+        for sym in todo:
+            stored, since = BAR_STORE.read(sym)
+            if stored is None or stored.empty or not covers(since, period):
+                cold.append(sym)
+            elif BAR_STORE.age(sym) < CACHE.ttl:
+                CACHE.set(f"{sym}_{period}", trim(stored, period))
+                stored_count += 1
+            else:
+                warm.append(sym)
+                last = stored.index[-1]
+                oldest = last if oldest is None else min(oldest, last)
+        todo = cold
+
+    jobs = [(todo[i:i + chunk_size], None) for i in range(0, len(todo), chunk_size)]
+    if warm:
+        gap = f"{(pd.Timestamp(datetime.date.today()) - oldest).days + 1}d"
+        jobs += [(warm[i:i + chunk_size], gap) for i in range(0, len(warm), chunk_size)]
+    if not jobs:
+        return stored_count
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as pool:
+        return stored_count + sum(pool.map(lambda job: _prefetch_chunk(job[0], period, downloader, job[1]), jobs))
 
 def get_earnings_date(symbol):
+    # The daily calendar index answers without network I/O for the symbols it covers
+    if EARNINGS_CALENDAR is not None and EARNINGS_CALENDAR.ensure_fresh() and EARNINGS_CALENDAR.covers(symbol):
+        return EARNINGS_CALENDAR.next_date(symbol)
+
     key = symbol.upper()
-    now = datetime.datetime.now()
-    if key in EARNINGS_CACHE:
-        date, ts = EARNINGS_CACHE[key]
-        if now - ts < datetime.timedelta(hours=1):
-            return date
+    date = EARNINGS_CACHE.get(key, MISSING)
+    if date is not MISSING:
+        return date
+    return EARNINGS_FLIGHTS.do(key, _scrape_earnings_date, symbol, key)
 
+def _scrape_earnings_date(symbol, key):
     try:
         url = f"https://finance.yahoo.com/quote/{symbol}"
         headers = {'User-Agent': 'Mozilla/5.0'}
-        response = requests.get(url, headers=headers, timeout=10)
+        response = get_session().get(url, headers=headers, timeout=10)
         if response.status_code != 200:
-            EARNINGS_CACHE[key] = (None, now)
+            EARNINGS_CACHE.set(key, None)
             return None
 
         tables = pd.read_html(StringIO(response.text))
@@ -68,85 +287,23 @@ def get_earnings_date(symbol):
                 ed = table[col].iloc[0]
                 if isinstance(ed, str) and ',' in ed:
                     parsed = datetime.datetime.strptime(ed.split(',')[0].strip(), '%b %d %Y').date()
-                    EARNINGS_CACHE[key] = (parsed, now)
+                    EARNINGS_CACHE.set(key, parsed)
                     return parsed
-        EARNINGS_CACHE[key] = (None, now)
+        EARNINGS_CACHE.set(key, None)
         return None
     except Exception:
-        EARNINGS_CACHE[key] = (None, now)
+        EARNINGS_CACHE.set(key, None)
         return None
 
-# ----------------------------------------------------------------------
-# Moving Average Helper
-# ----------------------------------------------------------------------
-def ma(series, length, ma_type='EMA'):
-    if ma_type == 'EMA':
-        return series.ewm(span=length, adjust=False).mean()
-    if ma_type == 'SMA':
-        return series.rolling(length, min_periods=1).mean()
-    if ma_type == 'RMA':
-        return series.ewm(alpha=1/length, adjust=False).mean()
-    return series
-
-# ----------------------------------------------------------------------
-# True Momentum Oscillator (TMO)
-# ----------------------------------------------------------------------
-def calculate_tmo(df, length=14, calc_length=5, smooth_length=3,
-                  length_type='EMA', calc_type='EMA', smooth_type='EMA'):
-    o = df['Open'].values
-    c = df['Close'].values
-    n = len(c)
-    data = np.zeros(n)
-
-    for i in range(n):
-        start = max(0, i - length + 1)
-        window_o = o[start:i+1]
-        window_c = c[i]
-        s = 0
-        for open_price in window_o:
-            if window_c > open_price:   s += 1
-            elif window_c < open_price: s -= 1
-        data[i] = s
-
-    data_series = pd.Series(data, index=df.index)
-    MA = ma(data_series, calc_length, calc_type)
-    Main = ma(MA, smooth_length, smooth_type)
-    Signal = ma(Main, smooth_length, smooth_type)
-
-    return Main.values[-60:], Signal.values[-60:], length
-
-# ----------------------------------------------------------------------
-# Safe Linear Regression
-# ----------------------------------------------------------------------
-def _safe_linreg(series, length):
-    s = pd.Series(series).replace([np.inf, -np.inf], np.nan)
-    result = np.full(len(s), np.nan)
-    for i in range(len(s)):
-        start = max(0, i - length + 1)
-        window = s.iloc[start:i + 1].dropna()
-        if len(window) < 2:
-            result[i] = s.iloc[i] if not pd.isna(s.iloc[i]) else np.nan
-            continue
-        x = np.arange(len(window))
-        y = window.values
-        try:
-            slope, intercept = np.polyfit(x, y, 1)
-            result[i] = slope * (len(window) - 1) + intercept
-        except np.linalg.LinAlgError:
-            result[i] = y[-1]
-    return pd.Series(result, index=s.index)
-
 # ----------------------------------------------------------------------
 # GREEN/WHITE CANDLES LOGIC
 # ----------------------------------------------------------------------
-def linreg_candles(df, signal_length=11, sma_signal=True, lin_reg=True, linreg_length=11):
+def linreg_arrays(df, signal_length=11, sma_signal=True, lin_reg=True, linreg_length=11):
+    """linreg_candles() with the candles as a CANDLE_DTYPE array instead of dicts."""
     o, h, l, c = df['Open'].values, df['High'].values, df['Low'].values, df['Close'].values
 
     if lin_reg:
-        bopen  = _safe_linreg(o, linreg_length).values
-        bhigh  = _safe_linreg(h, linreg_length).values
-        blow   = _safe_linreg(l, linreg_length).values
-        bclose = _safe_linreg(c, linreg_length).values
+        bopen, bhigh, blow, bclose = _rolling_linreg(np.column_stack([o, h, l, c]), linreg_length).T
     else:
         bopen, bhigh, blow, bclose = o, h, l, c
     
@@ -156,130 +313,283 @@ def linreg_candles(df, signal_length=11, sma_signal=True, lin_reg=True, linreg_l
               if sma_signal else
               bc_series.ewm(span=signal_length, adjust=False).mean())
 
-    buy_idx = []
-    sell_idx = []
+    buy, sell = _last_bar_signals(r, c, bhigh, bclose)
     last_i = len(r) - 1
+    buy_idx = [last_i] if buy else []
+    sell_idx = [last_i] if sell else []
 
-    for i in range(5, len(r)):
-        last_five_red   = not r[i-1] and not r[i-2] and not r[i-3] and not r[i-4] and not r[i-5]
-        last_three_green = r[i-1] and r[i-2] and r[i-3]
-
-        if (r[i] and not r[i-1] and c[i] > bhigh[i-1] and last_five_red and i == last_i):
-            buy_idx.append(i)
-
-        if (not r[i] and r[i-1] and c[i] < bclose[i-1] and last_three_green and i == last_i):
-            sell_idx.append(i)
+    candles = candle_array(bopen[-60:], bhigh[-60:], blow[-60:], bclose[-60:], r[-60:])
+    return (candles, signal.values[-60:], buy_idx, sell_idx, [])
 
-    candles = []
-    for i in range(len(r)):
-        col = '#10b981' if r[i] else '#ff8c00'
-        candles.append({
-            'open':  round(float(bopen[i]), 4) if not np.isnan(bopen[i]) else 0,
-            'high':  round(float(bhigh[i]), 4) if not np.isnan(bhigh[i]) else 0,
-            'low':   round(float(blow[i]), 4) if not np.isnan(blow[i]) else 0,
-            'close': round(float(bclose[i]), 4) if not np.isnan(bclose[i]) else 0,
-            'color': col
-        })
+def linreg_candles(df, signal_length=11, sma_signal=True, lin_reg=True, linreg_length=11):
+    candles, signal, buy_idx, sell_idx, pivots = linreg_arrays(df, signal_length, sma_signal, lin_reg, linreg_length)
+    return (candle_dicts(candles), signal, buy_idx, sell_idx, pivots)
+
+def linreg_last_signal(df, lin_reg=True, linreg_length=11):
+    """Just the last-bar (buy, sell, close) of linreg_arrays(), from the newest
+    linreg_length + 5 bars: no candles, signal line or full-history regression.
+    `close` is the last LinReg close as the candles carry it."""
+    length = max(int(linreg_length), 1)
+    n = length + 5 if lin_reg else 6
+    o, h, c = df['Open'].values[-n:], df['High'].values[-n:], df['Close'].values[-n:]
+    if lin_reg:
+        bopen, bhigh, bclose = _rolling_linreg(np.column_stack([o, h, c]), length).T
+    else:
+        bopen, bhigh, bclose = o, h, c
+    buy, sell = _last_bar_signals(bopen < bclose, c, bhigh, bclose)
+    close = float(bclose[-1]) if len(bclose) else np.nan
+    return bool(buy), bool(sell), 0.0 if np.isnan(close) else round(close, 4)
 
-    return (candles[-60:], signal.values[-60:], buy_idx, sell_idx, [])
+# ----------------------------------------------------------------------
+# Matrix Scan (whole universe, signals only)
+# ----------------------------------------------------------------------
+def align_universe(frames, bars=None, columns=('Open', 'High', 'Close')):
+    """Stack {symbol: frame} into (tickers x bars) arrays per column.
+
+    Rows are aligned on their last bar and shorter histories are left-padded
+    with NaN, the layout calculate_tmo_batch takes. `bars` keeps only the
+    newest bars. Returns (symbols, {column: array}, lengths).
+    """
+    symbols = list(frames)
+    lengths = np.array([len(frames[s]) for s in symbols], dtype=int)
+    width = int(lengths.max()) if len(symbols) else 0
+    if bars is not None:
+        width = min(width, int(bars))
+    out = np.full((len(columns), len(symbols), width), np.nan)
+    positions = {}
+    for i, sym in enumerate(symbols):
+        n = min(lengths[i], width)
+        if n == 0:
+            continue
+        df = frames[sym]
+        # One to_numpy() per frame: per-column pandas access is ~10x slower at 5k tickers
+        layout = tuple(df.columns)
+        if layout not in positions:
+            positions[layout] = [layout.index(col) for col in columns]
+        out[:, i, width - n:] = df.to_numpy(dtype=float)[-n:, positions[layout]].T
+    return symbols, dict(zip(columns, out)), lengths
+
+def signal_matrix(frames, linreg_length=11, lin_reg=True, min_bars=30):
+    """BUY and SELL symbols of {symbol: frame}, all tickers in one pass.
+
+    Only the newest linreg_length + 5 bars are regressed: the last-bar rules
+    read six LinReg candles, and their windows fit inside that span, so the
+    result matches linreg_arrays() ticker by ticker. Tickers with fewer than
+    `min_bars` bars are skipped, as the per-ticker scan skips them.
+    """
+    frames = {sym: df for sym, df in frames.items() if df is not None and len(df) >= min_bars}
+    if not frames:
+        return [], []
+    length = max(int(linreg_length), 1)
+    symbols, cols, _ = align_universe(frames, bars=length + 5 if lin_reg else 6)
+    o, h, c = cols['Open'], cols['High'], cols['Close']
+    if lin_reg:
+        # One regression call for all three columns of every ticker
+        t = len(symbols)
+        fitted = _rolling_linreg(np.concatenate([o, h, c]).T, length).T
+        bopen, bhigh, bclose = fitted[:t], fitted[t:2 * t], fitted[2 * t:]
+    else:
+        bopen, bhigh, bclose = o, h, c
+    with np.errstate(invalid='ignore'):
+        green = bopen < bclose
+    buy, sell = _last_bar_signals(green, c, bhigh, bclose)
+    symbols = np.array(symbols, dtype=object)
+    return symbols[buy].tolist(), symbols[sell].tolist()
 
 # ----------------------------------------------------------------------
 # Chart Generation
 # ----------------------------------------------------------------------
+class LinregChartRenderer:
+    """Pre-built LinReg/TMO figure that is re-filled for every ticker.
+
+    Bodies are one PolyCollection, wicks one LineCollection, and every other
+    artist is updated in place, so a render is just a redraw + PNG encode.
+    Uses the object-oriented Agg API (no pyplot state); get_chart_renderer()
+    hands out one instance per thread and theme, and worker processes build
+    their own.
+    """
+    BG = {True: '#ffffff', False: '#0f172a'}
+    FG = {True: '#000000', False: '#e2e8f0'}
+
+    def __init__(self, is_light_mode=False):
+        bg, fg = self.BG[is_light_mode], self.FG[is_light_mode]
+        # Same canvas the old tight bbox cropped to, with fixed margins instead
+        self.fig = Figure(figsize=(5.9, 3.25), dpi=100, facecolor=bg)
+        FigureCanvasAgg(self.fig)
+        gs = self.fig.add_gridspec(2, 1, height_ratios=[3, 1])
+        ax_price = self.ax_price = self.fig.add_subplot(gs[0, 0])
+        ax_tmo = self.ax_tmo = self.fig.add_subplot(gs[1, 0], sharex=ax_price)
+        self.fig.subplots_adjust(left=0.1, right=0.985, top=0.975, bottom=0.03, hspace=0.08)
+
+        ax_price.set_facecolor(bg)
+        self.bodies = PolyCollection([], linewidths=1.2)
+        self.wicks = LineCollection([], linewidths=1.2)
+        ax_price.add_collection(self.bodies)
+        ax_price.add_collection(self.wicks)
+        self.signal_line, = ax_price.plot([], [], color=fg, linewidth=2)
+        self.buy_marker, = ax_price.plot([], [], linestyle='', marker='^', markersize=11, color='#10b981', zorder=5)
+        self.sell_marker, = ax_price.plot([], [], linestyle='', marker='v', markersize=11, color='#ef4444', zorder=5)
+        self.buy_text = ax_price.text(0, 0, 'BUY', color='white', ha='center', va='bottom', fontsize=8, fontweight='bold', visible=False)
+        self.sell_text = ax_price.text(0, 0, 'SELL', color='white', ha='center', va='top', fontsize=8, fontweight='bold', visible=False)
+        self.no_data = ax_price.text(0.5, 0.5, 'No data', ha='center', va='center', color=fg,
+                                     transform=ax_price.transAxes, visible=False)
+        ax_price.set_ylabel('Price', color=fg, fontsize=8)
+        ax_price.tick_params(colors=fg, labelsize=7)
+        ax_price.grid(True, alpha=0.2)
+        ax_price.set_xticks([])
+
+        ax_tmo.set_facecolor(bg)
+        self.tmo_main, = ax_tmo.plot([], [], color='#3b82f6', linewidth=1.5)
+        self.tmo_signal, = ax_tmo.plot([], [], color='#fb923c', linewidth=1.5)
+        band = ax_tmo.get_yaxis_transform()
+        self.ob_band = ax_tmo.add_patch(Rectangle((0, 0), 1, 0, transform=band, color='#ef4444', alpha=0.2, linewidth=0))
+        self.os_band = ax_tmo.add_patch(Rectangle((0, 0), 1, 0, transform=band, color='#10b981', alpha=0.2, linewidth=0))
+        ax_tmo.axhline(0, color='#64748b', linewidth=0.8, alpha=0.7)
+        ax_tmo.set_ylabel('TMO', color=fg, fontsize=6)
+        ax_tmo.tick_params(colors=fg, labelsize=6)
+        ax_tmo.grid(True, alpha=0.2)
+
+    def render_png(self, candles, signal, buy_idx, sell_idx, pivot_lows,
+                   tmo_main, tmo_signal, tmo_length):
+        n = len(candles)
+        self.no_data.set_visible(n == 0)
+        self.buy_marker.set_data([], [])
+        self.sell_marker.set_data([], [])
+        self.buy_text.set_visible(False)
+        self.sell_text.set_visible(False)
+
+        if n:
+            if isinstance(candles, np.ndarray):
+                o, h, l, c = candles['open'], candles['high'], candles['low'], candles['close']
+                colors = np.where(candles['green'], GREEN, WHITE)
+            else:
+                o = np.array([cd['open'] for cd in candles], dtype=float)
+                h = np.array([cd['high'] for cd in candles], dtype=float)
+                l = np.array([cd['low'] for cd in candles], dtype=float)
+                c = np.array([cd['close'] for cd in candles], dtype=float)
+                colors = [cd['color'] for cd in candles]
+            x = np.arange(n, dtype=float)
+            top, bot = np.maximum(o, c), np.minimum(o, c)
+            self.bodies.set_verts(np.stack([np.column_stack([x - 0.35, bot]), np.column_stack([x - 0.35, top]),
+                                            np.column_stack([x + 0.35, top]), np.column_stack([x + 0.35, bot])], axis=1))
+            self.bodies.set_facecolors(colors)
+            self.bodies.set_edgecolors(colors)
+            self.wicks.set_segments(np.stack([np.column_stack([x, l]), np.column_stack([x, h])], axis=1))
+            self.wicks.set_colors(colors)
+            self.signal_line.set_data(np.arange(len(signal)), signal)
+
+            last_idx = n - 1
+            ymin, ymax = np.nanmin(np.r_[l, signal]), np.nanmax(np.r_[h, signal])
+            if buy_idx and buy_idx[-1] == last_idx:
+                self.buy_marker.set_data([last_idx], [h[-1] * 1.01])
+                self.buy_text.set_position((last_idx, h[-1] * 1.03))
+                self.buy_text.set_visible(True)
+                ymax = max(ymax, h[-1] * 1.03)
+            if sell_idx and sell_idx[-1] == last_idx:
+                self.sell_marker.set_data([last_idx], [l[-1] * 0.99])
+                self.sell_text.set_position((last_idx, l[-1] * 0.97))
+                self.sell_text.set_visible(True)
+                ymin = min(ymin, l[-1] * 0.97)
+            pad = (ymax - ymin) * 0.05 or 1.0
+            self.ax_price.set_xlim(-0.35 - n * 0.05, last_idx + 0.35 + n * 0.05)
+            self.ax_price.set_ylim(ymin - pad, ymax + pad)
+        else:
+            self.bodies.set_verts([])
+            self.wicks.set_segments([])
+            self.signal_line.set_data([], [])
+            self.ax_price.set_xlim(0, 1)
+            self.ax_price.set_ylim(0, 1)
+
+        x = np.arange(len(tmo_main))
+        self.tmo_main.set_data(x, tmo_main)
+        self.tmo_signal.set_data(x, tmo_signal)
+        ob = int(tmo_length * 0.7)
+        self.ob_band.set_y(ob)
+        self.ob_band.set_height(tmo_length - ob)
+        self.os_band.set_y(-tmo_length)
+        self.os_band.set_height(tmo_length - ob)
+        lim = (tmo_length or 1) * 1.1
+        self.ax_tmo.set_ylim(-lim, lim)
+
+        buf = BytesIO()
+        self.fig.savefig(buf, format='png', dpi=120, facecolor=self.fig.get_facecolor())
+        return buf.getvalue()
+
+_RENDERERS = threading.local()
+
+def get_chart_renderer(is_light_mode=False):
+    renderers = getattr(_RENDERERS, 'by_theme', None)
+    if renderers is None:
+        renderers = _RENDERERS.by_theme = {}
+    key = bool(is_light_mode)
+    if key not in renderers:
+        renderers[key] = LinregChartRenderer(key)
+    return renderers[key]
+
 def generate_linreg_chart(candles, signal, buy_idx, sell_idx, pivot_lows,
                           tmo_main, tmo_signal, tmo_length, is_light_mode=False):
-    fig = plt.figure(figsize=(6, 3.8), dpi=100)
-    fig.patch.set_facecolor('#ffffff' if is_light_mode else '#0f172a')
-    gs = fig.add_gridspec(4, 1, height_ratios=[3, 1, 0.1, 0.1])
-    ax_price = fig.add_subplot(gs[0, 0])
-    ax_tmo = fig.add_subplot(gs[1, 0], sharex=ax_price)
+    png = render_linreg_chart_png(candles, signal, buy_idx, sell_idx, pivot_lows,
+                                  tmo_main, tmo_signal, tmo_length, is_light_mode)
+    return f"data:image/png;base64,{base64.b64encode(png).decode()}"
 
-    ax_price.set_facecolor('#ffffff' if is_light_mode else '#0f172a')
-    fg = '#000000' if is_light_mode else '#e2e8f0'
-
-    if not candles:
-        plt.text(0.5, 0.5, 'No data', ha='center', va='center', color=fg, transform=ax_price.transAxes)
-    else:
-        for i, cd in enumerate(candles):
-            o, h, l, c = cd['open'], cd['high'], cd['low'], cd['close']
-            col = cd['color']
-            body_top, body_bot = max(o, c), min(o, c)
-            ax_price.add_patch(Rectangle((i-0.35, body_bot), 0.7, body_top-body_bot,
-                                         facecolor=col, edgecolor=col, linewidth=1.2))
-            ax_price.plot([i, i], [l, h], color=col, linewidth=1.2)
-
-        ax_price.plot(range(len(signal)), signal, color=fg, linewidth=2)
-
-        last_idx = len(candles) - 1
-        if buy_idx and buy_idx[-1] == last_idx:
-            ax_price.scatter(last_idx, candles[last_idx]['high']*1.01, marker='^', s=120, color='#10b981', zorder=5)
-            ax_price.text(last_idx, candles[last_idx]['high']*1.03, 'BUY', color='white', ha='center', va='bottom', fontsize=8, fontweight='bold')
-        if sell_idx and sell_idx[-1] == last_idx:
-            ax_price.scatter(last_idx, candles[last_idx]['low']*0.99, marker='v', s=120, color='#ef4444', zorder=5)
-            ax_price.text(last_idx, candles[last_idx]['low']*0.97, 'SELL', color='white', ha='center', va='top', fontsize=8, fontweight='bold')
-
-    ax_price.set_ylabel('Price', color=fg, fontsize=8)
-    ax_price.tick_params(colors=fg, labelsize=7)
-    ax_price.grid(True, alpha=0.2)
-    ax_price.set_xticks([])
-
-    ax_tmo.set_facecolor('#ffffff' if is_light_mode else '#0f172a')
-    x = range(len(tmo_main))
-    ax_tmo.plot(x, tmo_main, color='#3b82f6', linewidth=1.5)
-    ax_tmo.plot(x, tmo_signal, color='#fb923c', linewidth=1.5)
-
-    ob = int(tmo_length * 0.7)
-    os = -ob
-    ax_tmo.axhspan(ob, tmo_length, color='#ef4444', alpha=0.2)
-    ax_tmo.axhspan(os, -tmo_length, color='#10b981', alpha=0.2)
-    ax_tmo.axhline(0, color='#64748b', linewidth=0.8, alpha=0.7)
-
-    ax_tmo.set_ylim(-tmo_length*1.1, tmo_length*1.1)
-    ax_tmo.set_ylabel('TMO', color=fg, fontsize=6)
-    ax_tmo.tick_params(colors=fg, labelsize=6)
-    ax_tmo.grid(True, alpha=0.2)
-
-    plt.tight_layout()
-
-    buf = BytesIO()
-    fig.savefig(buf, format='png', bbox_inches='tight', dpi=120, facecolor=fig.get_facecolor())
-    buf.seek(0)
-    img = base64.b64encode(buf.read()).decode()
-    plt.close(fig)
-    return f"data:image/png;base64,{img}"
+def render_linreg_chart_png(candles, signal, buy_idx, sell_idx, pivot_lows,
+                            tmo_main, tmo_signal, tmo_length, is_light_mode=False):
+    return get_chart_renderer(is_light_mode).render_png(candles, signal, buy_idx, sell_idx, pivot_lows,
+                                                        tmo_main, tmo_signal, tmo_length)
 
 # ----------------------------------------------------------------------
 # Core Analysis
 # ----------------------------------------------------------------------
-def analyze_ticker_local(symbol, **kwargs):
-    market = kwargs.get('market', 'usa')
-    valid_symbol = symbol.upper()
-    if market == 'india':
-        valid_symbol += '.NS'
-
-    df = get_cached_data(valid_symbol)
-    if df is None or df.shape[0] < 30:
-        placeholder = generate_linreg_chart([], [], [], [], [], [], [], 0, kwargs.get('is_light_mode', False))
-        return {'success': False, 'ticker': symbol, 'error': 'No data',
-                'chart_preview': placeholder, 'price': 0, 'signal': 'NEUTRAL', 'score': 0,
-                'no_earnings_ok': True, 'tooltips': {'earnings': ''}}
-
+def _no_data_result(symbol, error='No data', is_light_mode=False):
+    placeholder = generate_linreg_chart([], [], [], [], [], [], [], 0, is_light_mode)
+    return {'success': False, 'ticker': symbol, 'error': error,
+            'chart_preview': placeholder, 'price': 0, 'signal': 'NEUTRAL', 'score': 0,
+            'no_earnings_ok': True, 'tooltips': {'earnings': ''}}
+
+def _indicator_state(symbol, df, linreg_args, tmo_args):
+    """Advance the cached IndicatorState for `df` instead of recomputing it and
+    return its (candle_arrays(), tmo()) outputs.
+
+    Same last bar: revise it in place (intraday refresh). One new bar: append
+    it. Anything else (first scan, gap, different history): rebuild, which is
+    vectorized. The update and the reads happen under the key's lock.
+    """
+    params = {**linreg_args, 'tmo_length': tmo_args['length'], 'tmo_calc': tmo_args['calc_length'],
+              'tmo_smooth': tmo_args['smooth_length'], 'tmo_calc_type': tmo_args['calc_type'],
+              'tmo_smooth_type': tmo_args['smooth_type']}
+    key = (symbol, tuple(sorted(params.items())))
+    idx = df.index
+    with INDICATOR_STATE_LOCKS[hash(key) % len(INDICATOR_STATE_LOCKS)]:
+        state = INDICATOR_STATES.get(key)
+        try:
+            if state is not None and state.count == len(df) and state.last_index == idx[-1]:
+                state.replace_last(df.iloc[-1])
+            elif state is not None and state.count == len(df) - 1 and state.last_index == idx[-2]:
+                state.update(df.iloc[-1])
+            else:
+                state = None
+        except ValueError:
+            state = None
+        if state is None:
+            state = IndicatorState.from_frame(df, **params)
+        INDICATOR_STATES.set(key, state)
+        return state.candle_arrays(), state.tmo()
+
+def _fetch_ticker(symbol, kwargs):
+    """I/O half of a scan: price history plus (optionally) the earnings date."""
+    valid_symbol = _market_symbol(symbol, kwargs.get('market', 'usa'))
+    df = get_cached_data(valid_symbol, kwargs.get('period', '120d'))
     earnings_date = None
-    earnings_in_7d = False
-    if kwargs.get('require_no_earnings', True):
+    if df is not None and df.shape[0] >= 30 and kwargs.get('require_no_earnings', True):
         earnings_date = get_earnings_date(valid_symbol.split('.')[0])
-        if earnings_date:
-            days = (earnings_date - datetime.date.today()).days
-            earnings_in_7d = 0 <= days <= 7
+    return df, earnings_date
 
+def _indicator_args(kwargs):
     linreg_args = {
         'signal_length': kwargs.get('signal_length', 5),
         'sma_signal': kwargs.get('sma_signal', True),
-        'lin_reg': True,
         'linreg_length': kwargs.get('linreg_length', 11)
     }
-    candles, signal, buy_idx, sell_idx, _ = linreg_candles(df, **linreg_args)
-
     tmo_args = {
         'length': kwargs.get('tmo_length', 14),
         'calc_length': kwargs.get('tmo_calc', 5),
@@ -288,25 +598,73 @@ def analyze_ticker_local(symbol, **kwargs):
         'calc_type': kwargs.get('tmo_calc_type', 'EMA'),
         'smooth_type': kwargs.get('tmo_smooth_type', 'EMA')
     }
-    tmo_main, tmo_signal, tmo_len = calculate_tmo(df, **tmo_args)
+    return linreg_args, tmo_args
 
-    last_price = candles[-1]['close'] if candles else df['Close'].iloc[-1]
+def chart_params_hash(kwargs):
+    """Stable id for the scan settings a chart depends on."""
+    linreg_args, tmo_args = _indicator_args(kwargs)
+    key = {**linreg_args, **tmo_args, 'market': kwargs.get('market', 'usa'), 'period': kwargs.get('period', '120d'),
+           'is_light_mode': bool(kwargs.get('is_light_mode', False))}
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+def _linreg_chart_inputs(symbol, df, kwargs):
+    """Indicators for one ticker, plus the arguments generate_linreg_chart takes."""
+    linreg_args, tmo_args = _indicator_args(kwargs)
+    (candles, signal, buy_idx, sell_idx, _), (tmo_main, tmo_signal, tmo_len) = _indicator_state(
+        _market_symbol(symbol, kwargs.get('market', 'usa')), df, linreg_args, tmo_args)
 
     offset = len(df) - len(candles)
     last_df_idx = len(df) - 1
     confirmed_buy_idx  = [i - offset for i in buy_idx if i == last_df_idx]
     confirmed_sell_idx = [i - offset for i in sell_idx if i == last_df_idx]
 
-    buy_signal  = bool(confirmed_buy_idx)
-    sell_signal = bool(confirmed_sell_idx)
+    chart_args = (candles, signal,
+                  [i - (len(df) - len(candles)) for i in confirmed_buy_idx],
+                  [i - (len(df) - len(candles)) for i in confirmed_sell_idx],
+                  [], tmo_main, tmo_signal, tmo_len, kwargs.get('is_light_mode', False))
+    return candles, bool(confirmed_buy_idx), bool(confirmed_sell_idx), chart_args
+
+def _signal_phase(symbol, df, kwargs):
+    """(buy, sell, last_price, chart_args) for one ticker.
+
+    Normally everything comes from the indicator state. With `signals_only`
+    the last-bar signal is computed first and candles, TMO and chart inputs
+    are only built for BUY/SELL hits; chart_args is None otherwise and the
+    chart is left to /api/chart.
+    """
+    if kwargs.get('signals_only'):
+        linreg_args, _ = _indicator_args(kwargs)
+        buy, sell, last_price = linreg_last_signal(df, linreg_length=linreg_args['linreg_length'])
+        if not (buy or sell):
+            return False, False, last_price, None
+    candles, buy, sell, chart_args = _linreg_chart_inputs(symbol, df, kwargs)
+    last_price = float(candles[-1]['close'] if len(candles) else df['Close'].iloc[-1])
+    return buy, sell, last_price, chart_args
+
+def _analyze_frame(symbol, df, earnings_date, **kwargs):
+    """CPU half of a scan: indicators, signal and chart for one ticker.
+
+    With `lazy_charts` the chart is not rendered here; `chart_preview` is a
+    /api/chart URL that renders (and caches) it the first time it is viewed.
+    With `signals_only` NEUTRAL tickers always get that URL (see _signal_phase).
+    """
+    if df is None or df.shape[0] < 30:
+        return _no_data_result(symbol, is_light_mode=kwargs.get('is_light_mode', False))
+
+    earnings_in_7d = False
+    if earnings_date:
+        days = (earnings_date - datetime.date.today()).days
+        earnings_in_7d = 0 <= days <= 7
+
+    buy_signal, sell_signal, last_price, chart_args = _signal_phase(symbol, df, kwargs)
 
     signal_txt = 'BUY' if buy_signal else ('SELL' if sell_signal else 'NEUTRAL')
     score = 100 if buy_signal else (75 if sell_signal else 50)
 
-    chart = generate_linreg_chart(candles, signal,
-                [i - (len(df) - len(candles)) for i in confirmed_buy_idx],
-                [i - (len(df) - len(candles)) for i in confirmed_sell_idx],
-                [], tmo_main, tmo_signal, tmo_len, kwargs.get('is_light_mode', False))
+    if kwargs.get('lazy_charts') or chart_args is None:
+        chart = f"/api/chart/{quote(symbol)}?params_hash={chart_params_hash(kwargs)}"
+    else:
+        chart = generate_linreg_chart(*chart_args)
 
     return {
         'success': True, 'ticker': symbol, 'price': round(last_price, 2),
@@ -316,6 +674,212 @@ def analyze_ticker_local(symbol, **kwargs):
         'tooltips': {'earnings': f"Earnings: {earnings_date}" if earnings_date else "No earnings"}
     }
 
+def _analyze_arrays(symbol, df, earnings_date, **kwargs):
+    """_analyze_frame() for the batch endpoint: the same fields, with candles,
+    signal line and TMO kept as arrays instead of a rendered chart (empty for
+    NEUTRAL tickers in a `signals_only` scan)."""
+    if df is None or df.shape[0] < 30:
+        return {'success': False, 'ticker': symbol, 'error': 'No data', 'price': 0,
+                'signal': 'NEUTRAL', 'score': 0, 'no_earnings_ok': True}
+
+    earnings_in_7d = False
+    if earnings_date:
+        days = (earnings_date - datetime.date.today()).days
+        earnings_in_7d = 0 <= days <= 7
+
+    buy_signal, sell_signal, last_price, chart_args = _signal_phase(symbol, df, kwargs)
+
+    res = {
+        'success': True, 'ticker': symbol, 'error': None, 'price': round(last_price, 2),
+        'signal': 'BUY' if buy_signal else ('SELL' if sell_signal else 'NEUTRAL'),
+        'score': 100 if buy_signal else (75 if sell_signal else 50),
+        'earnings_date': str(earnings_date) if earnings_date else None,
+        'no_earnings_ok': not earnings_in_7d,
+    }
+    if chart_args is not None:
+        res.update({'candles': chart_args[0], 'signal_line': chart_args[1],
+                    'tmo_main': chart_args[5], 'tmo_signal': chart_args[6]})
+    return res
+
+def analyze_ticker_local(symbol, **kwargs):
+    df, earnings_date = _fetch_ticker(symbol, kwargs)
+    return _analyze_frame(symbol, df, earnings_date, **kwargs)
+
+# ----------------------------------------------------------------------
+# Parallel Scan Executor
+# ----------------------------------------------------------------------
+# Threads for Yahoo fetches, processes for indicator/chart work (0 = run it on
+# the fetch threads instead), tickers being worked on at once, and seconds a
+# single ticker may take before it is reported as timed out. Each symbol is
+# always analysed by the same worker process, which is where its cached
+# IndicatorState lives; a worker restart drops the states it held.
+SCAN_IO_WORKERS = int(os.environ.get('SCAN_IO_WORKERS', 16))
+SCAN_CPU_WORKERS = int(os.environ.get('SCAN_CPU_WORKERS', min(4, os.cpu_count() or 1)))
+SCAN_MAX_IN_FLIGHT = int(os.environ.get('SCAN_MAX_IN_FLIGHT', 64))
+SCAN_TICKER_TIMEOUT = float(os.environ.get('SCAN_TICKER_TIMEOUT', 30))
+# Hand bars to worker processes through one shared-memory arena per scan (0 = pickle each frame)
+SCAN_SHARED_ARENA = int(os.environ.get('SCAN_SHARED_ARENA', 1))
+
+_IO_POOL = None
+_CPU_POOL = None
+_POOL_LOCK = threading.Lock()
+
+class SymbolPool:
+    """`workers` single-process pools with each symbol pinned to one of them.
+
+    INDICATOR_STATES is per process, so a symbol handed to whichever worker
+    is free would find its state again only about 1 in `workers` scans.
+    """
+    def __init__(self, workers):
+        ctx = multiprocessing.get_context('spawn')
+        self.shards = [ProcessPoolExecutor(max_workers=1, mp_context=ctx) for _ in range(max(int(workers), 1))]
+
+    def shard(self, symbol):
+        digest = hashlib.blake2b(str(symbol).encode(), digest_size=4).digest()
+        return self.shards[int.from_bytes(digest, 'big') % len(self.shards)]
+
+    def submit(self, symbol, fn, *args, **kwargs):
+        return self.shard(symbol).submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        for shard in self.shards:
+            shard.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+def _scan_pools():
+    global _IO_POOL, _CPU_POOL
+    with _POOL_LOCK:
+        if _IO_POOL is None:
+            _IO_POOL = ThreadPoolExecutor(max_workers=max(SCAN_IO_WORKERS, 1), thread_name_prefix='scan-io')
+        if _CPU_POOL is None:
+            _CPU_POOL = SymbolPool(SCAN_CPU_WORKERS) if SCAN_CPU_WORKERS > 0 else _IO_POOL
+        return _IO_POOL, _CPU_POOL
+
+def _shutdown_scan_pools():
+    global _IO_POOL, _CPU_POOL
+    with _POOL_LOCK:
+        for pool in {id(p): p for p in (_IO_POOL, _CPU_POOL) if p is not None}.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _IO_POOL = _CPU_POOL = None
+
+def scan_arena(symbols, period='120d'):
+    """OHLCVArena of the cached bars for `symbols` (market symbols), or None
+    when it would not help: analysis on threads, or SCAN_SHARED_ARENA=0.
+    The caller closes it once the scan is over."""
+    _, cpu_pool = _scan_pools()
+    if not SCAN_SHARED_ARENA or not isinstance(cpu_pool, SymbolPool):
+        return None
+    frames = {sym: CACHE.get(f"{sym}_{period}") for sym in dict.fromkeys(symbols)}
+    return OHLCVArena(frames)
+
+def _analyze_shared(handle, symbol, earnings_date, analyzer, kwargs):
+    """Worker side of an arena task: analyse a zero-copy view of the bars."""
+    return with_arena_frame(handle, lambda df: analyzer(symbol, df, earnings_date, **kwargs))
+
+def _analyze_archived(symbol, key, period, tail, earnings_date, analyzer, kwargs):
+    """Worker side of an archived-period task: the worker maps the archive
+    itself, so only the bars newer than it travel with the task."""
+    return analyzer(symbol, _archive_frame(key, period, tail), earnings_date, **kwargs)
+
+def _submit_analysis(symbol, df, earnings_date, kwargs, analyzer=_analyze_frame, arena=None):
+    global _CPU_POOL
+    io_pool, cpu_pool = _scan_pools()
+    key = _market_symbol(symbol, kwargs.get('market', 'usa'))
+    period = kwargs.get('period', '120d')
+    if cpu_pool is io_pool:
+        return io_pool.submit(analyzer, symbol, df, earnings_date, **kwargs)
+    try:
+        if df is not None and _archived(key, period):
+            last = BAR_ARCHIVE.last_date(key)
+            tail = df[df.index > last] if last is not None else df
+            return cpu_pool.submit(key, _analyze_archived, symbol, key, period, tail, earnings_date, analyzer, kwargs)
+        if arena is not None and arena.matches(key, df):
+            return cpu_pool.submit(key, _analyze_shared, arena.handle(key), symbol, earnings_date, analyzer, kwargs)
+        return cpu_pool.submit(key, analyzer, symbol, df, earnings_date, **kwargs)
+    except BrokenProcessPool:
+        # A dead worker poisons its process pool; fall back to threads for every symbol
+        with _POOL_LOCK:
+            _CPU_POOL = io_pool
+        cpu_pool.shutdown(wait=False, cancel_futures=False)
+        return io_pool.submit(analyzer, symbol, df, earnings_date, **kwargs)
+
+def iter_scan(tickers, ordered=False, ticker_timeout=None, max_in_flight=None, analyzer=_analyze_frame,
+              arena=None, **kwargs):
+    """Analyse `tickers` concurrently and yield result dicts as they finish.
+
+    Each ticker is fetched on the I/O thread pool and then analysed on the
+    CPU pool. At most `max_in_flight` tickers are worked on at once, and one
+    that takes longer than `ticker_timeout` seconds is yielded as an error
+    instead of stalling the stream; its task keeps a slot until it really
+    ends, so hung fetches cannot pile up behind the scan. With `ordered=True` results are yielded
+    in input order rather than as they complete. `analyzer` is the CPU step
+    (_analyze_frame, or _analyze_arrays for the batch endpoint). Tickers whose
+    bars are in `arena` (see scan_arena) reach the workers as a handle into it
+    instead of a pickled DataFrame.
+    """
+    io_pool, _ = _scan_pools()
+    timeout = float(ticker_timeout or SCAN_TICKER_TIMEOUT)
+    cap = max(int(max_in_flight or SCAN_MAX_IN_FLIGHT), 1)
+    is_light_mode = kwargs.get('is_light_mode', False)
+
+    pending = deque(enumerate(t.strip() for t in tickers if t and t.strip()))
+    running = {}    # future -> (index, symbol, deadline, stage)
+    stuck = set()   # timed out but still holding a worker: they count against `cap` until they end
+    ready = {}
+    next_idx = 0
+
+    def fill():
+        stuck.difference_update([f for f in stuck if f.done()])
+        while pending and len(running) + len(stuck) < cap:
+            idx, sym = pending.popleft()
+            fut = io_pool.submit(_fetch_ticker, sym, kwargs)
+            running[fut] = (idx, sym, time.monotonic() + timeout, 'fetch')
+
+    fill()
+    while running or (pending and stuck):
+        finished = []
+        if running:
+            wait_for = max(min(v[2] for v in running.values()) - time.monotonic(), 0)
+            done, _ = wait(running, timeout=wait_for, return_when=FIRST_COMPLETED)
+        else:
+            # Every slot is held by timed-out work; give it one more timeout to let go
+            done, _ = wait(stuck, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                print(f"[SCAN] {len(stuck)} timed-out task(s) still running, giving up on {len(pending)} ticker(s)")
+                finished = [(idx, _no_data_result(sym, 'Timed out', is_light_mode)) for idx, sym in pending]
+                pending.clear()
+            done = set()
+
+        for fut in done:
+            idx, sym, deadline, stage = running.pop(fut)
+            try:
+                out = fut.result()
+            except Exception as e:
+                finished.append((idx, _no_data_result(sym, str(e) or 'Scan failed', is_light_mode)))
+                continue
+            if stage == 'fetch':
+                df, earnings_date = out
+                running[_submit_analysis(sym, df, earnings_date, kwargs, analyzer, arena)] = (idx, sym, deadline, 'analyze')
+            else:
+                finished.append((idx, out))
+
+        now = time.monotonic()
+        for fut, (idx, sym, deadline, _) in list(running.items()):
+            if deadline <= now:
+                del running[fut]
+                if not fut.cancel():
+                    stuck.add(fut)
+                finished.append((idx, _no_data_result(sym, 'Timed out', is_light_mode)))
+
+        fill()
+        for idx, res in finished:
+            if not ordered:
+                yield res
+                continue
+            ready[idx] = res
+        while next_idx in ready:
+            yield ready.pop(next_idx)
+            next_idx += 1
+
 # ----------------------------------------------------------------------
 # FULL HTML + JS
 # ----------------------------------------------------------------------
@@ -360,6 +924,7 @@ body { font-family: 'Inter', sans-serif; background: var(--bg); color: var(--tex
 .hidden { display: none !important; }
 .preview-img { width: 120px; height: 60px; border-radius: 8px; cursor: zoom-in; border: 1px solid var(--border); object-fit: cover; transition: all 0.3s ease; display: block; margin: 0 auto; }
 .preview-img:hover { transform: scale(2.2) translateY(-15px); box-shadow: 0 30px 60px rgba(0,0,0,0.6), 0 0 30px rgba(16,185,129,0.7); z-index: 100; border: 3px solid #10b981; }
+.live-quote { font-size:0.65rem; color:var(--text-light); margin-top:2px; white-space:nowrap; }
 .signal-badge.BUY { background:#10b981; color:white; padding:2px 6px; border-radius:4px; font-size:0.7rem; }
 .signal-badge.SELL { background:#ef4444; color:white; padding:2px 6px; border-radius:4px; font-size:0.7rem; }
 .signal-badge.NEUTRAL { background:#64748b; color:white; padding:2px 6px; border-radius:4px; font-size:0.7rem; }
@@ -515,7 +1080,74 @@ body { font-family: 'Inter', sans-serif; background: var(--bg); color: var(--tex
     <h3 style="margin-top:0;font-size:1.4rem;">Alpaca Paper Positions</h3>
     
     <div id="alpacaPositionsBody" style="margin-top:12px;">
-      Loading...
+      <div id="alpacaConn" style="background:#007AFF;color:white;padding:10px 16px;border-radius:12px;
+                  font-size:0.9rem;font-weight:500;text-align:center;margin-bottom:16px;">
+        Loading account...
+      </div>
+
+      <div style="background:#FF3B30;border-radius:16px;overflow:hidden;
+                  box-shadow:0 4px 20px rgba(0,0,0,0.1);margin-bottom:16px;padding:20px;">
+        <h3 style="margin:0 0 16px;font-weight:600;color:white;">TEST BUY</h3>
+        <button id="testBuyBtn"
+                style="width:100%;padding:16px;background:white;color:#FF3B30;border:none;border-radius:12px;
+                       font-size:1.1rem;font-weight:700;cursor:pointer;outline:none;">
+          TEST BUY: 1 AAPL (click me!)
+        </button>
+        <div id="testResult" style="margin-top:12px;font-size:0.9rem;min-height:1.2em;color:white;"></div>
+      </div>
+
+      <div style="background:#F2F2F7;border-radius:16px;overflow:hidden;
+                  box-shadow:0 4px 20px rgba(0,0,0,0.1);margin-bottom:16px;">
+        <div style="padding:20px;">
+          <div style="margin-bottom:16px;">
+            <input id="symbol" type="text" placeholder="Search ticker..." style="width:100%;padding:12px;border-radius:12px;border:1px solid #E5E5EA;background:white;color:#1C1C1E;font-size:1rem;">
+            <div id="quoteLabel" style="margin-top:6px;font-size:0.85rem;color:#8E8E93;">Enter a symbol</div>
+          </div>
+
+          <div style="margin-bottom:16px;">
+            <div style="display:flex;align-items:center;gap:12px;">
+              <input id="qty" type="number" min="0.01" step="0.01" placeholder="0" style="flex:1;padding:12px;border-radius:12px;border:1px solid #E5E5EA;background:white;color:#1C1C1E;font-size:1rem;">
+              <div style="display:flex;gap:6px;font-size:0.85rem;color:#8E8E93;">
+                <label><input type="radio" name="unit" value="shares" checked> Shares</label>
+                <label><input type="radio" name="unit" value="dollars"> $</label>
+              </div>
+            </div>
+          </div>
+
+          <div style="margin-bottom:16px;">
+            <select id="orderType" style="width:100%;padding:12px;border-radius:12px;border:1px solid #E5E5EA;background:white;color:#1C1C1E;font-size:1rem;">
+              <option value="market">Market Order</option>
+              <option value="limit">Limit Order</option>
+            </select>
+          </div>
+
+          <div style="margin-bottom:16px;">
+            <input id="limitPrice" type="number" step="0.01" placeholder="Enter limit price..."
+                   style="width:100%;padding:12px;border-radius:12px;border:1px solid #E5E5EA;background:white;color:#1C1C1E;font-size:1rem;">
+            <div style="margin-top:6px;font-size:0.8rem;color:#8E8E93;">
+              Leave empty for market. For limit, enter your price.
+            </div>
+          </div>
+
+          <div style="margin:16px 0;font-size:0.9rem;color:#8E8E93;">
+            <div style="display:flex;justify-content:space-between;">
+              <span>Est. Cost</span>
+              <span id="estCost" style="font-weight:600;color:#00C805;">$0.00</span>
+            </div>
+            <div style="display:flex;justify-content:space-between;margin-top:6px;">
+              <span>Buying Power After</span>
+              <span id="powerAfter" style="font-weight:600;">$0.00</span>
+            </div>
+          </div>
+
+          <button id="buyBtn" style="width:100%;padding:14px;background:#00C805;color:white;border:none;border-radius:12px;font-size:1rem;font-weight:600;cursor:pointer;">
+            BUY
+          </button>
+          <div id="orderStatus" style="margin-top:10px;font-size:0.85rem;min-height:1.2em;color:#8E8E93;text-align:center;"></div>
+        </div>
+      </div>
+
+      <div id="alpacaPositions"></div>
     </div>
     
     <div style="margin-top:16px;display:flex;gap:10px;">
@@ -644,7 +1276,7 @@ async function scanStocks(){
     tickers, market: currentMarket,
     params: {
       signal_length: signalLen, sma_signal: smaSignal, linreg_length: linregLen,
-      require_no_earnings: requireNoEarnings,
+      require_no_earnings: requireNoEarnings, lazy_charts: true, signals_only: true,
       tmo_length: tmoLength, tmo_calc: tmoCalc, tmo_smooth: tmoSmooth,
       tmo_len_type: tmoLenType, tmo_calc_type: tmoCalcType, tmo_smooth_type: tmoSmoothType
     },
@@ -664,24 +1296,32 @@ async function scanStocks(){
       if (renderQueue.length >= BATCH_SIZE) flushRenderQueue();
       scheduleFinalFlush();
     };
-    eventSource.onerror = () => { eventSource.close(); hideSpinner(); saveResults(); showMsg(results.length?'Partial results':'No data'); };
+    // The scan keeps running server-side; EventSource reconnects on its own and
+    // sends Last-Event-ID, so only give up once the job is gone (404 closes it)
+    eventSource.onerror = () => {
+      if (eventSource.readyState !== EventSource.CLOSED) { showMsg('Connection lost, resuming...'); return; }
+      hideSpinner(); saveResults(); showMsg(results.length?'Partial results':'No data');
+    };
   } catch (err) { hideSpinner(); showMsg('Scan failed: '+err.message); }
 }
 
 function flushRenderQueue(){
   if(!renderQueue.length) return;
   const frag = document.createDocumentFragment(), tbody = document.getElementById('tableBody');
+  const quoteSyms = [];
   for(const r of renderQueue){
+    const liveQuote = r.signal === 'BUY' && currentMarket === 'usa';
+    if (liveQuote) quoteSyms.push(r.ticker.toUpperCase());
     const tr = document.createElement('tr');
     const safeSrc = r.chart_preview ? r.chart_preview.replace(/'/g, "\\'") : '';
-    const img = r.chart_preview ? `<img src="${r.chart_preview}" class="preview-img" onclick="openModal('${safeSrc}')">` : '';
+    const img = r.chart_preview ? `<img src="${r.chart_preview}" loading="lazy" class="preview-img" onclick="openModal('${safeSrc}')">` : '';
     const earn = r.no_earnings_ok !== undefined ? `<div class="tooltip">${r.no_earnings_ok?'OK':'Soon'}<span class="tooltiptext">${r.tooltips.earnings}</span></div>` : '-';
 
     tr.innerHTML = `
       <td class="col-ticker"><strong>${r.ticker}</strong></td>
       <td class="col-chart">${img}</td>
       <td class="col-price">$${r.price}</td>
-      <td class="col-signal"><span class="signal-badge ${r.signal}">${r.signal}</span></td>
+      <td class="col-signal"><span class="signal-badge ${r.signal}">${r.signal}</span>${liveQuote ? `<div class="live-quote" data-symbol="${r.ticker.toUpperCase()}"></div>` : ''}</td>
       <td class="col-score">${r.score}</td>
       <td class="col-earnings">${earn}</td>
     `;
@@ -690,6 +1330,19 @@ function flushRenderQueue(){
   tbody.appendChild(frag);
   renderQueue = [];
   document.getElementById('resultCount').textContent = results.length;
+  if (quoteSyms.length) fetchLiveQuotes(quoteSyms);
+}
+// Bid/ask for BUY rows: one batched request per render flush
+async function fetchLiveQuotes(symbols){
+  try {
+    const r = await fetch(`/alpaca/quotes?symbols=${encodeURIComponent(symbols.join(','))}`);
+    if (!r.ok) return;
+    const quotes = await r.json();
+    document.querySelectorAll('.live-quote[data-symbol]').forEach(el => {
+      const q = quotes[el.dataset.symbol];
+      if (q && !q.error) el.textContent = `${q.bid.toFixed(2)} / ${q.ask.toFixed(2)}`;
+    });
+  } catch (e) {}
 }
 function scheduleFinalFlush(){ clearTimeout(renderTimer); renderTimer = setTimeout(()=>{ flushRenderQueue(); }, 120); }
 
@@ -741,43 +1394,245 @@ function exportCSV(){
 }
 
 // ---------- ALPACA MODAL ----------
+// The modal is static markup; account figures and positions come from the
+// /alpaca/positions snapshot, re-fetched while open and re-rendered only when
+// its version changes.
 const alpacaModal = document.getElementById('alpacaModal');
-const alpacaBody   = document.getElementById('alpacaPositionsBody');
 const alpacaClose  = alpacaModal.querySelector('.close');
 const alpacaRefresh = document.getElementById('alpacaRefreshBtn');
 const alpacaCancel  = document.getElementById('alpacaCancelAllBtn');
+const ALPACA_POLL_MS = 5000;
+let alpacaVersion = null, alpacaTimer = null, buyingPower = 0, buyQuote = null;
+
+const buyEls = {
+  conn: document.getElementById('alpacaConn'),
+  positions: document.getElementById('alpacaPositions'),
+  symbol: document.getElementById('symbol'),
+  qty: document.getElementById('qty'),
+  unitDollars: document.querySelector('#alpacaModal input[name="unit"][value="dollars"]'),
+  orderType: document.getElementById('orderType'),
+  limitPrice: document.getElementById('limitPrice'),
+  quoteLabel: document.getElementById('quoteLabel'),
+  estCost: document.getElementById('estCost'),
+  powerAfter: document.getElementById('powerAfter'),
+  buyBtn: document.getElementById('buyBtn'),
+  testBuyBtn: document.getElementById('testBuyBtn'),
+  testResult: document.getElementById('testResult'),
+  orderStatus: document.getElementById('orderStatus')
+};
+const money = (v, d = 2) => '$' + (v || 0).toLocaleString(undefined, {minimumFractionDigits: d, maximumFractionDigits: d});
+
+function renderAlpacaSnapshot(s) {
+  if (!s.connected) {
+    buyEls.conn.style.background = '#FF3B30';
+    buyEls.conn.textContent = 'Connection failed. Check config.ini' + (s.error ? ` (${s.error})` : '');
+    return;
+  }
+  buyEls.conn.style.background = s.error ? '#FF9500' : '#007AFF';
+  buyEls.conn.textContent = `Connected (${s.mode}) | ID: ${s.account_id.slice(0, 8)}... | Equity: ${money(s.equity, 0)}`
+    + (s.error ? ' | stale: ' + s.error : '');
+  buyingPower = s.buying_power || 0;
+  updateCost();
+
+  if (!s.positions.length) {
+    buyEls.positions.innerHTML = '<p style="text-align:center;color:#8E8E93;padding:20px;font-style:italic;">No open positions</p>';
+    return;
+  }
+  const rows = s.positions.map(p => {
+    const up = p.unrealized_pl >= 0;
+    return `<tr style="border-bottom:1px solid #E5E5EA;">
+      <td style="padding:12px 0;font-weight:600;">${p.symbol}</td>
+      <td style="text-align:right;">${p.qty.toLocaleString(undefined, {minimumFractionDigits: 4, maximumFractionDigits: 4})}</td>
+      <td style="text-align:right;">${money(p.market_value)}</td>
+      <td style="text-align:right;">$${(p.avg_entry_price || 0).toFixed(2)}</td>
+      <td style="text-align:right;color:${up ? '#00C805' : '#FF3B30'};font-weight:600;">${up ? '+' : ''}${money(p.unrealized_pl)}</td>
+    </tr>`;
+  }).join('');
+  buyEls.positions.innerHTML = `
+    <div style="background:#F2F2F7;border-radius:16px;overflow:hidden;box-shadow:0 4px 20px rgba(0,0,0,0.1);margin-top:16px;">
+      <div style="padding:20px;">
+        <h3 style="margin:0 0 16px;font-size:1rem;font-weight:600;color:#1C1C1E;">Open Positions</h3>
+        <table style="width:100%;border-collapse:collapse;color:#1C1C1E;">
+          <thead><tr style="text-align:left;color:#8E8E93;font-size:0.8rem;">
+            <th style="padding-bottom:8px;">Symbol</th>
+            <th style="padding-bottom:8px;text-align:right;">Qty</th>
+            <th style="padding-bottom:8px;text-align:right;">Value</th>
+            <th style="padding-bottom:8px;text-align:right;">Avg Entry</th>
+            <th style="padding-bottom:8px;text-align:right;">P&L</th>
+          </tr></thead>
+          <tbody>${rows}</tbody>
+        </table>
+      </div>
+    </div>`;
+}
+
+async function loadAlpacaSnapshot(force = false) {
+  clearTimeout(alpacaTimer);
+  try {
+    const headers = alpacaVersion && !force ? {'If-None-Match': `"${alpacaVersion}"`} : {};
+    const r = await fetch('/alpaca/positions' + (force ? '?refresh=1' : ''), {headers, cache: 'no-store'});
+    if (r.status !== 304) {
+      const s = await r.json();
+      alpacaVersion = s.version || null;
+      renderAlpacaSnapshot(s);
+    }
+  } catch (err) {
+    console.error(err);
+    buyEls.conn.style.background = '#FF3B30';
+    buyEls.conn.textContent = 'Failed to load positions.';
+  }
+  if (alpacaModal.style.display === 'flex') alpacaTimer = setTimeout(loadAlpacaSnapshot, ALPACA_POLL_MS);
+}
 
 function openAlpacaModal() {
-  alpacaBody.innerHTML = '<p style="text-align:center;color:var(--text-light);">Loading positions...</p>';
   alpacaModal.style.display = 'flex';
-  fetch('/alpaca/positions')
-    .then(r => r.text())
-    .then(html => {
-      alpacaBody.innerHTML = html || '<p style="color:#ef4444">No data returned.</p>';
-    })
-    .catch(err => {
-      console.error(err);
-      alpacaBody.innerHTML = '<p style="color:#ef4444">Failed to load positions.</p>';
-    });
+  loadAlpacaSnapshot();
 }
 
 function closeAlpacaModal() {
   alpacaModal.style.display = 'none';
+  clearTimeout(alpacaTimer);
+}
+
+// Orders return as soon as they are submitted; follow the fill here
+function trackOrder(orderId, el) {
+  const poll = async () => {
+    try {
+      const r = await fetch(`/alpaca/orders/${orderId}`);
+      const d = await r.json();
+      if (!d.success) { el.textContent = d.message || 'Status unavailable'; return; }
+      el.textContent = d.status === 'filled'
+        ? `Filled ${d.filled_qty} ${d.symbol} @ $${(d.filled_avg_price || 0).toFixed(2)}`
+        : `Order ${d.status.replace(/_/g, ' ')}` + (d.filled_qty ? ` (${d.filled_qty} filled)` : '');
+      if (d.done) { loadAlpacaSnapshot(); return; }
+    } catch (e) {
+      el.textContent = 'Status check failed, retrying...';
+    }
+    setTimeout(poll, 2000);
+  };
+  poll();
+}
+
+function updateCost() {
+  const qty = parseFloat(buyEls.qty.value || '0') || 0;
+  const isDollars = buyEls.unitDollars.checked;
+  const type = buyEls.orderType.value;
+  const limit = parseFloat(buyEls.limitPrice.value || '0') || 0;
+
+  const disable = () => { buyEls.buyBtn.disabled = true; buyEls.buyBtn.style.opacity = '0.5'; };
+  if (!buyQuote || qty <= 0 || !buyQuote.ask) {
+    buyEls.estCost.textContent = '$0.00';
+    buyEls.powerAfter.textContent = `$${buyingPower.toFixed(2)}`;
+    return disable();
+  }
+
+  const price = type === 'limit' && limit > 0 ? limit : buyQuote.ask;
+  const shares = isDollars ? qty / price : qty;
+  const total = shares * price;
+  if (!isFinite(total)) { buyEls.estCost.textContent = '$0.00'; return disable(); }
+
+  buyEls.estCost.textContent = `$${total.toFixed(2)}`;
+  buyEls.powerAfter.textContent = `$${(buyingPower - total).toFixed(2)}`;
+  const canBuy = total > 0 && total <= buyingPower && shares > 0;
+  buyEls.buyBtn.disabled = !canBuy;
+  buyEls.buyBtn.style.opacity = canBuy ? '1' : '0.5';
 }
 
+function fetchBuyQuote() {
+  const sym = buyEls.symbol.value.trim().toUpperCase();
+  if (!sym) { buyEls.quoteLabel.textContent = 'Enter a symbol'; buyQuote = null; return updateCost(); }
+  buyEls.quoteLabel.textContent = 'Loading...';
+  fetch(`/alpaca/quote?symbol=${encodeURIComponent(sym)}`)
+    .then(r => r.json())
+    .then(q => {
+      if (q.error) { buyEls.quoteLabel.textContent = q.error; buyQuote = null; }
+      else {
+        buyQuote = q;
+        buyEls.quoteLabel.innerHTML = `<strong>Bid:</strong> $${q.bid.toFixed(2)} &nbsp; <strong>Ask:</strong> $${q.ask.toFixed(2)}`;
+        if (!buyEls.limitPrice.value) buyEls.limitPrice.value = q.ask.toFixed(2);
+      }
+      updateCost();
+    })
+    .catch(() => { buyEls.quoteLabel.textContent = 'Quote failed'; buyQuote = null; updateCost(); });
+}
+
+let quoteDebounce;
+buyEls.symbol.addEventListener('input', () => { clearTimeout(quoteDebounce); quoteDebounce = setTimeout(fetchBuyQuote, 400); });
+[buyEls.qty, buyEls.limitPrice].forEach(el => el.addEventListener('input', updateCost));
+[buyEls.orderType, ...document.querySelectorAll('#alpacaModal input[name="unit"]')].forEach(el => el.addEventListener('change', updateCost));
+
+buyEls.testBuyBtn.addEventListener('click', async (e) => {
+  e.preventDefault();
+  buyEls.testBuyBtn.disabled = true;
+  buyEls.testBuyBtn.textContent = 'Sending...';
+  buyEls.testResult.textContent = '';
+  try {
+    const r = await fetch('/alpaca/buy', {
+      method: 'POST', headers: {'Content-Type': 'application/json'},
+      body: JSON.stringify({symbol: 'AAPL', qty: 1, order_type: 'market', time_in_force: 'day'})
+    });
+    const d = await r.json();
+    buyEls.testResult.style.color = d.success ? '#00C805' : '#FF3B30';
+    buyEls.testResult.textContent = d.message || (d.success ? 'Order placed!' : 'Failed');
+    if (d.success) trackOrder(d.order_id, buyEls.testResult);
+  } catch (err) {
+    buyEls.testResult.style.color = '#FF3B30';
+    buyEls.testResult.textContent = 'Network error: ' + err.message;
+  } finally {
+    buyEls.testBuyBtn.disabled = false;
+    buyEls.testBuyBtn.textContent = 'TEST BUY: 1 AAPL (click me!)';
+  }
+});
+
+buyEls.buyBtn.addEventListener('click', async () => {
+  if (buyEls.buyBtn.disabled) return;
+  const symbol = buyEls.symbol.value.trim().toUpperCase();
+  const qtyInput = parseFloat(buyEls.qty.value || '0') || 0;
+  const type = buyEls.orderType.value;
+  const limit = type === 'limit' ? (parseFloat(buyEls.limitPrice.value || '0') || 0) : null;
+
+  if (!symbol || qtyInput <= 0) return alert('Enter symbol and amount');
+  if (type === 'limit' && (!limit || limit <= 0)) return alert('Enter valid limit price');
+  if (!buyQuote) return alert('Wait for quote');
+
+  const price = type === 'limit' ? limit : buyQuote.ask;
+  const qty = buyEls.unitDollars.checked ? qtyInput / price : qtyInput;
+  const estCost = qty * price;
+  if (estCost > buyingPower) return alert(`Not enough buying power: $${estCost.toFixed(2)} > $${buyingPower.toFixed(2)}`);
+
+  buyEls.buyBtn.disabled = true;
+  buyEls.buyBtn.textContent = 'Submitting...';
+  try {
+    const r = await fetch('/alpaca/buy', {
+      method: 'POST', headers: {'Content-Type': 'application/json'},
+      body: JSON.stringify({symbol, qty, order_type: type, limit_price: limit, time_in_force: 'day'})
+    });
+    const d = await r.json();
+    if (!d.success) alert(d.message || 'Failed');
+    else { buyEls.orderStatus.textContent = d.message; trackOrder(d.order_id, buyEls.orderStatus); }
+  } catch (err) {
+    alert('Network error');
+  } finally {
+    buyEls.buyBtn.disabled = false;
+    buyEls.buyBtn.textContent = 'BUY';
+    updateCost();
+  }
+});
+updateCost();
+
 document.getElementById('alpacaPositionsBtn').addEventListener('click', openAlpacaModal);
 alpacaClose.addEventListener('click', closeAlpacaModal);
 alpacaModal.addEventListener('click', e => {
   if (e.target === alpacaModal) closeAlpacaModal();
 });
-alpacaRefresh.addEventListener('click', openAlpacaModal);
+alpacaRefresh.addEventListener('click', () => loadAlpacaSnapshot(true));
 alpacaCancel.addEventListener('click', () => {
   if (!confirm('Cancel ALL open orders?')) return;
   fetch('/alpaca/cancel_all', { method: 'POST' })
     .then(r => r.json())
     .then(d => {
       alert(d.msg || 'Orders cancelled.');
-      openAlpacaModal();
+      loadAlpacaSnapshot(true);
     })
     .catch(() => alert('Failed to cancel orders.'));
 });
@@ -797,12 +1652,34 @@ window.addEventListener('load', () => {
 # ----------------------------------------------------------------------
 # ROUTES
 # ----------------------------------------------------------------------
-STREAM_TOKENS = {}
+# Scan jobs by id; a finished job (and its buffered results) is kept for
+# SCAN_JOB_TTL seconds so clients can reconnect and resume. Running jobs never
+# expire. Buffered results are capped at SCAN_JOBS_MAX_MB in total (base64
+# charts make a big scan large); past either limit the oldest jobs go.
+SCAN_JOB_TTL = float(os.environ.get('SCAN_JOB_TTL', 15 * 60))
+SCAN_MAX_JOBS = int(os.environ.get('SCAN_MAX_JOBS', 50))
+SCAN_JOBS_MAX_MB = float(os.environ.get('SCAN_JOBS_MAX_MB', 256))
+
+def _evict_job(token, job):
+    # Pushed out by SCAN_MAX_JOBS or SCAN_JOBS_MAX_MB, nobody can reach the job any more; stop it fetching
+    if not job.done:
+        print(f"[SCAN] cancelling evicted scan {token}")
+        job.cancel()
+
+SCAN_JOBS = BoundedCache(ttl=SCAN_JOB_TTL, max_entries=SCAN_MAX_JOBS, max_bytes=int(SCAN_JOBS_MAX_MB * 2**20),
+                         sizeof=lambda job: job.nbytes, on_evict=_evict_job)
+# Seconds between SSE keep-alive comments while a job has nothing new
+SSE_KEEPALIVE = 15
 
 @app.route('/')
 def index():
     return render_template_string(HTML_TEMPLATE)
 
+@app.route('/api/cache_stats')
+def cache_stats():
+    return jsonify({'data': CACHE.stats(), 'earnings': EARNINGS_CACHE.stats(), 'charts': CHART_CACHE.stats(),
+                    'single_flight': {'data': DATA_FLIGHTS.stats(), 'earnings': EARNINGS_FLIGHTS.stats()}})
+
 @app.route('/api/upload_excel', methods=['POST'])
 def upload_excel():
     try:
@@ -815,36 +1692,180 @@ def upload_excel():
     except Exception as e:
         return jsonify({'success':False, 'error':str(e)}), 500
 
-@app.route('/api/scan_start', methods=['POST'])
-def scan_start():
-    data = request.get_json() or {}
-    token = str(uuid.uuid4())
+def _scan_payload(data):
     p = data.get('params', {})
-    STREAM_TOKENS[token] = {
+    return {
         'tickers': data.get('tickers', []),
         'market': data.get('market','usa'),
-        'params': {**p, 'sma_signal': p.get('sma_signal', True) in (True, 'true', 'True'), 'require_no_earnings': p.get('require_no_earnings', True) in (True, 'true', 'True')},
+        'params': {**p, 'sma_signal': p.get('sma_signal', True) in (True, 'true', 'True'), 'require_no_earnings': p.get('require_no_earnings', True) in (True, 'true', 'True'),
+                   'ordered': p.get('ordered', False) in (True, 'true', 'True'),
+                   'lazy_charts': p.get('lazy_charts', False) in (True, 'true', 'True'),
+                   'signals_only': p.get('signals_only', False) in (True, 'true', 'True')},
         'is_light_mode': data.get('is_light_mode', False)
     }
-    return jsonify({'success':True, 'token':token})
+
+def _prefetch_scan(symbols, period):
+    """Warm CACHE for a scan. Archived periods only need the regular window
+    (it tops the archive up); any other long period is downloaded as such."""
+    prefetch_cached_data(symbols)
+    if period != '120d':
+        prefetch_cached_data([s for s in symbols if not _archived(s, period)], period)
+
+def _run_scan(payload):
+    symbols = [_market_symbol(t, payload['market']) for t in payload['tickers'] if t.strip()]
+    period = payload['params'].get('period', '120d')
+    _prefetch_scan(symbols, period)
+    arena = scan_arena(symbols, period)
+    try:
+        for res in iter_scan(payload['tickers'], **payload['params'], market=payload['market'],
+                             is_light_mode=payload['is_light_mode'], arena=arena):
+            yield json.dumps(res)
+    finally:
+        if arena is not None:
+            arena.close()
+
+def _track_job(job):
+    # Keep a running job pinned and its size current for the byte budget
+    SCAN_JOBS.refresh(job.id, ttl=float('inf'))
+
+def _finish_job(job):
+    # Start the clock: results stay resumable for SCAN_JOB_TTL after the scan ends
+    SCAN_JOBS.refresh(job.id)
+
+_DRAINING = threading.Event()
+
+def drain_scans(timeout=None):
+    """Stop taking new scans, wait up to `timeout` seconds for running jobs to
+    finish, then shut the scan pools down. Called on server shutdown."""
+    _DRAINING.set()
+    deadline = time.monotonic() + (timeout if timeout is not None else SCAN_JOB_TTL)
+    running = [job for job in SCAN_JOBS.values() if not job.done]
+    if running:
+        print(f"[SCAN] draining {len(running)} running scan(s)")
+    for job in running:
+        job.join(max(deadline - time.monotonic(), 0))
+    left = sum(not job.done for job in running)
+    if left:
+        print(f"[SCAN] {left} scan(s) still running at shutdown")
+        for job in running:
+            job.cancel()
+    _shutdown_scan_pools()
+
+@app.route('/api/scan_start', methods=['POST'])
+def scan_start():
+    if _DRAINING.is_set():
+        return jsonify({'success': False, 'error': 'Server is restarting, try again shortly'}), 503
+    data = request.get_json() or {}
+    payload = _scan_payload(data)
+    if payload['params'].get('lazy_charts') or payload['params'].get('signals_only'):
+        chart_kwargs = {**payload['params'], 'market': payload['market'], 'is_light_mode': payload['is_light_mode']}
+        CHART_PARAMS.set(chart_params_hash(chart_kwargs), chart_kwargs)
+    job = ScanJob(lambda: _run_scan(payload), on_done=_finish_job, on_result=_track_job)
+    SCAN_JOBS.set(job.id, job, ttl=float('inf'))
+    job.start()
+    return jsonify({'success':True, 'token':job.id})
 
 @app.route('/api/scan_stream')
 def scan_stream():
-    token = request.args.get('token')
-    payload = STREAM_TOKENS.pop(token, None)
-    if not payload: return "Invalid token", 400
+    """SSE view of a scan job. Every result carries its sequence number as the
+    event id; a reconnect sending Last-Event-ID picks up after that result."""
+    job = SCAN_JOBS.get(request.args.get('token'))
+    if job is None: return "Unknown or expired scan", 404
+    last_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id', 0))
+    try:
+        seq = max(int(last_id), 0)
+    except ValueError:
+        seq = 0
     def generate():
-        for t in payload['tickers']:
-            t = t.strip()
-            if not t: continue
-            res = analyze_ticker_local(t, **payload['params'], market=payload['market'], is_light_mode=payload['is_light_mode'])
-            yield f"data: {json.dumps(res)}\n\n"
-            time.sleep(0.08)
+        nonlocal seq
+        yield "retry: 2000\n\n"
+        while True:
+            items, done = job.wait_from(seq, timeout=SSE_KEEPALIVE)
+            for item in items:
+                seq += 1
+                yield f"id: {seq}\ndata: {item}\n\n"
+            if done:
+                break
+            if not items:
+                yield ": keep-alive\n\n"
         yield "data: __END__\n\n"
-    return Response(generate(), mimetype='text/event-stream')
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/scan_status/<token>')
+def scan_status(token):
+    job = SCAN_JOBS.get(token)
+    if job is None: return jsonify({'success': False, 'error': 'Unknown or expired scan'}), 404
+    return jsonify({'success': True, **job.status()})
 
-atexit.register(lambda: plt.close('all'))
+@app.route('/api/scan_batch', methods=['POST'])
+def scan_batch():
+    """Whole scan in one response, candles/signal/TMO as float32 series.
 
+    format=packed (default): see scan_format.encode_packed; format=arrow: an
+    Arrow IPC stream. No charts are rendered; clients draw from the arrays.
+    """
+    data = request.get_json() or {}
+    fmt = data.get('format', request.args.get('format', 'packed'))
+    if fmt not in ('packed', 'arrow'): return jsonify({'success': False, 'error': f"Unknown format {fmt}"}), 400
+    payload = _scan_payload(data)
+    payload['params'].pop('ordered', None)
+    symbols = [_market_symbol(t, payload['market']) for t in payload['tickers'] if t.strip()]
+    period = payload['params'].get('period', '120d')
+    _prefetch_scan(symbols, period)
+    arena = scan_arena(symbols, period)
+    try:
+        results = list(iter_scan(payload['tickers'], ordered=True, analyzer=_analyze_arrays, **payload['params'],
+                                 market=payload['market'], is_light_mode=payload['is_light_mode'], arena=arena))
+    finally:
+        if arena is not None:
+            arena.close()
+    if fmt == 'arrow':
+        return Response(encode_arrow(results), mimetype=ARROW_MIMETYPE)
+    return Response(encode_packed(results), mimetype=PACKED_MIMETYPE)
+
+@app.route('/api/scan_matrix', methods=['POST'])
+def scan_matrix():
+    """BUY/SELL tickers for the whole list from one vectorized pass.
+
+    No charts, TMO or earnings lookups, just the signal set: meant for
+    universes too large to stream ticker by ticker. Scan or chart the hits
+    afterwards for the details.
+    """
+    payload = _scan_payload(request.get_json() or {})
+    tickers = list(dict.fromkeys(t.strip() for t in payload['tickers'] if t.strip()))
+    symbols = [_market_symbol(t, payload['market']) for t in tickers]
+    prefetch_cached_data(symbols)
+    io_pool, _ = _scan_pools()
+    frames = dict(zip(tickers, io_pool.map(get_cached_data, symbols)))
+
+    start = time.perf_counter()
+    linreg_length = int(_indicator_args(payload['params'])[0]['linreg_length'])
+    buy, sell = signal_matrix(frames, linreg_length=linreg_length)
+    elapsed = time.perf_counter() - start
+
+    no_data = [t for t, df in frames.items() if df is None or df.shape[0] < 30]
+    return jsonify({'success': True, 'buy': buy, 'sell': sell, 'scanned': len(frames) - len(no_data),
+                    'no_data': no_data, 'compute_ms': round(elapsed * 1000, 2)})
+
+@app.route('/api/chart/<symbol>')
+def chart(symbol):
+    params_hash = request.args.get('params_hash', '')
+    kwargs = CHART_PARAMS.get(params_hash)
+    if kwargs is None: return "Unknown chart params", 404
+    df = get_cached_data(_market_symbol(symbol, kwargs.get('market', 'usa')), kwargs.get('period', '120d'))
+    if df is None or df.shape[0] < 30: return "No data", 404
+
+    key = (symbol.upper(), params_hash, str(df.index[-1]))
+    png = CHART_CACHE.get(key)
+    if png is None:
+        _, _, _, chart_args = _linreg_chart_inputs(symbol, df, kwargs)
+        png = render_linreg_chart_png(*chart_args)
+        CHART_CACHE.set(key, png)
+    return Response(png, mimetype='image/png', headers={'Cache-Control': 'private, max-age=300'})
+
+atexit.register(_shutdown_scan_pools)
+
+# Development server only; production runs wsgi:app under gunicorn (see gunicorn.conf.py)
 if __name__ == '__main__':
     print("Scanner + Alpaca → http://127.0.0.1:5000")
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
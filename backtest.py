@@ -0,0 +1,267 @@
+"""
+backtest.py
+Offline backtest of the LinReg candle BUY/SELL rules over stored bars.
+- The rules are evaluated at every bar of every symbol, a chunk of symbols per pass
+- Long only: BUY opens a position when flat, SELL closes it
+- Fills at the signal close, the next open or the next close, with slippage and fees in bps
+- Reads a bar archive, a bar store directory or in-memory frames; never the network
+
+    python backtest.py --archive data/archive --period 10y --fill next_open --slippage-bps 5
+    python backtest.py --bar-store data/bars --trades-out trades.csv --symbols-out symbols.csv
+"""
+
+import os
+import sys
+import glob
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from bar_archive import BarArchive
+from bar_store import BarStore, trim
+from linreg_signals import _rolling_linreg, bar_signals
+
+FILLS = ('next_open', 'close', 'next_close')
+# Symbols per vectorized pass; the LinReg windows need about 3 * chunk * bars * length floats
+BACKTEST_CHUNK = int(os.environ.get('BACKTEST_CHUNK', 64))
+
+_FIELDS = ('Open', 'High', 'Close')
+
+
+# ----------------------------------------------------------------------
+# Sources
+# ----------------------------------------------------------------------
+def _frame_arrays(df):
+    index = df.index.tz_localize(None) if getattr(df.index, 'tz', None) is not None else df.index
+    return {**{name: df[name].to_numpy(dtype=float) for name in _FIELDS},
+            'Date': np.asarray(index, dtype='datetime64[D]')}
+
+
+def _iter_source(source, symbols=None, period=None):
+    """(symbol, {Open, High, Close, Date}) for every symbol in `source`: a
+    BarArchive (or its directory), a bar store directory or {symbol: frame}."""
+    if isinstance(source, str) and os.path.exists(os.path.join(source, 'index.json')):
+        source = BarArchive(source)
+    if isinstance(source, BarArchive):
+        for sym in (symbols or source.symbols()):
+            if sym in source:
+                yield sym, source.arrays(sym, period)
+    elif isinstance(source, str):
+        store = BarStore(source)
+        names = symbols or [os.path.splitext(os.path.basename(p))[0]
+                            for p in sorted(glob.glob(os.path.join(source, '*.parquet')))]
+        for sym in names:
+            df, _ = store.read(sym)
+            if df is not None and not df.empty:
+                yield sym, _frame_arrays(trim(df, period) if period else df)
+    else:
+        for sym in (symbols or list(source)):
+            df = source.get(sym)
+            if df is not None and not df.empty:
+                yield sym, _frame_arrays(trim(df, period) if period else df)
+
+
+def _stack(items):
+    """Right-aligned, NaN-padded (tickers x bars) matrices of one chunk."""
+    lengths = np.array([len(cols['Close']) for _, cols in items], dtype=int)
+    width = int(lengths.max())
+    out = {name: np.full((len(items), width), np.nan) for name in _FIELDS}
+    dates = np.full((len(items), width), np.datetime64('NaT'), dtype='datetime64[D]')
+    for i, (_, cols) in enumerate(items):
+        n = lengths[i]
+        for name in _FIELDS:
+            out[name][i, width - n:] = cols[name]
+        dates[i, width - n:] = cols['Date']
+    return out, dates, lengths
+
+
+# ----------------------------------------------------------------------
+# Engine
+# ----------------------------------------------------------------------
+def signal_matrices(o, h, c, lengths, linreg_length=11, lin_reg=True):
+    """Per-bar BUY/SELL for (tickers x bars) matrices, as linreg_candles
+    would flag each bar with the history up to it."""
+    if lin_reg:
+        t = len(o)
+        fitted = _rolling_linreg(np.concatenate([o, h, c]).T, linreg_length).T
+        bopen, bhigh, bclose = fitted[:t], fitted[t:2 * t], fitted[2 * t:]
+    else:
+        bopen, bhigh, bclose = o, h, c
+    with np.errstate(invalid='ignore'):
+        green = bopen < bclose
+    buy, sell = bar_signals(green, c, bhigh, bclose)
+    # A symbol's own first 5 bars never signal, wherever its padding ends
+    early = np.arange(c.shape[1]) < (c.shape[1] - lengths + 5)[:, None]
+    buy[early] = False
+    sell[early] = False
+    return buy, sell
+
+
+def _entries_exits(buy, sell):
+    """Bars where a long position opens and closes: BUY only counts when
+    flat, SELL only when long, so the two alternate per row."""
+    event = buy.astype(np.int8) - sell.astype(np.int8)
+    last = np.where(event != 0, np.arange(event.shape[1]), 0)
+    np.maximum.accumulate(last, axis=1, out=last)
+    held = np.take_along_axis(event, last, axis=1) == 1
+    before = np.zeros_like(held)
+    before[:, 1:] = held[:, :-1]
+    return held & ~before, before & ~held
+
+
+def _trades(symbols, prices, dates, buy, sell, fill, slippage_bps, fee_bps):
+    """One row per trade of a chunk. Positions still open on the last bar
+    are marked at its close, without exit costs, and flagged `open`."""
+    o, c = prices['Open'], prices['Close']
+    width = c.shape[1]
+    px = o if fill == 'next_open' else c
+    shift = 0 if fill == 'close' else 1
+    slip, fee = slippage_bps / 1e4, fee_bps / 1e4
+
+    entries, exits = _entries_exits(buy, sell)
+    er, ec = np.nonzero(entries)
+    xr, xc = np.nonzero(exits)
+    # The k-th exit of a row closes its k-th entry
+    exit_sig = np.full(len(er), -1)
+    exit_sig[np.searchsorted(er, xr) + (np.arange(len(xr)) - np.searchsorted(xr, xr))] = xc
+
+    entry_at = ec + shift
+    keep = entry_at < width
+    er, ec, entry_at, exit_sig = er[keep], ec[keep], entry_at[keep], exit_sig[keep]
+    exit_at = np.where(exit_sig >= 0, exit_sig + shift, width)
+    is_open = exit_at >= width
+    exit_at = np.minimum(exit_at, width - 1)
+
+    entry_px = px[er, entry_at] * (1 + slip) * (1 + fee)
+    exit_raw = np.where(is_open, c[er, exit_at], px[er, exit_at])
+    exit_px = np.where(is_open, exit_raw, exit_raw * (1 - slip) * (1 - fee))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ret = exit_px / entry_px - 1
+
+    trades = pd.DataFrame({
+        'symbol': np.asarray(symbols, dtype=object)[er],
+        'signal_date': dates[er, ec], 'entry_date': dates[er, entry_at], 'exit_date': dates[er, exit_at],
+        'entry_price': entry_px, 'exit_price': exit_px, 'return': ret,
+        'bars': exit_at - entry_at, 'open': is_open,
+    })
+    return trades[np.isfinite(ret)]
+
+
+def _symbol_stats(trades, bars):
+    closed = trades[~trades['open']]
+    r = closed['return']
+    grouped = closed.assign(win=r > 0, log=np.log1p(r), gain=r.clip(lower=0), loss=(-r).clip(lower=0))
+    equity = grouped.groupby('symbol', sort=False)['log'].cumsum()
+    peak = np.maximum(equity.groupby(grouped['symbol'], sort=False).cummax(), 0)
+    grouped['drawdown'] = np.expm1(equity - peak)
+
+    stats = grouped.groupby('symbol').agg(
+        trades=('return', 'size'), wins=('win', 'sum'), avg_return=('return', 'mean'),
+        log=('log', 'sum'), gain=('gain', 'sum'), loss=('loss', 'sum'),
+        avg_bars=('bars', 'mean'), max_drawdown=('drawdown', 'min'))
+    stats['win_rate'] = stats['wins'] / stats['trades']
+    stats['total_return'] = np.expm1(stats.pop('log'))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stats['profit_factor'] = stats.pop('gain') / stats.pop('loss')
+
+    held = trades.groupby('symbol')['bars'].sum()
+    stats = stats.reindex(bars.index)
+    stats['trades'] = stats['trades'].fillna(0).astype(int)
+    stats['wins'] = stats['wins'].fillna(0).astype(int)
+    stats['bars'] = bars
+    stats['exposure'] = held.reindex(bars.index).fillna(0) / bars
+    stats['open'] = trades[trades['open']].groupby('symbol').size().reindex(bars.index).fillna(0).astype(bool)
+    return stats
+
+
+def _summary(trades, stats):
+    closed = trades[~trades['open']]
+    r = closed['return']
+    gain, loss = r.clip(lower=0).sum(), (-r).clip(lower=0).sum()
+    traded = stats[stats['trades'] > 0]
+    return {
+        'symbols': int(len(stats)), 'symbols_traded': int(len(traded)),
+        'trades': int(len(closed)), 'open_positions': int(trades['open'].sum()),
+        'win_rate': float((r > 0).mean()) if len(r) else None,
+        'avg_return': float(r.mean()) if len(r) else None,
+        'median_return': float(r.median()) if len(r) else None,
+        'profit_factor': float(gain / loss) if loss else None,
+        'avg_bars': float(closed['bars'].mean()) if len(r) else None,
+        'mean_symbol_return': float(traded['total_return'].mean()) if len(traded) else None,
+        'exposure': float((stats['exposure'] * stats['bars']).sum() / stats['bars'].sum()) if len(stats) else None,
+    }
+
+
+def run_backtest(source, symbols=None, period=None, linreg_length=11, lin_reg=True, fill='next_open',
+                 slippage_bps=0.0, fee_bps=0.0, chunk_size=None):
+    """Backtest the BUY/SELL rules over `source` (see _iter_source).
+
+    Returns {'trades': one row per trade, 'symbols': per-symbol stats,
+    'summary': aggregate stats}. Returns are per trade, after slippage and
+    fees on both sides; stats count closed trades only.
+    """
+    if fill not in FILLS:
+        raise ValueError(f"fill must be one of {FILLS}")
+    chunk_size = max(int(chunk_size or BACKTEST_CHUNK), 1)
+    started = time.perf_counter()
+
+    parts, bars, chunk = [], {}, []
+    def flush():
+        prices, dates, lengths = _stack(chunk)
+        syms = [sym for sym, _ in chunk]
+        buy, sell = signal_matrices(prices['Open'], prices['High'], prices['Close'], lengths,
+                                    linreg_length, lin_reg)
+        parts.append(_trades(syms, prices, dates, buy, sell, fill, slippage_bps, fee_bps))
+        bars.update(zip(syms, lengths.tolist()))
+        chunk.clear()
+
+    for sym, cols in _iter_source(source, symbols, period):
+        if len(cols['Close']):
+            chunk.append((sym, cols))
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+    trades = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(
+        {'symbol': [], 'return': [], 'bars': [], 'open': []}).astype({'bars': int, 'open': bool})
+    stats = _symbol_stats(trades, pd.Series(bars, dtype=int, name='bars'))
+    summary = _summary(trades, stats)
+    summary['elapsed_s'] = round(time.perf_counter() - started, 2)
+    return {'trades': trades, 'symbols': stats, 'summary': summary}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Backtest the LinReg candle BUY/SELL rules on stored bars')
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument('--archive', help='bar archive directory (bar_archive.py)')
+    src.add_argument('--bar-store', help='bar store directory (one Parquet file per symbol)')
+    ap.add_argument('--symbols', help='comma separated; default every stored symbol')
+    ap.add_argument('--period', help="history to test, e.g. '10y' (default: all stored bars)")
+    ap.add_argument('--linreg-length', type=int, default=11)
+    ap.add_argument('--no-linreg', action='store_true', help='run the rules on raw candles')
+    ap.add_argument('--fill', default='next_open', choices=FILLS)
+    ap.add_argument('--slippage-bps', type=float, default=0.0)
+    ap.add_argument('--fee-bps', type=float, default=0.0)
+    ap.add_argument('--chunk', type=int, default=BACKTEST_CHUNK, help='symbols per vectorized pass')
+    ap.add_argument('--trades-out', help='write every trade to this CSV')
+    ap.add_argument('--symbols-out', help='write per-symbol stats to this CSV')
+    args = ap.parse_args(argv)
+
+    symbols = [s.strip().upper() for s in args.symbols.split(',') if s.strip()] if args.symbols else None
+    source = BarArchive(args.archive) if args.archive else args.bar_store
+    result = run_backtest(source, symbols, args.period, args.linreg_length, not args.no_linreg,
+                          args.fill, args.slippage_bps, args.fee_bps, args.chunk)
+
+    for key, value in result['summary'].items():
+        print(f"{key:20s} {value:.4f}" if isinstance(value, float) else f"{key:20s} {value}")
+    if args.trades_out:
+        result['trades'].to_csv(args.trades_out, index=False)
+    if args.symbols_out:
+        result['symbols'].to_csv(args.symbols_out, index_label='symbol')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+bar_archive.py
+Read-only, memory-mapped daily bar archive for long-lookback scans.
+- One row-major file of fixed-width OHLCV rows (float32 or float64) plus a dates file
+- index.json maps each symbol to its [start, length] row range, bars sorted by date
+- Slices are views into the mapping: nothing is loaded until it is read, and a
+  frame() is one 2-D block over it, so pandas does not consolidate it into a copy
+- build_archive() writes it from CSV/Parquet drops, one file at a time
+
+    python bar_archive.py data/archive data/bars drops/2024.parquet --dtype float32
+"""
+
+import os
+import sys
+import json
+import glob
+import shutil
+import argparse
+import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from bar_store import period_start
+
+COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+DTYPES = {'float32': '<f4', 'float64': '<f8'}
+INDEX_FILE = 'index.json'
+BARS_FILE = 'bars.bin'
+DATES_FILE = 'dates.bin'
+VERSION = 2
+
+_SYMBOL_COLUMNS = ('symbol', 'ticker')
+_DATE_COLUMNS = ('date', 'datetime', 'timestamp')
+
+
+def _map(path: str, dtype, shape: tuple) -> np.ndarray:
+    # np.memmap refuses empty files
+    if shape[0] == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=shape).view(np.ndarray)
+
+
+class BarArchive:
+    def __init__(self, root: str):
+        """Open an archive written by build_archive(). Rebuilding it in place
+        needs a reopen to be seen; mappings already handed out stay valid."""
+        self.root = root
+        with open(os.path.join(root, INDEX_FILE)) as f:
+            meta = json.load(f)
+        if meta.get('version') != VERSION:
+            raise ValueError(f"{root}: archive version {meta.get('version')}, expected {VERSION}; rebuild it")
+        self.dtype = np.dtype(meta['dtype'])
+        self.rows = int(meta['rows'])
+        self.built = meta.get('built')
+        self._index = {sym: (int(start), int(length)) for sym, (start, length) in meta['symbols'].items()}
+        names = list(meta['columns'])
+        self._bars = _map(os.path.join(root, BARS_FILE), self.dtype, (self.rows, len(names)))
+        # Strided per-column views of the same mapping
+        self._columns = {name: self._bars[:, j] for j, name in enumerate(names)}
+        self._dates = _map(os.path.join(root, DATES_FILE), '<M8[D]', (self.rows,))
+
+    def __contains__(self, symbol):
+        return symbol in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def columns(self):
+        return tuple(self._columns)
+
+    def symbols(self) -> list:
+        return list(self._index)
+
+    def last_date(self, symbol: str):
+        start, length = self._index[symbol]
+        return pd.Timestamp(self._dates[start + length - 1]) if length else None
+
+    def _range(self, symbol: str, period: str = None, bars: int = None):
+        start, length = self._index[symbol]
+        stop = start + length
+        since = period_start(period) if period else None
+        if since is not None:
+            start += int(np.searchsorted(self._dates[start:stop], np.datetime64(since.date(), 'D')))
+        if bars is not None:
+            start = max(start, stop - int(bars))
+        return start, stop
+
+    def arrays(self, symbol: str, period: str = None, bars: int = None) -> dict:
+        """{column: view} plus 'Date' for one symbol, optionally trimmed to a
+        yfinance-style period or to the newest `bars` rows. No copies."""
+        start, stop = self._range(symbol, period, bars)
+        out = {name: col[start:stop] for name, col in self._columns.items()}
+        out['Date'] = self._dates[start:stop]
+        return out
+
+    def frame(self, symbol: str, period: str = None, bars: int = None) -> pd.DataFrame:
+        """DataFrame over the mapped rows (tz-naive Date index, like the bar store).
+        The values share the mapping; only the dates are converted."""
+        start, stop = self._range(symbol, period, bars)
+        index = pd.DatetimeIndex(self._dates[start:stop], name='Date')
+        return pd.DataFrame(self._bars[start:stop], columns=list(self._columns), index=index, copy=False)
+
+    def matrix(self, symbols, bars: int, columns=('Open', 'High', 'Close')):
+        """(tickers x bars) arrays of the newest `bars` rows, right-aligned and
+        NaN-padded like app.align_universe(). Symbols not in the archive are
+        skipped. Returns (symbols, {column: array}, lengths)."""
+        found = [s for s in symbols if s in self._index]
+        out = np.full((len(columns), len(found), int(bars)), np.nan)
+        lengths = np.empty(len(found), dtype=int)
+        for i, sym in enumerate(found):
+            start, stop = self._range(sym, bars=bars)
+            n = lengths[i] = stop - start
+            for j, name in enumerate(columns):
+                out[j, i, out.shape[2] - n:] = self._columns[name][start:stop]
+        return found, dict(zip(columns, out)), lengths
+
+
+# ----------------------------------------------------------------------
+# Builder
+# ----------------------------------------------------------------------
+def _pick(columns, names):
+    lower = {str(c).lower().strip(): c for c in columns}
+    for name in names:
+        if name in lower:
+            return lower[name]
+    return None
+
+
+def _read_drop(path: str) -> pd.DataFrame:
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def _drop_columns(path: str) -> list:
+    """Column names without reading the data."""
+    if path.endswith('.parquet'):
+        return pq.read_schema(path).names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def _dates(values) -> pd.DatetimeIndex:
+    """Exchange-local calendar dates. Daily bars keep their local date even
+    when stamped with an offset (an IST midnight is the previous day in UTC)."""
+    if isinstance(values, pd.DatetimeIndex):
+        index = values.tz_localize(None) if values.tz is not None else values
+    elif pd.api.types.is_datetime64_any_dtype(values):
+        index = pd.DatetimeIndex(values.dt.tz_localize(None) if values.dt.tz is not None else values)
+    else:
+        index = pd.DatetimeIndex(pd.to_datetime(pd.Series(values).astype(str).str[:10], errors='coerce'))
+    return index.normalize()
+
+
+def _bars(raw: pd.DataFrame) -> pd.DataFrame:
+    """OHLCV on a sorted, de-duplicated tz-naive daily index."""
+    if isinstance(raw.index, pd.DatetimeIndex):
+        index = _dates(raw.index)
+    else:
+        index = _dates(raw[_pick(raw.columns, _DATE_COLUMNS) or raw.columns[0]])
+    data = {}
+    for name in COLUMNS:
+        col = _pick(raw.columns, (name.lower(),))
+        data[name] = pd.to_numeric(raw[col], errors='coerce').to_numpy(dtype=float) if col is not None else np.nan
+    df = pd.DataFrame(data, index=index)
+    df = df[df.index.notna()].dropna(how='all', subset=list(COLUMNS[:4]))
+    return df[~df.index.duplicated(keep='last')].sort_index()
+
+
+def _drops(sources):
+    """(file-name symbol, path) for every CSV/Parquet file under `sources`."""
+    for src in sources:
+        paths = ([src] if os.path.isfile(src) else
+                 sorted(glob.glob(os.path.join(src, '*.parquet')) + glob.glob(os.path.join(src, '*.csv'))))
+        for path in paths:
+            yield os.path.splitext(os.path.basename(path))[0].upper(), path
+
+
+def build_archive(root: str, sources, dtype: str = 'float64') -> dict:
+    """Write a BarArchive at `root` from CSV/Parquet drops.
+
+    `sources` are files or directories. A file with a symbol/ticker column
+    may hold any number of symbols; otherwise the file name is the symbol
+    (the bar store's layout). A symbol found in several files is merged,
+    later files winning on the same date. Per-symbol files are streamed to
+    disk one at a time; multi-symbol files are held while they are split.
+    The finished archive replaces `root` in one rename.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {sorted(DTYPES)}")
+    wide = DTYPES[dtype]
+    tmp = f"{root.rstrip(os.sep)}.building-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    # Group the drops by symbol first, so each symbol is written once, contiguously
+    by_symbol = {}
+    for name, path in _drops(sources):
+        if _pick(_drop_columns(path), _SYMBOL_COLUMNS) is None:
+            by_symbol.setdefault(name, []).append(path)
+            continue
+        raw = _read_drop(path)
+        sym_col = _pick(raw.columns, _SYMBOL_COLUMNS)
+        symbols = raw[sym_col].astype(str).str.strip().str.upper()
+        for sym, grp in raw.drop(columns=[sym_col]).groupby(symbols.values, sort=False):
+            if sym:
+                by_symbol.setdefault(sym, []).append(grp)
+
+    index, rows = {}, 0
+    bars = open(os.path.join(tmp, BARS_FILE), 'wb')
+    dates = open(os.path.join(tmp, DATES_FILE), 'wb')
+    try:
+        for sym in sorted(by_symbol):
+            parts = [_bars(_read_drop(p) if isinstance(p, str) else p) for p in by_symbol.pop(sym)]
+            df = pd.concat(parts) if len(parts) > 1 else parts[0]
+            if len(parts) > 1:
+                df = df[~df.index.duplicated(keep='last')].sort_index()
+            if df.empty:
+                continue
+            bars.write(np.ascontiguousarray(df[list(COLUMNS)].to_numpy(dtype=wide)).tobytes())
+            dates.write(df.index.values.astype('<M8[D]').tobytes())
+            index[sym] = [rows, len(df)]
+            rows += len(df)
+    finally:
+        bars.close()
+        dates.close()
+
+    meta = {'version': VERSION, 'dtype': wide, 'columns': list(COLUMNS), 'rows': rows,
+            'built': datetime.datetime.now().isoformat(timespec='seconds'), 'symbols': index}
+    with open(os.path.join(tmp, INDEX_FILE), 'w') as f:
+        json.dump(meta, f)
+
+    old = None
+    if os.path.exists(root):
+        old = f"{root.rstrip(os.sep)}.old-{os.getpid()}"
+        os.rename(root, old)
+    os.rename(tmp, root)
+    if old:
+        shutil.rmtree(old, ignore_errors=True)
+    return {'symbols': len(index), 'rows': rows, 'bytes': rows * (len(COLUMNS) * np.dtype(wide).itemsize + 8)}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Build a memory-mapped bar archive from CSV/Parquet drops')
+    ap.add_argument('root', help='archive directory to (re)write')
+    ap.add_argument('sources', nargs='+', help='CSV/Parquet files or directories of them')
+    ap.add_argument('--dtype', default='float64', choices=sorted(DTYPES))
+    args = ap.parse_args(argv)
+    stats = build_archive(args.root, args.sources, args.dtype)
+    print(f"[ARCHIVE] {stats['symbols']} symbols, {stats['rows']} bars, "
+          f"{stats['bytes'] / 2**20:.1f} MB -> {args.root}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+bar_store.py
+Persistent daily OHLCV store: one Parquet file per symbol.
+- get_cached_data reads through it, so restarts keep their history
+- Refreshes append only the bars after the last stored date, unless a
+  split or dividend re-adjusted the history upstream (see readjusted())
+- Reads are memory-mapped by pyarrow
+"""
+
+import os
+import re
+import time
+import datetime
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+_PERIOD_RE = re.compile(r'^(\d+)(d|wk|mo|y)$')
+_PERIOD_DAYS = {'d': 1, 'wk': 7, 'mo': 31, 'y': 366}
+
+# Parquet schema metadata key: earliest date the file's history was requested from
+_SINCE_KEY = b'bar_store.since'
+# Relative Open mismatch on an overlapping bar that counts as a re-adjusted history
+_ADJUST_RTOL = 1e-4
+_ACTIONS = ('Stock Splits', 'Dividends')
+
+
+def period_start(period: str, now: datetime.datetime = None):
+    """Earliest timestamp a yfinance-style period ('120d', '6mo', '2y') covers; None for 'max'."""
+    m = _PERIOD_RE.match(period or '')
+    if not m:
+        return None
+    now = now or datetime.datetime.now()
+    return pd.Timestamp(now.date()) - pd.Timedelta(days=int(m.group(1)) * _PERIOD_DAYS[m.group(2)])
+
+
+def covers(since, period: str) -> bool:
+    """True if history stored from `since` reaches back as far as `period` needs."""
+    if since is None:
+        return False
+    start = period_start(period)
+    return since == 'max' if start is None else (since == 'max' or since <= start)
+
+
+def trim(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    start = period_start(period)
+    return df if start is None else df[df.index >= start]
+
+
+def since_period(since) -> str:
+    """yfinance period that re-fetches everything stored from `since`."""
+    if since is None or since == 'max':
+        return 'max'
+    return f"{(pd.Timestamp(datetime.date.today()) - pd.Timestamp(since)).days + 1}d"
+
+
+def readjusted(stored: pd.DataFrame, new: pd.DataFrame) -> bool:
+    """True if top-up bars show the upstream history was back-adjusted since
+    `stored` was written, so appending them would mix price bases.
+
+    yfinance adjusts the whole history for splits and dividends. Either the
+    new bars carry such an action after the last stored date, or a bar both
+    frames hold now opens at a different price. Only Open is compared: the
+    last stored bar may have been a partial session.
+    """
+    if stored is None or stored.empty or new is None or new.empty:
+        return False
+    new = normalize(new)
+    after = new[new.index > stored.index[-1]]
+    for col in _ACTIONS:
+        if col in after.columns and (after[col].fillna(0) != 0).any():
+            return True
+    both = stored.index.intersection(new.index)
+    if not len(both) or 'Open' not in new.columns:
+        return False
+    was = stored.loc[both, 'Open'].to_numpy(dtype=float)
+    now = new.loc[both, 'Open'].to_numpy(dtype=float)
+    ok = np.isfinite(was) & np.isfinite(now)
+    return not np.allclose(now[ok], was[ok], rtol=_ADJUST_RTOL, atol=0)
+
+
+def normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """Store bars on tz-naive exchange dates so history() and download() frames merge cleanly."""
+    df = df.dropna(how='all')
+    if isinstance(df.index, pd.DatetimeIndex) and df.index.tz is not None:
+        df = df.tz_localize(None)
+    df.index.name = 'Date'
+    return df
+
+
+class BarStore:
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def path(self, symbol: str) -> str:
+        return os.path.join(self.root, re.sub(r'[^A-Za-z0-9._-]', '_', symbol.upper()) + '.parquet')
+
+    def _lock(self, symbol: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(symbol.upper(), threading.Lock())
+
+    def age(self, symbol: str):
+        """Seconds since the symbol was last refreshed, or None if it is not stored."""
+        try:
+            return time.time() - os.path.getmtime(self.path(symbol))
+        except OSError:
+            return None
+
+    def read(self, symbol: str, memory_map: bool = True):
+        """Stored bars plus the date their history was requested from
+        ('max' for full history), or (None, None) if nothing is stored."""
+        try:
+            table = pq.read_table(self.path(symbol), memory_map=memory_map)
+        except (OSError, pa.ArrowInvalid):
+            return None, None
+        since = (table.schema.metadata or {}).get(_SINCE_KEY)
+        if since is not None:
+            since = 'max' if since == b'max' else pd.Timestamp(since.decode())
+        return table.to_pandas(), since
+
+    def write(self, symbol: str, df: pd.DataFrame, since=None):
+        df = normalize(df).sort_index()
+        table = pa.Table.from_pandas(df)
+        if since is not None:
+            since = b'max' if since == 'max' else pd.Timestamp(since).isoformat().encode()
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), _SINCE_KEY: since})
+        path = self.path(symbol)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)
+
+    def append(self, symbol: str, new: pd.DataFrame, since=None, replace: bool = False) -> pd.DataFrame:
+        """Merge `new` bars into the stored history (newer rows win) and return it.
+
+        replace=True drops the stored bars first but keeps their `since`, for a
+        full re-fetch after readjusted().
+        """
+        with self._lock(symbol):
+            stored, stored_since = self.read(symbol)
+            if replace:
+                stored = None
+            if 'max' in (since, stored_since):
+                since = 'max'
+            elif since is None or stored_since is None:
+                since = stored_since if since is None else since
+            else:
+                since = min(pd.Timestamp(since), stored_since)
+            new = normalize(new) if new is not None else None
+            if stored is None or stored.empty:
+                merged = new
+            elif new is None or new.empty:
+                merged = stored
+            else:
+                merged = pd.concat([stored, new])
+                merged = merged[~merged.index.duplicated(keep='last')]
+            if merged is None or merged.empty:
+                return merged
+            self.write(symbol, merged, since)
+            return merged.sort_index()
+
+    def touch(self, symbol: str):
+        """Mark a symbol as freshly refreshed without rewriting it."""
+        try:
+            os.utime(self.path(symbol))
+        except OSError:
+            pass
@@ -0,0 +1,138 @@
+"""
+bench_chart.py
+Pooled LinregChartRenderer vs the original per-ticker pyplot chart.
+
+    python benchmarks/bench_chart.py [--renders 200] [--out charts/]
+
+Both render the same synthetic tickers; --out also writes one PNG from each
+so the two can be compared by eye.
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.patches import Rectangle
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import render_linreg_chart_png  # noqa: E402
+
+
+# Reference: generate_linreg_chart as it was before the renderer pool
+
+def legacy_chart_png(candles, signal, buy_idx, sell_idx, pivot_lows,
+                            tmo_main, tmo_signal, tmo_length, is_light_mode=False):
+    fig = plt.figure(figsize=(6, 3.8), dpi=100)
+    fig.patch.set_facecolor('#ffffff' if is_light_mode else '#0f172a')
+    gs = fig.add_gridspec(4, 1, height_ratios=[3, 1, 0.1, 0.1])
+    ax_price = fig.add_subplot(gs[0, 0])
+    ax_tmo = fig.add_subplot(gs[1, 0], sharex=ax_price)
+
+    ax_price.set_facecolor('#ffffff' if is_light_mode else '#0f172a')
+    fg = '#000000' if is_light_mode else '#e2e8f0'
+
+    if not candles:
+        plt.text(0.5, 0.5, 'No data', ha='center', va='center', color=fg, transform=ax_price.transAxes)
+    else:
+        for i, cd in enumerate(candles):
+            o, h, l, c = cd['open'], cd['high'], cd['low'], cd['close']
+            col = cd['color']
+            body_top, body_bot = max(o, c), min(o, c)
+            ax_price.add_patch(Rectangle((i-0.35, body_bot), 0.7, body_top-body_bot,
+                                         facecolor=col, edgecolor=col, linewidth=1.2))
+            ax_price.plot([i, i], [l, h], color=col, linewidth=1.2)
+
+        ax_price.plot(range(len(signal)), signal, color=fg, linewidth=2)
+
+        last_idx = len(candles) - 1
+        if buy_idx and buy_idx[-1] == last_idx:
+            ax_price.scatter(last_idx, candles[last_idx]['high']*1.01, marker='^', s=120, color='#10b981', zorder=5)
+            ax_price.text(last_idx, candles[last_idx]['high']*1.03, 'BUY', color='white', ha='center', va='bottom', fontsize=8, fontweight='bold')
+        if sell_idx and sell_idx[-1] == last_idx:
+            ax_price.scatter(last_idx, candles[last_idx]['low']*0.99, marker='v', s=120, color='#ef4444', zorder=5)
+            ax_price.text(last_idx, candles[last_idx]['low']*0.97, 'SELL', color='white', ha='center', va='top', fontsize=8, fontweight='bold')
+
+    ax_price.set_ylabel('Price', color=fg, fontsize=8)
+    ax_price.tick_params(colors=fg, labelsize=7)
+    ax_price.grid(True, alpha=0.2)
+    ax_price.set_xticks([])
+
+    ax_tmo.set_facecolor('#ffffff' if is_light_mode else '#0f172a')
+    x = range(len(tmo_main))
+    ax_tmo.plot(x, tmo_main, color='#3b82f6', linewidth=1.5)
+    ax_tmo.plot(x, tmo_signal, color='#fb923c', linewidth=1.5)
+
+    ob = int(tmo_length * 0.7)
+    os_ = -ob
+    ax_tmo.axhspan(ob, tmo_length, color='#ef4444', alpha=0.2)
+    ax_tmo.axhspan(os_, -tmo_length, color='#10b981', alpha=0.2)
+    ax_tmo.axhline(0, color='#64748b', linewidth=0.8, alpha=0.7)
+
+    ax_tmo.set_ylim(-tmo_length*1.1, tmo_length*1.1)
+    ax_tmo.set_ylabel('TMO', color=fg, fontsize=6)
+    ax_tmo.tick_params(colors=fg, labelsize=6)
+    ax_tmo.grid(True, alpha=0.2)
+
+    plt.tight_layout()
+
+    buf = BytesIO()
+    fig.savefig(buf, format='png', bbox_inches='tight', dpi=120, facecolor=fig.get_facecolor())
+    plt.close(fig)
+    return buf.getvalue()
+
+
+def synthetic_chart_args(seed, n=60):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    opens = close + rng.normal(0, 0.6, n)
+    candles = [{'open': round(float(o), 4), 'high': round(float(max(o, c) + 0.5), 4),
+                'low': round(float(min(o, c) - 0.5), 4), 'close': round(float(c), 4),
+                'color': '#10b981' if o < c else '#ff8c00'} for o, c in zip(opens, close)]
+    signal = np.convolve(close, np.ones(5) / 5, mode='same')
+    tmo_main = np.clip(np.cumsum(rng.normal(0, 2, n)), -14, 14)
+    tmo_signal = np.convolve(tmo_main, np.ones(3) / 3, mode='same')
+    buy = [n - 1] if seed % 3 == 0 else []
+    sell = [n - 1] if seed % 3 == 1 else []
+    return candles, signal, buy, sell, [], tmo_main, tmo_signal, 14
+
+
+def bench(fn, cases, is_light_mode):
+    times = []
+    for args in cases:
+        t = time.perf_counter()
+        fn(*args, is_light_mode)
+        times.append(time.perf_counter() - t)
+    return np.array(times) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    ap.add_argument('--renders', type=int, default=200)
+    ap.add_argument('--out', help='directory to write sample PNGs into')
+    args = ap.parse_args()
+
+    cases = [synthetic_chart_args(i) for i in range(args.renders)]
+    render_linreg_chart_png(*cases[0], False)   # build the pooled figure outside the timing
+
+    for light in (False, True):
+        old = bench(legacy_chart_png, cases, light)
+        new = bench(render_linreg_chart_png, cases, light)
+        print(f"{'light' if light else 'dark'}: legacy {np.median(old):7.2f} ms  "
+              f"pooled {np.median(new):7.2f} ms  (p50, {args.renders} renders)  "
+              f"speedup x{np.median(old) / np.median(new):.1f}")
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        for name, fn in (('legacy', legacy_chart_png), ('pooled', render_linreg_chart_png)):
+            with open(os.path.join(args.out, f'{name}.png'), 'wb') as f:
+                f.write(fn(*cases[0], False))
+
+
+if __name__ == '__main__':
+    main()
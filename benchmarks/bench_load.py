@@ -0,0 +1,179 @@
+"""
+bench_load.py
+Load benchmark: Flask development server vs the gunicorn production config.
+
+    python benchmarks/bench_load.py                          # both servers, 20 s each
+    python benchmarks/bench_load.py --servers gunicorn --scan-clients 8 --light-clients 32
+
+Each server is started on synthetic bars written to a temporary bar store, so
+nothing touches the network. While "scan" clients run full scans (scan_start +
+SSE stream to __END__), "light" clients hit / and /api/cache_stats, which is
+what the page and the Alpaca modal do while a scan is running. Reports scans/s,
+light requests/s and light-request latency per server.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import datetime
+import tempfile
+import argparse
+import threading
+import subprocess
+
+import numpy as np
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bar_store import BarStore  # noqa: E402
+from bench_scan import synthetic_frames  # noqa: E402
+
+SERVERS = {
+    'dev': [sys.executable, '-c',
+            "import os, app; app.app.run(debug=True, use_reloader=False, threaded=True, "
+            "host='127.0.0.1', port=int(os.environ['PORT']))"],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+}
+LIGHT_PATHS = ('/', '/api/cache_stats')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def write_fixtures(root, count):
+    store = BarStore(root)
+    # Bars must end today or the 120d window trims them away
+    frames = synthetic_frames(count, end=datetime.date.today())
+    for sym, df in frames.items():
+        store.write(sym, df, since='max')
+    return list(frames)
+
+
+def start_server(name, port, store_dir):
+    env = {**os.environ, 'PORT': str(port), 'SCAN_BAR_STORE': store_dir, 'SCAN_EARNINGS_CALENDAR': '',
+           'GUNICORN_ACCESS_LOG': '', 'PYTHONWARNINGS': 'ignore'}
+    proc = subprocess.Popen(SERVERS[name], cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url + '/api/cache_stats', timeout=1).ok:
+                return proc, url
+        except requests.RequestException:
+            time.sleep(0.25)
+    proc.kill()
+    raise SystemExit(f"{name} server did not come up")
+
+
+def scan_once(session, url, tickers):
+    payload = {'tickers': tickers, 'market': 'usa',
+               'params': {'require_no_earnings': False, 'lazy_charts': True}}
+    token = session.post(url + '/api/scan_start', json=payload, timeout=30).json()['token']
+    with session.get(url + '/api/scan_stream', params={'token': token}, stream=True, timeout=120) as r:
+        for line in r.iter_lines(decode_unicode=True):
+            if line == 'data: __END__':
+                return
+
+
+def run_load(url, symbols, scan_clients, light_clients, tickers_per_scan, duration):
+    stop = threading.Event()
+    scans, light, errors = [], [], [0]
+    lock = threading.Lock()
+
+    def scanner(seed):
+        rng = np.random.default_rng(seed)
+        session = requests.Session()
+        while not stop.is_set():
+            tickers = list(rng.choice(symbols, size=min(tickers_per_scan, len(symbols)), replace=False))
+            t = time.perf_counter()
+            try:
+                scan_once(session, url, tickers)
+            except requests.RequestException:
+                with lock:
+                    errors[0] += 1
+                continue
+            with lock:
+                scans.append(time.perf_counter() - t)
+
+    def prober(seed):
+        session = requests.Session()
+        i = seed
+        while not stop.is_set():
+            t = time.perf_counter()
+            try:
+                session.get(url + LIGHT_PATHS[i % len(LIGHT_PATHS)], timeout=30).raise_for_status()
+            except requests.RequestException:
+                with lock:
+                    errors[0] += 1
+                continue
+            with lock:
+                light.append(time.perf_counter() - t)
+            i += 1
+
+    threads = ([threading.Thread(target=scanner, args=(i,), daemon=True) for i in range(scan_clients)] +
+               [threading.Thread(target=prober, args=(i,), daemon=True) for i in range(light_clients)])
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join(timeout=120)
+    wall = time.perf_counter() - start
+
+    light_ms = np.array(light) * 1000 if light else np.array([np.nan])
+    return {
+        'scans': len(scans),
+        'scans_per_s': round(len(scans) / wall, 3),
+        'scan_p50_s': round(float(np.median(scans)), 3) if scans else None,
+        'light_requests': len(light),
+        'light_per_s': round(len(light) / wall, 1),
+        'light_p50_ms': round(float(np.percentile(light_ms, 50)), 2),
+        'light_p99_ms': round(float(np.percentile(light_ms, 99)), 2),
+        'errors': errors[0],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Dev server vs gunicorn under scan load')
+    ap.add_argument('--servers', default='dev,gunicorn')
+    ap.add_argument('--symbols', type=int, default=300, help='synthetic symbols in the bar store')
+    ap.add_argument('--tickers', type=int, default=50, help='tickers per scan')
+    ap.add_argument('--scan-clients', type=int, default=4)
+    ap.add_argument('--light-clients', type=int, default=16)
+    ap.add_argument('--duration', type=float, default=20, help='seconds of load per server')
+    ap.add_argument('--out', help='write results JSON here')
+    args = ap.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as store_dir:
+        for name in args.servers.split(','):
+            # Rewritten per server: bars older than the cache TTL would be refreshed from Yahoo
+            symbols = write_fixtures(store_dir, args.symbols)
+            proc, url = start_server(name, free_port(), store_dir)
+            try:
+                # One warm-up scan so worker processes and caches are up before timing
+                scan_once(requests.Session(), url, symbols[:args.tickers])
+                r = results[name] = run_load(url, symbols, args.scan_clients, args.light_clients,
+                                             args.tickers, args.duration)
+            finally:
+                proc.terminate()
+                proc.wait(timeout=90)
+            print(f"{name:9s} scans {r['scans_per_s']:7.3f}/s (p50 {r['scan_p50_s']} s)  "
+                  f"light {r['light_per_s']:8.1f}/s  p50 {r['light_p50_ms']:7.2f} ms  "
+                  f"p99 {r['light_p99_ms']:8.2f} ms  errors {r['errors']}")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
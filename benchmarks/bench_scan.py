@@ -0,0 +1,253 @@
+"""
+bench_scan.py
+Offline benchmark for the scanner hot path.
+
+    python benchmarks/bench_scan.py                       # synthetic, 100 / 1k / 5k symbols
+    python benchmarks/bench_scan.py --fixtures data/bars  # recorded bars (Parquet/CSV per symbol)
+    python benchmarks/bench_scan.py --baseline benchmarks/results/baseline.json
+
+Times _safe_linreg, linreg_candles, linreg_arrays, calculate_tmo, ma, generate_linreg_chart,
+analyze_ticker_local and JSON/SSE encoding per symbol (signal_matrix once per
+universe) and reports throughput, p50/p99 latency and peak traced memory. Results are written as JSON; with
+--baseline every metric is compared and the run fails on regressions.
+"""
+
+import os
+import sys
+import json
+import time
+import glob
+import argparse
+import platform
+import datetime
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import app  # noqa: E402
+from linreg_signals import _safe_linreg  # noqa: E402
+
+SIZES = (100, 1000, 5000)
+
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+def synthetic_frames(count, bars=83, seed=0, end='2025-01-31'):
+    """Random-walk daily OHLCV, the shape yfinance returns for period='120d'."""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp(end), periods=bars, name='Date')
+    frames = {}
+    for i in range(count):
+        close = 50 + 10 * rng.random() + np.cumsum(rng.normal(0, 1, bars))
+        opens = close + rng.normal(0, 0.5, bars)
+        spread = np.abs(rng.normal(0, 0.8, bars))
+        frames[f'SYN{i:05d}'] = pd.DataFrame({
+            'Open': opens, 'High': np.maximum(opens, close) + spread,
+            'Low': np.minimum(opens, close) - spread, 'Close': close,
+            'Volume': rng.integers(1e5, 1e7, bars).astype(float)}, index=index)
+    return frames
+
+
+def recorded_frames(path):
+    """One Parquet/CSV file per symbol, e.g. the scanner's bar store."""
+    frames = {}
+    for f in sorted(glob.glob(os.path.join(path, '*.parquet')) + glob.glob(os.path.join(path, '*.csv'))):
+        sym = os.path.splitext(os.path.basename(f))[0]
+        df = pd.read_parquet(f) if f.endswith('.parquet') else pd.read_csv(f, index_col=0, parse_dates=True)
+        if {'Open', 'High', 'Low', 'Close'} <= set(df.columns) and len(df) >= 30:
+            frames[sym] = df
+    if not frames:
+        raise SystemExit(f"No usable OHLC fixtures in {path}")
+    return frames
+
+
+def universe(frames, size):
+    """`size` symbols, cycling through the fixtures when there are fewer."""
+    names = list(frames)
+    return [(f'{names[i % len(names)]}#{i}', frames[names[i % len(names)]]) for i in range(size)]
+
+
+# ----------------------------------------------------------------------
+# Cases: each returns a per-symbol callable
+# ----------------------------------------------------------------------
+SCAN_PARAMS = {'signal_length': 5, 'sma_signal': True, 'linreg_length': 11,
+               'require_no_earnings': False, 'market': 'usa', 'is_light_mode': False}
+
+
+def case_safe_linreg(sym, df):
+    return lambda: _safe_linreg(df['Close'].values, 11)
+
+
+def case_linreg_candles(sym, df):
+    return lambda: app.linreg_candles(df, signal_length=5, sma_signal=True, linreg_length=11)
+
+
+def case_linreg_arrays(sym, df):
+    return lambda: app.linreg_arrays(df, signal_length=5, sma_signal=True, linreg_length=11)
+
+
+def case_signal_matrix(syms):
+    frames = dict(syms)
+    return lambda: app.signal_matrix(frames, linreg_length=11)
+
+
+def case_calculate_tmo(sym, df):
+    return lambda: app.calculate_tmo(df)
+
+
+def case_ma(sym, df):
+    close = df['Close']
+    return lambda: (app.ma(close, 5, 'EMA'), app.ma(close, 5, 'SMA'), app.ma(close, 5, 'RMA'))
+
+
+def case_generate_linreg_chart(sym, df):
+    candles, signal, buy, sell, _ = app.linreg_candles(df, signal_length=5, linreg_length=11)
+    main, sig, length = app.calculate_tmo(df)
+    return lambda: app.generate_linreg_chart(candles, signal, buy, sell, [], main, sig, length)
+
+
+def case_analyze_ticker_local(sym, df):
+    return lambda: app.analyze_ticker_local(sym, **SCAN_PARAMS)
+
+
+def case_sse_encode(sym, df):
+    res = app.analyze_ticker_local(sym, **SCAN_PARAMS)
+    return lambda: f"data: {json.dumps(res)}\n\n"
+
+
+CASES = {
+    '_safe_linreg': (case_safe_linreg, False),
+    'linreg_candles': (case_linreg_candles, False),
+    'linreg_arrays': (case_linreg_arrays, False),
+    # One call over the whole universe: throughput is universes/s, latency is per universe
+    'signal_matrix': (case_signal_matrix, 'universe'),
+    'calculate_tmo': (case_calculate_tmo, False),
+    'ma': (case_ma, False),
+    # Chart-bound cases run on a sample of the universe (see --sample)
+    'generate_linreg_chart': (case_generate_linreg_chart, True),
+    'analyze_ticker_local': (case_analyze_ticker_local, True),
+    'sse_encode': (case_sse_encode, True),
+}
+
+
+# ----------------------------------------------------------------------
+# Runner
+# ----------------------------------------------------------------------
+def measure(calls):
+    # Each pass starts cold: no incremental indicator state carried over
+    app.INDICATOR_STATES.clear()
+    lat = np.empty(len(calls))
+    start = time.perf_counter()
+    for i, fn in enumerate(calls):
+        t = time.perf_counter()
+        fn()
+        lat[i] = time.perf_counter() - t
+    wall = time.perf_counter() - start
+
+    app.INDICATOR_STATES.clear()
+    tracemalloc.start()
+    for fn in calls:
+        fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'n': len(calls),
+        'throughput_per_s': round(len(calls) / wall, 2),
+        'p50_ms': round(float(np.percentile(lat, 50)) * 1000, 4),
+        'p99_ms': round(float(np.percentile(lat, 99)) * 1000, 4),
+        'peak_mb': round(peak / 2**20, 3),
+    }
+
+
+def load_universe(syms):
+    """Put the fixtures where analyze_ticker_local looks, so nothing hits the network."""
+    app.CACHE.clear()
+    app.INDICATOR_STATES.clear()
+    for sym, df in syms:
+        app.CACHE.set(f"{sym.upper()}_120d", df)
+
+
+def run(frames, sizes, sample, only=None):
+    results = {}
+    for size in sizes:
+        syms = universe(frames, size)
+        load_universe(syms)
+        for name, (factory, sampled) in CASES.items():
+            if only and name not in only:
+                continue
+            if sampled == 'universe':
+                calls = [factory(syms)]
+            else:
+                subset = syms[:sample] if sampled else syms
+                calls = [factory(sym, df) for sym, df in subset]
+            results.setdefault(name, {})[str(size)] = measure(calls)
+            r = results[name][str(size)]
+            print(f"{name:24s} {size:>6d}  n={r['n']:<6d} {r['throughput_per_s']:>10.1f}/s  "
+                  f"p50 {r['p50_ms']:8.3f} ms  p99 {r['p99_ms']:8.3f} ms  peak {r['peak_mb']:8.2f} MB")
+    return results
+
+
+# Lower is better for everything except throughput
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, by_size in results.items():
+        for size, cur in by_size.items():
+            old = baseline.get('results', {}).get(name, {}).get(size)
+            if not old:
+                continue
+            for metric in ('throughput_per_s', 'p50_ms', 'p99_ms', 'peak_mb'):
+                if not old.get(metric):
+                    continue
+                ratio = cur[metric] / old[metric]
+                worse = ratio < 1 - tolerance if metric == 'throughput_per_s' else ratio > 1 + tolerance
+                if worse:
+                    regressions.append(f"{name}[{size}].{metric}: {old[metric]} -> {cur[metric]} (x{ratio:.2f})")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Offline scanner hot-path benchmark')
+    ap.add_argument('--sizes', default=','.join(map(str, SIZES)), help='universe sizes, comma separated')
+    ap.add_argument('--fixtures', help='directory of recorded per-symbol Parquet/CSV bars')
+    ap.add_argument('--sample', type=int, default=200, help='symbols timed for chart/analyze/SSE cases')
+    ap.add_argument('--only', help='comma separated case names')
+    ap.add_argument('--out', default=os.path.join(ROOT, 'benchmarks', 'results', 'latest.json'))
+    ap.add_argument('--baseline', help='earlier results JSON to compare against')
+    ap.add_argument('--tolerance', type=float, default=0.15, help='allowed relative slowdown')
+    args = ap.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    frames = recorded_frames(args.fixtures) if args.fixtures else synthetic_frames(min(max(sizes), 500))
+    only = set(args.only.split(',')) if args.only else None
+
+    results = run(frames, sizes, args.sample, only)
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'machine': platform.machine(), 'fixtures': args.fixtures or 'synthetic', 'sample': args.sample,
+        },
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r}")
+        if regressions:
+            sys.exit(1)
+        print("no regressions against baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""
+cache_utils.py
+Bounded in-memory caches shared by the scanner and the Alpaca blueprint.
+- LRU eviction by entry count and by byte budget
+- Per-entry TTL, swept by a background thread
+- Hit / miss / eviction counters, and an optional on_evict(key, value) hook
+- SingleFlight: concurrent misses for one key share a single upstream call
+"""
+
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+# Returned by get() when the caller needs to tell "cached None" from a miss
+MISSING = object()
+
+
+def sizeof(value) -> int:
+    """Approximate footprint in bytes; DataFrames/Series report their own."""
+    usage = getattr(value, 'memory_usage', None)
+    if callable(usage):
+        try:
+            u = usage(deep=True)
+            return int(u.sum()) if hasattr(u, 'sum') else int(u)
+        except Exception:
+            pass
+    return sys.getsizeof(value)
+
+
+class BoundedCache:
+    def __init__(self, ttl: float, max_entries: int = None, max_bytes: int = None,
+                 sweep_interval: float = 60.0, sizeof=sizeof, on_evict=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._sizeof = sizeof
+        self._on_evict = on_evict       # called outside the lock for entries pushed out by the limits
+        self._data = OrderedDict()      # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._sweeper = None
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[1] > time.monotonic()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[1] <= time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl: float = None):
+        size = self._sizeof(value)
+        with self._lock:
+            evicted = self._put(key, value, ttl, size)
+        self._evicted(evicted)
+        self._ensure_sweeper()
+
+    def refresh(self, key, ttl: float = None) -> bool:
+        """Re-measure and re-time `key` and mark it recently used, if it is
+        still cached (an entry that has grown may push others out)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False
+            evicted = self._put(key, entry[0], ttl, self._sizeof(entry[0]))
+        self._evicted(evicted)
+        return True
+
+    def _put(self, key, value, ttl, size) -> list:
+        evicted = []
+        if key in self._data:
+            old = self._data[key][0]
+            self._drop(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                # Grown past the whole budget: it goes, like any other eviction
+                evicted.append((key, old))
+                self.evictions += 1
+        if self.max_bytes is not None and size > self.max_bytes:
+            return evicted
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl), size)
+        self._bytes += size
+        while self._data and ((self.max_entries is not None and len(self._data) > self.max_entries) or
+                              (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            old = next(iter(self._data))
+            evicted.append((old, self._data[old][0]))
+            self._drop(old)
+            self.evictions += 1
+        return evicted
+
+    def _evicted(self, evicted):
+        if self._on_evict is not None:
+            for key, value in evicted:
+                self._on_evict(key, value)
+
+    def values(self) -> list:
+        """Snapshot of the live (unexpired) values, oldest first."""
+        now = time.monotonic()
+        with self._lock:
+            return [v for v, exp, _ in self._data.values() if exp > now]
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            self._drop(key)
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def sweep(self) -> int:
+        """Drop every expired entry; returns how many were removed."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, (_, exp, _) in self._data.items() if exp <= now]
+            for k in expired:
+                self._drop(k)
+            self.expirations += len(expired)
+        return len(expired)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    def _drop(self, key):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def _ensure_sweeper(self):
+        if self._sweeper is not None or not self.sweep_interval:
+            return
+        with self._lock:
+            if self._sweeper is not None:
+                return
+
+            def run():
+                while True:
+                    time.sleep(self.sweep_interval)
+                    self.sweep()
+
+            self._sweeper = threading.Thread(target=run, name='cache-sweeper', daemon=True)
+            self._sweeper.start()
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run fn once per key at a time; callers arriving while it runs wait and share its result."""
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.calls = self.upstream = self.shared = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.upstream += 1
+            else:
+                self.shared += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = fn(*args, **kwargs)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'upstream_calls': self.upstream,
+                'saved_calls': self.shared,
+                'in_flight': len(self._flights),
+            }
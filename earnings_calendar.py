@@ -0,0 +1,109 @@
+"""
+earnings_calendar.py
+Bulk earnings-calendar index for "earnings within N days" lookups.
+- Loaded once per day from a CSV/Parquet drop or a bulk CSV/JSON endpoint
+- Held as a sorted date array per symbol; lookups never touch the network
+- Symbols the calendar does not cover fall back to the per-symbol scraper
+"""
+
+import io
+import time
+import datetime
+import threading
+
+import numpy as np
+import pandas as pd
+
+from http_session import get_session
+
+_SYMBOL_COLUMNS = ('symbol', 'ticker')
+_DATE_COLUMNS = ('earnings_date', 'report_date', 'date', 'earnings date')
+
+# After a failed load, wait this long before trying the source again
+RETRY_SECONDS = 15 * 60
+
+
+def _pick(columns, names):
+    lower = {c.lower().strip(): c for c in columns}
+    for name in names:
+        if name in lower:
+            return lower[name]
+    raise ValueError(f"Earnings calendar needs one of {names} as a column")
+
+
+def read_source(source: str) -> pd.DataFrame:
+    """Load a calendar drop: local .csv/.parquet/.json, or an http(s) URL serving CSV or JSON."""
+    if source.startswith(('http://', 'https://')):
+        response = get_session().get(source, timeout=30)
+        response.raise_for_status()
+        if 'json' in response.headers.get('Content-Type', '') or source.endswith('.json'):
+            data = response.json()
+            return pd.DataFrame(data.get('data', data) if isinstance(data, dict) else data)
+        return pd.read_csv(io.StringIO(response.text))
+    if source.endswith('.parquet'):
+        return pd.read_parquet(source)
+    if source.endswith('.json'):
+        return pd.read_json(source)
+    return pd.read_csv(source)
+
+
+class EarningsCalendar:
+    def __init__(self, source: str = None, loader=None):
+        """`loader()` must return a DataFrame with symbol and date columns;
+        by default it reads `source` with read_source()."""
+        self.source = source
+        self._loader = loader or (lambda: read_source(self.source))
+        self._index = {}
+        self.loaded_on = None
+        self._failed_at = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._index)
+
+    def load(self):
+        raw = self._loader()
+        sym_col, date_col = _pick(raw.columns, _SYMBOL_COLUMNS), _pick(raw.columns, _DATE_COLUMNS)
+        df = pd.DataFrame({
+            'symbol': raw[sym_col].astype(str).str.strip().str.upper(),
+            'date': pd.to_datetime(raw[date_col], errors='coerce'),
+        }).dropna()
+        df = df[df['symbol'] != '']
+        self._index = {sym: np.unique(grp['date'].values.astype('datetime64[D]'))
+                       for sym, grp in df.groupby('symbol', sort=False)}
+        self.loaded_on = datetime.date.today()
+        self._failed_at = None
+
+    def ensure_fresh(self) -> bool:
+        """Reload once per calendar day; returns whether an index is available."""
+        if self.loaded_on == datetime.date.today():
+            return True
+        with self._lock:
+            if self.loaded_on == datetime.date.today():
+                return True
+            if self._failed_at is not None and time.monotonic() - self._failed_at < RETRY_SECONDS:
+                return self.loaded_on is not None
+            try:
+                self.load()
+            except Exception as e:
+                print(f"[EARNINGS] calendar load failed: {e}")
+                self._failed_at = time.monotonic()
+        return self.loaded_on is not None
+
+    def covers(self, symbol: str) -> bool:
+        return symbol.upper() in self._index
+
+    def next_date(self, symbol: str, today: datetime.date = None):
+        """First earnings date on or after `today`, or None."""
+        dates = self._index.get(symbol.upper())
+        if dates is None:
+            return None
+        today = np.datetime64(today or datetime.date.today(), 'D')
+        i = np.searchsorted(dates, today)
+        return dates[i].item() if i < len(dates) else None
+
+    def within(self, symbol: str, days: int, today: datetime.date = None) -> bool:
+        """True if the symbol reports within the next `days` days (today included)."""
+        today = today or datetime.date.today()
+        nxt = self.next_date(symbol, today)
+        return nxt is not None and (nxt - today).days <= days
@@ -0,0 +1,64 @@
+"""
+gunicorn.conf.py
+Production server settings; every value can be overridden from the environment.
+
+- gthread workers: each request (including a long-lived SSE scan stream) holds
+  a thread, not a whole worker, so streams never block orders or page loads
+- Indicator and chart work already runs in the scan process pool
+  (SCAN_CPU_WORKERS), so one worker with many threads is the default
+- Scan jobs, chart params and caches live in worker memory; with
+  WEB_CONCURRENCY > 1 put a sticky load balancer in front, or a client may
+  resume a scan on a worker that never saw it
+- On SIGTERM each worker first stops taking scans (scan_start answers 503)
+  and drains running ones for up to graceful_timeout - GUNICORN_DRAIN_MARGIN
+  seconds, then shuts down as usual before the arbiter's SIGKILL
+"""
+
+import os
+import signal
+import threading
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 64))
+# gthread workers heartbeat from the main thread, so long SSE streams are not timed out
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 60))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+# Each worker builds its own pools and Alpaca client after fork
+preload_app = False
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None   # '' turns it off
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+# Seconds of graceful_timeout left for the worker to close streams once the drain ends
+drain_margin = int(os.environ.get('GUNICORN_DRAIN_MARGIN', 5))
+
+
+def post_worker_init(worker):
+    # The worker stops serving as soon as handle_exit runs, so drain first:
+    # SIGTERM starts the drain on a thread and handle_exit follows it
+    handle_exit = worker.handle_exit
+    started = threading.Event()
+
+    def drain_then_exit(sig, frame):
+        if started.is_set():
+            return
+        started.set()
+
+        def run():
+            from app import drain_scans
+            try:
+                drain_scans(timeout=max(graceful_timeout - drain_margin, 0))
+            finally:
+                handle_exit(sig, frame)
+        threading.Thread(target=run, name='scan-drain', daemon=True).start()
+
+    worker.handle_exit = drain_then_exit
+    signal.signal(signal.SIGTERM, drain_then_exit)
+
+
+def worker_exit(server, worker):
+    # Exits that skipped the SIGTERM drain: cancel what is left without waiting
+    from app import drain_scans
+    drain_scans(timeout=0)
@@ -0,0 +1,105 @@
+"""
+http_session.py
+One shared HTTP session for every Yahoo fetch in the process.
+- Pooled keep-alive connections (no TLS handshake per symbol)
+- Bounded retries with jittered exponential backoff on 429/5xx and dropped connections,
+  each wait capped (a Retry-After header included)
+- Global token-bucket rate limit shared by all threads
+"""
+
+import os
+import time
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+HTTP_POOL_SIZE = int(os.environ.get('SCAN_HTTP_POOL_SIZE', 32))
+HTTP_MAX_RETRIES = int(os.environ.get('SCAN_HTTP_MAX_RETRIES', 3))
+HTTP_BACKOFF = float(os.environ.get('SCAN_HTTP_BACKOFF', 0.5))      # seconds, doubled per retry
+HTTP_MAX_BACKOFF = float(os.environ.get('SCAN_HTTP_MAX_BACKOFF', 30))  # cap on one wait, Retry-After included
+HTTP_RATE_LIMIT = float(os.environ.get('SCAN_HTTP_RATE', 20))       # requests/s, 0 = unlimited
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class RateLimiter:
+    """Token bucket: `rate` requests per second with bursts of up to `burst`."""
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = rate
+        self.capacity = burst or max(int(rate), 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class PooledSession(requests.Session):
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE, max_retries: int = HTTP_MAX_RETRIES,
+                 backoff: float = HTTP_BACKOFF, rate_limiter: RateLimiter = None,
+                 max_backoff: float = HTTP_MAX_BACKOFF):
+        super().__init__()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+        self.headers['User-Agent'] = 'Mozilla/5.0'
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rate_limiter = rate_limiter or RateLimiter(0)
+        self.retries = 0
+
+    def _sleep(self, attempt: int, retry_after=None):
+        self.retries += 1
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = self.backoff * 2 ** attempt
+        delay = min(max(delay, 0.0), self.max_backoff)
+        # Full jitter keeps a burst of throttled workers from retrying in lockstep
+        time.sleep(random.uniform(0, delay))
+
+    def request(self, method, url, *args, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                self._sleep(attempt)
+                continue
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                retry_after = response.headers.get('Retry-After')
+                response.close()
+                self._sleep(attempt, retry_after)
+                continue
+            return response
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> PooledSession:
+    """The process-wide session (created on first use, so worker processes get their own)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = PooledSession(rate_limiter=RateLimiter(HTTP_RATE_LIMIT))
+    return _session
@@ -0,0 +1,250 @@
+"""
+indicator_state.py
+Incremental LinReg candle + TMO state for one symbol.
+- from_frame(df) builds it in bulk with the vectorized indicator code
+- update(bar) appends a bar, replace_last(bar) revises the newest one
+- Both cost the same whatever the history length
+- Output matches linreg_candles / calculate_tmo over the same bars
+"""
+
+import copy
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from indicators import _tmo_raw
+from linreg_signals import _rolling_linreg, _last_bar_signals
+from scan_format import CANDLE_DTYPE, candle_array, candle_dicts
+
+
+def _finite(x) -> float:
+    x = float(x)
+    return x if math.isfinite(x) else math.nan
+
+
+class _EWM:
+    """ewm(adjust=False).mean() one value at a time, NaN handling included."""
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.mean = math.nan
+        self.old_wt = 1.0
+
+    def push(self, x: float) -> float:
+        if math.isnan(self.mean):
+            if not math.isnan(x):
+                self.mean = x
+            return self.mean
+        self.old_wt *= 1.0 - self.alpha
+        if not math.isnan(x):
+            if self.mean != x:
+                self.mean = (self.old_wt * self.mean + self.alpha * x) / (self.old_wt + self.alpha)
+            self.old_wt = 1.0
+        return self.mean
+
+    def feed(self, x: np.ndarray) -> np.ndarray:
+        """push() over a whole series, from a fresh average."""
+        out = pd.Series(x).ewm(alpha=self.alpha, adjust=False).mean().to_numpy()
+        valid = np.flatnonzero(~np.isnan(x))
+        if len(valid):
+            self.mean = float(out[-1])
+            self.old_wt = (1.0 - self.alpha) ** (len(x) - 1 - valid[-1])
+        return out
+
+
+class _SMA:
+    """rolling(length, min_periods=1).mean() one value at a time."""
+    def __init__(self, length: int):
+        self.window = deque(maxlen=length)
+
+    def push(self, x: float) -> float:
+        self.window.append(x)
+        vals = [v for v in self.window if not math.isnan(v)]
+        return sum(vals) / len(vals) if vals else math.nan
+
+    def feed(self, x: np.ndarray) -> np.ndarray:
+        """push() over a whole series, from an empty window."""
+        self.window.extend(x[-self.window.maxlen:].tolist())
+        return pd.Series(x).rolling(self.window.maxlen, min_periods=1).mean().to_numpy()
+
+
+class _Identity:
+    def push(self, x: float) -> float:
+        return x
+
+    def feed(self, x: np.ndarray) -> np.ndarray:
+        return x
+
+
+def _make_ma(length: int, ma_type: str):
+    """Streaming counterpart of indicators.ma()."""
+    if ma_type == 'EMA':
+        return _EWM(2.0 / (length + 1))
+    if ma_type == 'SMA':
+        return _SMA(length)
+    if ma_type == 'RMA':
+        return _EWM(1.0 / length)
+    return _Identity()
+
+
+def _linreg_endpoint(window: np.ndarray) -> float:
+    """Least-squares endpoint of one window, NaN-compacted like _rolling_linreg."""
+    y = window[~np.isnan(window)]
+    m = len(y)
+    if m < 2:
+        return window[-1]
+    x = np.arange(m, dtype=float)
+    dx = x - (m - 1) / 2.0
+    ybar = y.mean()
+    return ybar + (dx * (y - ybar)).sum() / (dx * dx).sum() * (m - 1) / 2.0
+
+
+class IndicatorState:
+    def __init__(self, signal_length=5, sma_signal=True, linreg_length=11,
+                 tmo_length=14, tmo_calc=5, tmo_smooth=3,
+                 tmo_calc_type='EMA', tmo_smooth_type='EMA', history=60, **_):
+        self.linreg_length = max(int(linreg_length), 1)
+        self.tmo_length = tmo_length
+        self.history = history
+
+        self.count = 0
+        self.last_index = None
+        self._ohlc = deque(maxlen=self.linreg_length)
+        self._opens = deque(maxlen=max(int(tmo_length), 1))
+        self._green = deque(maxlen=6)
+        self._prev_bhigh = self._prev_bclose = math.nan
+        self._bhigh = self._bclose = math.nan
+
+        self._signal_ma = _SMA(signal_length) if sma_signal else _EWM(2.0 / (signal_length + 1))
+        self._tmo_calc = _make_ma(tmo_calc, tmo_calc_type)
+        self._tmo_main = _make_ma(tmo_smooth, tmo_smooth_type)
+        self._tmo_signal = _make_ma(tmo_smooth, tmo_smooth_type)
+
+        self._candles = deque(maxlen=history)     # (bopen, bhigh, blow, bclose, green)
+        self._signal = deque(maxlen=history)
+        self._main_out = deque(maxlen=history)
+        self._signal_out = deque(maxlen=history)
+        self.buy = self.sell = False
+        self._prev = None
+
+    @classmethod
+    def from_frame(cls, df, **params):
+        """State after every bar of `df`. All but the last bar are folded in
+        with the vectorized code; the last one is pushed on its own so that
+        replace_last() works straight away."""
+        state = cls(**params)
+        if len(df):
+            state._seed(df.iloc[:-1])
+            state._prev = state._snapshot()
+            state._push(df.index[-1], df['Open'].iloc[-1], df['High'].iloc[-1], df['Low'].iloc[-1],
+                        df['Close'].iloc[-1])
+        return state
+
+    def _seed(self, df):
+        """Fold the bars of `df` into a fresh state in bulk."""
+        n = len(df)
+        if n == 0:
+            return
+        ohlc = np.column_stack([df[name].to_numpy(dtype=float) for name in ('Open', 'High', 'Low', 'Close')])
+        o, c = ohlc[:, 0], ohlc[:, 3]
+        fitted = _rolling_linreg(ohlc, self.linreg_length)
+        bopen, bhigh, blow, bclose = fitted.T
+        green = bopen < bclose
+        self.count = n
+        self.last_index = df.index[-1]
+
+        # LinReg candles
+        clean = np.where(np.isfinite(ohlc), ohlc, np.nan)
+        self._ohlc.extend(map(tuple, clean[-self.linreg_length:].tolist()))
+        self._green.extend(green[-6:].tolist())
+        self._bhigh, self._bclose = float(bhigh[-1]), float(bclose[-1])
+        if n > 1:
+            self._prev_bhigh, self._prev_bclose = float(bhigh[-2]), float(bclose[-2])
+        keep = slice(-self.history, None) if self.history else slice(None)
+        self._candles.extend(zip(*(col[keep].tolist() for col in (bopen, bhigh, blow, bclose, green))))
+        self._signal.extend(self._signal_ma.feed(bclose)[keep].tolist())
+        if n >= 6:
+            buy, sell = _last_bar_signals(green, c, bhigh, bclose)
+            self.buy, self.sell = bool(buy), bool(sell)
+
+        # TMO
+        self._opens.extend(o[-self._opens.maxlen:].tolist())
+        main = self._tmo_main.feed(self._tmo_calc.feed(_tmo_raw(o, c, self.tmo_length)))
+        self._main_out.extend(main[keep].tolist())
+        self._signal_out.extend(self._tmo_signal.feed(main)[keep].tolist())
+
+    # -- updates -------------------------------------------------------
+    def update(self, bar, index=None):
+        """Append a new bar (mapping or Series with Open/High/Low/Close)."""
+        self._prev = self._snapshot()
+        self._push(bar.name if index is None and hasattr(bar, 'name') else index,
+                   bar['Open'], bar['High'], bar['Low'], bar['Close'])
+
+    def replace_last(self, bar, index=None):
+        """Revise the newest bar, e.g. as an intraday session progresses."""
+        if self._prev is None:
+            raise ValueError("replace_last() needs a preceding update()")
+        prev = self._prev
+        self.__dict__.update(copy.deepcopy(prev))
+        self._prev = prev
+        self._push(bar.name if index is None and hasattr(bar, 'name') else index,
+                   bar['Open'], bar['High'], bar['Low'], bar['Close'])
+
+    def _snapshot(self):
+        return copy.deepcopy({k: v for k, v in self.__dict__.items() if k != '_prev'})
+
+    def _push(self, index, o, h, l, c):
+        # The regression drops inf like NaN; the signal and TMO compare raw prices, as the batch code does
+        o, c = float(o), float(c)
+        self.count += 1
+        self.last_index = index
+
+        # LinReg candles
+        self._ohlc.append((_finite(o), _finite(h), _finite(l), _finite(c)))
+        window = np.array(self._ohlc, dtype=float)
+        bopen, bhigh, blow, bclose = (_linreg_endpoint(window[:, k]) for k in range(4))
+        green = bool(bopen < bclose)
+        self._prev_bhigh, self._prev_bclose = self._bhigh, self._bclose
+        self._bhigh, self._bclose = bhigh, bclose
+        self._green.append(green)
+        self._candles.append((bopen, bhigh, blow, bclose, green))
+        self._signal.append(self._signal_ma.push(bclose))
+
+        # BUY: 5 WHITE -> GREEN above prev LinReg high; SELL: 3 GREEN -> WHITE below prev LinReg close
+        g = list(self._green)
+        self.buy = self.sell = False
+        if self.count >= 6:
+            self.buy = g[-1] and not any(g[-6:-1]) and c > self._prev_bhigh
+            self.sell = not g[-1] and all(g[-4:-1]) and c < self._prev_bclose
+
+        # TMO
+        self._opens.append(o)
+        if self.tmo_length < 1:
+            raw = 0.0
+        else:
+            raw = float(sum((c > op) - (c < op) for op in self._opens))
+        main = self._tmo_main.push(self._tmo_calc.push(raw))
+        self._main_out.append(main)
+        self._signal_out.append(self._tmo_signal.push(main))
+
+    # -- results -------------------------------------------------------
+    def candle_arrays(self):
+        """Same shape as app.linreg_arrays(df) for the bars fed so far."""
+        if self._candles:
+            bo, bh, bl, bc, g = (np.array(col) for col in zip(*self._candles))
+            candles = candle_array(bo, bh, bl, bc, g)
+        else:
+            candles = np.empty(0, dtype=CANDLE_DTYPE)
+        last_i = self.count - 1
+        return (candles, np.array(self._signal), [last_i] if self.buy else [],
+                [last_i] if self.sell else [], [])
+
+    def linreg_candles(self):
+        """Same shape as app.linreg_candles(df) for the bars fed so far."""
+        candles, signal, buy_idx, sell_idx, pivots = self.candle_arrays()
+        return candle_dicts(candles), signal, buy_idx, sell_idx, pivots
+
+    def tmo(self):
+        """Same shape as indicators.calculate_tmo(df)."""
+        return np.array(self._main_out), np.array(self._signal_out), self.tmo_length
@@ -0,0 +1,75 @@
+"""
+indicators.py
+Moving averages and the True Momentum Oscillator, vectorized.
+- ma(): EMA / SMA / RMA over a Series or DataFrame
+- calculate_tmo() for one ticker, calculate_tmo_batch() for a (tickers x bars) universe
+- numpy/pandas only, shared by the app and the incremental IndicatorState
+"""
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# ----------------------------------------------------------------------
+# Moving Average Helper
+# ----------------------------------------------------------------------
+def ma(series, length, ma_type='EMA'):
+    if ma_type == 'EMA':
+        return series.ewm(span=length, adjust=False).mean()
+    if ma_type == 'SMA':
+        return series.rolling(length, min_periods=1).mean()
+    if ma_type == 'RMA':
+        return series.ewm(alpha=1/length, adjust=False).mean()
+    return series
+
+# ----------------------------------------------------------------------
+# True Momentum Oscillator (TMO)
+# ----------------------------------------------------------------------
+def _tmo_raw(opens, closes, length):
+    """Raw TMO score: each close compared against every open in its trailing
+    `length` window (+1 above, -1 below). Works on (bars,) or (tickers x bars);
+    the first `length-1` bars use the shorter window available."""
+    o = np.asarray(opens, dtype=float)
+    c = np.asarray(closes, dtype=float)
+    one_d = o.ndim == 1
+    o, c = np.atleast_2d(o), np.atleast_2d(c)
+    if length < 1 or o.shape[1] == 0:
+        raw = np.zeros(o.shape)
+    else:
+        padded = np.concatenate([np.full((o.shape[0], length - 1), np.nan), o], axis=1)
+        win = sliding_window_view(padded, length, axis=1)   # (tickers, bars, length)
+        cc = c[..., None]
+        raw = ((cc > win).sum(axis=-1) - (cc < win).sum(axis=-1)).astype(float)
+    return raw[0] if one_d else raw
+
+def calculate_tmo(df, length=14, calc_length=5, smooth_length=3,
+                  length_type='EMA', calc_type='EMA', smooth_type='EMA'):
+    data = _tmo_raw(df['Open'].values, df['Close'].values, length)
+
+    data_series = pd.Series(data, index=df.index)
+    MA = ma(data_series, calc_length, calc_type)
+    Main = ma(MA, smooth_length, smooth_type)
+    Signal = ma(Main, smooth_length, smooth_type)
+
+    return Main.values[-60:], Signal.values[-60:], length
+
+def calculate_tmo_batch(opens, closes, length=14, calc_length=5, smooth_length=3,
+                        length_type='EMA', calc_type='EMA', smooth_type='EMA'):
+    """calculate_tmo for a whole universe in one call.
+
+    `opens`/`closes` are (tickers x bars) arrays aligned on their last bar;
+    shorter histories are left-padded with NaN. Returns (tickers x 60) Main and
+    Signal arrays matching calculate_tmo row by row.
+    """
+    c = np.atleast_2d(np.asarray(closes, dtype=float))
+    raw = _tmo_raw(np.atleast_2d(opens), c, length)
+    # Padding before a ticker's first bar must not seed its moving averages
+    raw[np.cumsum(~np.isnan(c), axis=1) == 0] = np.nan
+
+    data = pd.DataFrame(raw.T)
+    MA = ma(data, calc_length, calc_type)
+    Main = ma(MA, smooth_length, smooth_type)
+    Signal = ma(Main, smooth_length, smooth_type)
+
+    return Main.values[-60:].T, Signal.values[-60:].T, length
@@ -0,0 +1,90 @@
+"""
+linreg_signals.py
+LinReg candle math shared by the app, the backtest and the benchmarks.
+- Rolling least-squares endpoints over sliding-window views, NaN/inf-aware
+- BUY/SELL rules of the GREEN/WHITE candles at every bar, or the last bar only
+- numpy/pandas only: importing it does not load Flask, Alpaca or config.ini
+"""
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# ----------------------------------------------------------------------
+# Safe Linear Regression
+# ----------------------------------------------------------------------
+def _rolling_linreg(values, length):
+    """Least-squares endpoint of the trailing `length` bars, for every bar.
+
+    `values` is 1-D (bars) or 2-D (bars x columns); all columns are solved in
+    one pass over a sliding-window view. NaN/inf are dropped from each window
+    and the remaining points are refit on a compacted 0..m-1 axis, exactly as
+    the per-window polyfit did. Windows with fewer than two points fall back
+    to the bar's own value.
+    """
+    a = np.array(values, dtype=float)
+    one_d = a.ndim == 1
+    if one_d:
+        a = a[:, None]
+    a[~np.isfinite(a)] = np.nan
+    n, k = a.shape
+    length = max(int(length), 1)
+    if n == 0:
+        return a[:, 0] if one_d else a
+
+    padded = np.concatenate([np.full((length - 1, k), np.nan), a])
+    win = sliding_window_view(padded, length, axis=0)      # (n, k, length)
+    valid = ~np.isnan(win)
+    m = valid.sum(axis=-1)
+    x = np.cumsum(valid, axis=-1) - 1
+    y = np.where(valid, win, 0.0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        xbar = (m - 1) / 2.0
+        ybar = y.sum(axis=-1) / m
+        dx = np.where(valid, x - xbar[..., None], 0.0)
+        slope = (dx * (y - ybar[..., None])).sum(axis=-1) / (dx * dx).sum(axis=-1)
+        result = ybar + slope * xbar
+
+    result = np.where(m >= 2, result, a)
+    return result[:, 0] if one_d else result
+
+def _safe_linreg(series, length):
+    s = pd.Series(series).replace([np.inf, -np.inf], np.nan)
+    return pd.Series(_rolling_linreg(s.values, length), index=s.index)
+
+# ----------------------------------------------------------------------
+# GREEN/WHITE CANDLES LOGIC
+# ----------------------------------------------------------------------
+def bar_signals(green, close, bhigh, bclose):
+    """BUY/SELL at every bar of (..., bars) arrays.
+
+    BUY: GREEN after 5 WHITE, closing above the previous LinReg high.
+    SELL: WHITE after 3 GREEN, closing below the previous LinReg close.
+    The first 5 bars never signal.
+    """
+    green = np.asarray(green, dtype=bool)
+    close, bhigh, bclose = np.asarray(close), np.asarray(bhigh), np.asarray(bclose)
+    buy = np.zeros(green.shape, dtype=bool)
+    sell = np.zeros(green.shape, dtype=bool)
+    n = green.shape[-1]
+    if n < 6:
+        return buy, sell
+    # GREEN count over the bars before each one, from a running total
+    runs = np.cumsum(green, axis=-1, dtype=np.int32)
+    runs = np.concatenate([np.zeros(green.shape[:-1] + (1,), dtype=np.int32), runs], axis=-1)
+    prev5 = runs[..., 5:n] - runs[..., 0:n - 5]
+    prev3 = runs[..., 5:n] - runs[..., 2:n - 3]
+    now = green[..., 5:]
+    with np.errstate(invalid='ignore'):
+        buy[..., 5:] = now & (prev5 == 0) & (close[..., 5:] > bhigh[..., 4:-1])
+        sell[..., 5:] = ~now & (prev3 == 3) & (close[..., 5:] < bclose[..., 4:-1])
+    return buy, sell
+
+def _last_bar_signals(green, close, bhigh, bclose):
+    """bar_signals() for the last bar of each row only. Rows need at least 6 bars."""
+    green = np.asarray(green, dtype=bool)
+    tail = (green[..., -6:], np.asarray(close)[..., -6:], np.asarray(bhigh)[..., -6:], np.asarray(bclose)[..., -6:])
+    buy, sell = bar_signals(*tail)
+    return buy[..., -1], sell[..., -1]
@@ -0,0 +1,145 @@
+"""
+ohlcv_arena.py
+Shared-memory OHLC bars for the scan's worker processes.
+- One multiprocessing.shared_memory block holds every symbol's open/high/low/close
+  rows back to back, followed by their timestamps
+- A per-symbol (start, length) index; a task ships a small handle, not a pickled DataFrame
+- Workers map the arena per task and read DataFrame views of it, without copying;
+  the mapping is released once the task's views are gone
+"""
+
+import gc
+import sys
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ('Open', 'High', 'Low', 'Close')
+
+
+def _views(buf, bars: int):
+    """(bars x COLUMNS) float64 values and int64 UTC-nanosecond timestamps over `buf`."""
+    values = np.ndarray((bars, len(COLUMNS)), dtype=np.float64, buffer=buf)
+    stamps = np.ndarray((bars,), dtype=np.int64, buffer=buf, offset=bars * len(COLUMNS) * 8)
+    return values, stamps
+
+
+def _utc_ns(index: pd.DatetimeIndex) -> np.ndarray:
+    """int64 UTC nanoseconds of a DatetimeIndex, whatever its unit or pandas version
+    (.values of a tz-aware index is already UTC)."""
+    return index.values.astype('datetime64[ns]').view('i8')
+
+
+class OHLCVArena:
+    def __init__(self, frames):
+        """Copy {key: DataFrame} into a new shared block. Frames without a
+        DatetimeIndex or without all of COLUMNS are left out (see `in`)."""
+        self.index = {}     # key -> (start, length, tz, last timestamp)
+        parts, stamps, positions = [], [], {}
+        start = 0
+        for key, df in frames.items():
+            if df is None or df.empty or not isinstance(df.index, pd.DatetimeIndex):
+                continue
+            layout = tuple(df.columns)
+            if layout not in positions:
+                positions[layout] = ([layout.index(c) for c in COLUMNS]
+                                     if all(c in layout for c in COLUMNS) else None)
+            if positions[layout] is None:
+                continue
+            parts.append(df.to_numpy(dtype=float)[:, positions[layout]])
+            ns = _utc_ns(df.index)
+            stamps.append(ns)
+            tz = str(df.index.tz) if df.index.tz is not None else None
+            self.index[key] = (start, len(df), tz, int(ns[-1]))
+            start += len(df)
+
+        self.bars = start
+        self._shm = shared_memory.SharedMemory(create=True, size=max(start * (len(COLUMNS) + 1) * 8, 1))
+        self.name = self._shm.name
+        self.nbytes = self._shm.size
+        if parts:
+            values, ts = _views(self._shm.buf, start)
+            np.concatenate(parts, out=values)
+            np.concatenate(stamps, out=ts)
+            del values, ts
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def matches(self, key, df) -> bool:
+        """Whether the arena holds the same bars as `df` (same length and last bar)."""
+        entry = self.index.get(key)
+        return (entry is not None and df is not None and len(df) == entry[1]
+                and isinstance(df.index, pd.DatetimeIndex) and int(_utc_ns(df.index[-1:])[0]) == entry[3])
+
+    def handle(self, key) -> tuple:
+        """What a task needs to find `key` in this arena; pass it to frame()."""
+        start, length, tz, _ = self.index[key]
+        return (self.name, self.bars, start, length, tz)
+
+    def close(self):
+        """Release and remove the block. Workers still attached keep their mapping until they drop it."""
+        if self._shm is None:
+            return
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ----------------------------------------------------------------------
+# Worker side
+# ----------------------------------------------------------------------
+# [SharedMemory, values, stamps] still mapped by this worker. numpy does not pin
+# the mapping, so closing it under a live view would crash: every view keeps
+# its base array alive, and a mapping is closed once nothing but this list
+# refers to its base arrays.
+_MAPPED = []
+# Collect reference cycles once this many mappings are waiting on them
+MAPPED_GC_AT = 4
+
+
+def _release_mapped():
+    for entry in list(_MAPPED):
+        # One reference from the entry, one from getrefcount's argument
+        if sys.getrefcount(entry[1]) > 2 or sys.getrefcount(entry[2]) > 2:
+            continue
+        _MAPPED.remove(entry)
+        entry[0].close()
+
+
+def with_frame(handle, fn, *args, **kwargs):
+    """fn(df, *args, **kwargs) with df a read-only DataFrame over one symbol's
+    bars, sharing the arena's memory. The arena is mapped for the call and
+    released as soon as no view of it is left, so a worker does not keep an
+    arena the parent has closed alive between scans."""
+    name, bars, start, length, tz = handle
+    shm = shared_memory.SharedMemory(name=name)
+    values, stamps = _views(shm.buf, bars)
+    values.flags.writeable = False
+    _MAPPED.append([shm, values, stamps])
+    index = None
+    try:
+        index = pd.DatetimeIndex(stamps[start:start + length].view('M8[ns]'))
+        if tz:
+            index = index.tz_localize('UTC').tz_convert(tz)
+        return fn(pd.DataFrame(values[start:start + length], columns=list(COLUMNS), index=index, copy=False),
+                  *args, **kwargs)
+    finally:
+        del values, stamps, index
+        _release_mapped()
+        if len(_MAPPED) >= MAPPED_GC_AT:
+            gc.collect()
+            _release_mapped()
@@ -0,0 +1,116 @@
+"""
+scan_format.py
+Array form of LinReg candles and the compact wire formats for batch scans.
+- Candles are one structured array (open/high/low/close/green) per ticker
+- encode_packed: JSON header + one little-endian float32 block for every series
+- encode_arrow: a single Arrow IPC record batch, one row per ticker
+"""
+
+import io
+import json
+import struct
+
+import numpy as np
+
+CANDLE_DTYPE = np.dtype([('open', 'f8'), ('high', 'f8'), ('low', 'f8'), ('close', 'f8'), ('green', '?')])
+GREEN, WHITE = '#10b981', '#ff8c00'
+
+# Per-ticker float series shipped by the batch endpoint, in block order
+SERIES = ('open', 'high', 'low', 'close', 'green', 'signal_line', 'tmo_main', 'tmo_signal')
+# Per-ticker scalars carried in the header / as plain Arrow columns
+FIELDS = ('ticker', 'success', 'error', 'price', 'signal', 'score', 'earnings_date', 'no_earnings_ok')
+
+PACKED_MIMETYPE = 'application/x-scan-packed'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+
+def candle_array(bopen, bhigh, blow, bclose, green=None) -> np.ndarray:
+    """LinReg OHLC columns as candles, rounded to 4 places with NaN as 0 like the dict form."""
+    n = len(bclose)
+    out = np.empty(n, dtype=CANDLE_DTYPE)
+    for name, col in zip(('open', 'high', 'low', 'close'), (bopen, bhigh, blow, bclose)):
+        col = np.asarray(col, dtype=float)
+        out[name] = np.where(np.isnan(col), 0.0, np.round(col, 4))
+    out['green'] = np.asarray(bopen) < np.asarray(bclose) if green is None else green
+    return out
+
+
+def candle_dicts(candles: np.ndarray) -> list:
+    """The list-of-dicts candles the chart code and older callers take."""
+    return [{'open': float(o), 'high': float(h), 'low': float(l), 'close': float(c),
+             'color': GREEN if g else WHITE}
+            for o, h, l, c, g in candles.tolist()]
+
+
+def _series(res: dict) -> dict:
+    candles = res.get('candles')
+    if candles is None:
+        candles = np.empty(0, dtype=CANDLE_DTYPE)
+    return {
+        'open': candles['open'], 'high': candles['high'], 'low': candles['low'],
+        'close': candles['close'], 'green': candles['green'],
+        'signal_line': res.get('signal_line', ()), 'tmo_main': res.get('tmo_main', ()),
+        'tmo_signal': res.get('tmo_signal', ()),
+    }
+
+
+def encode_packed(results) -> bytes:
+    """<u4 header length, UTF-8 JSON header, then float32 data.
+
+    The header lists the tickers with their scalar fields and, per ticker,
+    where each series starts in the float32 block and how long it is.
+    """
+    rows, blocks, offset = [], [], 0
+    for res in results:
+        row = {k: res.get(k) for k in FIELDS}
+        spans = {}
+        for name, values in _series(res).items():
+            arr = np.asarray(values, dtype='<f4')
+            spans[name] = [offset, len(arr)]
+            blocks.append(arr)
+            offset += len(arr)
+        row['series'] = spans
+        rows.append(row)
+    header = json.dumps({'version': 1, 'dtype': '<f4', 'series': SERIES, 'rows': rows}).encode()
+    data = np.concatenate(blocks) if blocks else np.empty(0, dtype='<f4')
+    return struct.pack('<I', len(header)) + header + data.tobytes()
+
+
+def decode_packed(blob: bytes):
+    """Inverse of encode_packed: list of dicts with float32 arrays per series."""
+    (size,) = struct.unpack_from('<I', blob)
+    header = json.loads(blob[4:4 + size])
+    data = np.frombuffer(blob, dtype=header['dtype'], offset=4 + size)
+    out = []
+    for row in header['rows']:
+        spans = row.pop('series')
+        row.update({name: data[start:start + length] for name, (start, length) in spans.items()})
+        out.append(row)
+    return out
+
+
+def encode_arrow(results) -> bytes:
+    """One Arrow IPC stream with a row per ticker and list<float32> series columns."""
+    import pyarrow as pa
+
+    results = list(results)
+    columns = {k: [r.get(k) for r in results] for k in FIELDS}
+    series = [_series(r) for r in results]
+    arrays = {
+        'ticker': pa.array(columns['ticker'], pa.string()),
+        'success': pa.array(columns['success'], pa.bool_()),
+        'error': pa.array(columns['error'], pa.string()),
+        'price': pa.array(columns['price'], pa.float32()),
+        'signal': pa.array(columns['signal'], pa.string()).dictionary_encode(),
+        'score': pa.array(columns['score'], pa.int16()),
+        'earnings_date': pa.array(columns['earnings_date'], pa.string()),
+        'no_earnings_ok': pa.array(columns['no_earnings_ok'], pa.bool_()),
+    }
+    for name in SERIES:
+        kind = pa.bool_() if name == 'green' else pa.float32()
+        arrays[name] = pa.array([np.asarray(s[name]) for s in series], pa.list_(kind))
+    batch = pa.RecordBatch.from_pydict(arrays)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue()
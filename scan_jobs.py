@@ -0,0 +1,77 @@
+"""
+scan_jobs.py
+Server-side scan jobs that outlive the HTTP connection watching them.
+- A job runs its scan on a background thread and buffers every result
+- Results are numbered, so a client can resume from the last one it saw
+- Readers block on a condition instead of polling
+"""
+
+import time
+import uuid
+import threading
+
+
+class ScanJob:
+    def __init__(self, run, on_done=None, on_result=None):
+        """`run()` returns an iterator of already-encoded results; `on_result(job)`
+        is called after each one is buffered and `on_done(job)` once it is
+        exhausted (or raised)."""
+        self.id = str(uuid.uuid4())
+        self.results = []
+        self.nbytes = 0         # size of the buffered results
+        self.done = False
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self._run = run
+        self._on_done = on_done
+        self._on_result = on_result
+        self._cancelled = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._work, name=f'scan-job-{self.id[:8]}', daemon=True)
+        self._thread.start()
+        return self
+
+    def _work(self):
+        try:
+            for item in self._run():
+                with self._cond:
+                    self.results.append(item)
+                    self.nbytes += len(item)
+                    self._cond.notify_all()
+                if self._on_result:
+                    self._on_result(self)
+                if self._cancelled:
+                    break
+        except Exception as e:
+            print(f"[SCAN] job {self.id} failed: {e}")
+            self.error = str(e) or 'Scan failed'
+        finally:
+            with self._cond:
+                self.done = True
+                self.finished = time.time()
+                self._cond.notify_all()
+            if self._on_done:
+                self._on_done(self)
+
+    def cancel(self):
+        self._cancelled = True
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wait_from(self, seq: int, timeout: float = None):
+        """Results after the first `seq`, waiting up to `timeout` for new ones.
+        Returns (results, done)."""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self.results) > seq or self.done, timeout)
+            return self.results[seq:], self.done
+
+    def status(self) -> dict:
+        with self._cond:
+            return {'id': self.id, 'results': len(self.results), 'done': self.done, 'error': self.error,
+                    'created': self.created, 'finished': self.finished}
@@ -0,0 +1,130 @@
+"""AlpacaTrader batch validation and submission against stand-in clients."""
+
+import threading
+import time
+import uuid
+import datetime
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+alpaca_wrapper = pytest.importorskip('alpaca_wrapper')
+from alpaca.trading.enums import OrderStatus  # noqa: E402
+
+
+class FakeTrading:
+    def __init__(self, buying_power=10_000.0, fail=(), delay=0.0):
+        self.buying_power = buying_power
+        self.fail = set(fail)
+        self.delay = delay
+        self.submitted = []
+        self.active = self.peak = 0
+        self._lock = threading.Lock()
+
+    def get_account(self):
+        return SimpleNamespace(id='acct', equity=self.buying_power, cash=self.buying_power,
+                               buying_power=self.buying_power)
+
+    def get_all_positions(self):
+        return []
+
+    def submit_order(self, req):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            if req.symbol in self.fail:
+                raise RuntimeError(f"insufficient qty for {req.symbol}")
+            self.submitted.append(req)
+            return SimpleNamespace(id=uuid.uuid4(), symbol=req.symbol, status=OrderStatus.FILLED,
+                                   qty=req.qty, notional=req.notional, filled_qty=req.qty,
+                                   filled_avg_price=1.0, submitted_at=datetime.datetime.now(datetime.timezone.utc))
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class FakeData:
+    def __init__(self, asks):
+        self.asks = asks
+        self.requests = []
+
+    def get_stock_latest_quote(self, req):
+        self.requests.append(list(req.symbol_or_symbols))
+        return {sym: SimpleNamespace(bid_price=self.asks[sym] - 0.01, ask_price=self.asks[sym], bid_size=1,
+                                     ask_size=1, timestamp=None)
+                for sym in req.symbol_or_symbols if sym in self.asks}
+
+
+def trader(buying_power=10_000.0, asks=None, **kwargs):
+    return alpaca_wrapper.AlpacaTrader(FakeTrading(buying_power, **kwargs), FakeData(asks or {}))
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def make(t):
+        monkeypatch.setattr(alpaca_wrapper, '_trader', t)
+        app = Flask(__name__)
+        app.register_blueprint(alpaca_wrapper.alpaca_app, url_prefix='/alpaca')
+        return app.test_client()
+    return make
+
+
+def test_one_invalid_entry_rejects_the_batch(client):
+    t = trader()
+    orders = [{'symbol': 'AAPL', 'notional': 100}, {'symbol': 'bad symbol!', 'qty': 1},
+              {'symbol': 'MSFT', 'qty': 2, 'notional': 10}, {'symbol': 'IBM', 'notional': 50}]
+    resp = client(t).post('/alpaca/orders/batch', json={'orders': orders})
+    assert resp.status_code == 400
+    body = resp.get_json()
+    assert body['success'] is False and 'results' not in body
+    assert [e['index'] for e in body['errors']] == [1, 2]
+    assert "Invalid symbol" in body['errors'][0]['message']
+    assert t.trading_client.submitted == []
+
+
+def test_batch_over_buying_power_is_refused():
+    t = trader(buying_power=500.0)
+    result = t.submit_batch([{'symbol': 'AAPL', 'notional': 300}, {'symbol': 'MSFT', 'qty': 2, 'type': 'limit',
+                                                                   'limit': 150}])
+    assert result['success'] is False and result['errors'] == []
+    assert result['est_total'] == 600.0 and result['buying_power'] == 500.0
+    assert "exceeds buying power" in result['message']
+    assert t.trading_client.submitted == []
+
+
+def test_share_market_orders_are_costed_at_the_ask():
+    t = trader(asks={'AAPL': 200.0, 'MSFT': 400.0})
+    orders, errors, summary = t.validate_orders([{'symbol': 'AAPL', 'qty': 3}, {'symbol': 'MSFT', 'qty': 0.5},
+                                                 {'symbol': 'IBM', 'notional': 25},
+                                                 {'symbol': 'TSLA', 'qty': 1}])
+    assert (orders[0]['est_price'], orders[0]['est_cost']) == (200.0, 600.0)
+    assert (orders[1]['est_price'], orders[1]['est_cost']) == (400.0, 200.0)
+    assert orders[2]['est_cost'] == 25
+    # One quote request for every share-sized market order; no quote means no estimate
+    assert [sorted(r) for r in t.data_client.requests] == [['AAPL', 'MSFT', 'TSLA']]
+    assert errors == {3: "No quote for TSLA to estimate cost"}
+    assert summary['est_total'] == 825.0 and 'message' in summary
+
+
+def test_partial_submit_failures_are_per_order(client):
+    t = trader(fail={'MSFT'})
+    orders = [{'symbol': 'AAPL', 'notional': 100}, {'symbol': 'MSFT', 'notional': 100},
+              {'symbol': 'IBM', 'notional': 100}]
+    resp = client(t).post('/alpaca/orders/batch', json={'orders': orders})
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body['success'] is False and body['submitted'] == 2
+    results = sorted(body['results'], key=lambda r: r['index'])
+    assert [r['success'] for r in results] == [True, False, True]
+    assert results[1]['symbol'] == 'MSFT' and 'insufficient' in results[1]['message']
+    assert results[0]['status'] == 'filled' and results[0]['symbol'] == 'AAPL'
+
+
+def test_submits_stay_within_max_workers():
+    t = trader(delay=0.05)
+    result = t.submit_batch([{'symbol': 'AAPL', 'notional': 10}] * 12, max_workers=3)
+    assert result['success'] is True and result['submitted'] == 12
+    assert 1 < t.trading_client.peak <= 3
@@ -0,0 +1,105 @@
+"""Vectorized backtest against a bar-by-bar loop over the same rules."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import FILLS, run_backtest
+from linreg_signals import _rolling_linreg
+
+
+def loop_trades(sym, df, fill, slippage_bps, fee_bps, linreg_length=11):
+    """Walk every bar: the original linreg_candles rules, long only, one position at a time."""
+    o, h, c = df['Open'].values, df['High'].values, df['Close'].values
+    bopen, bhigh, bclose = _rolling_linreg(np.column_stack([o, h, c]), linreg_length).T
+    r = bopen < bclose
+    n = len(c)
+    px = o if fill == 'next_open' else c
+    shift = 0 if fill == 'close' else 1
+    slip, fee = slippage_bps / 1e4, fee_bps / 1e4
+    dates = np.asarray(df.index, dtype='datetime64[D]')
+
+    trades, entry = [], None
+    for i in range(5, n):
+        last_five_red = not r[i-1] and not r[i-2] and not r[i-3] and not r[i-4] and not r[i-5]
+        last_three_green = r[i-1] and r[i-2] and r[i-3]
+        buy = r[i] and not r[i-1] and c[i] > bhigh[i-1] and last_five_red
+        sell = not r[i] and r[i-1] and c[i] < bclose[i-1] and last_three_green
+        if entry is None and buy:
+            entry = (i, i + shift)
+        elif entry is not None and sell:
+            signal, at = entry
+            entry = None
+            if at >= n:
+                continue
+            out = i + shift
+            if out >= n:
+                trades.append((signal, at, n - 1, c[n - 1], True))
+            else:
+                trades.append((signal, at, out, px[out] * (1 - slip) * (1 - fee), False))
+    if entry is not None and entry[1] < n:
+        trades.append((entry[0], entry[1], n - 1, c[n - 1], True))
+
+    rows = []
+    for signal, at, out, exit_px, is_open in trades:
+        entry_px = px[at] * (1 + slip) * (1 + fee)
+        ret = exit_px / entry_px - 1
+        if np.isfinite(ret):
+            rows.append({'symbol': sym, 'signal_date': dates[signal], 'entry_date': dates[at],
+                         'exit_date': dates[out], 'entry_price': entry_px, 'exit_price': exit_px,
+                         'return': ret, 'bars': out - at, 'open': is_open})
+    return rows
+
+
+def universe(seed, count=40):
+    rng = np.random.default_rng(seed)
+    frames = {}
+    for k in range(count):
+        n = int(rng.integers(8, 400))
+        close = 200 + np.cumsum(rng.normal(0, 1.5, n))
+        opens = close + rng.normal(0, 0.8, n)
+        df = pd.DataFrame({'Open': opens, 'High': np.maximum(opens, close) + rng.random(n),
+                           'Low': np.minimum(opens, close) - rng.random(n), 'Close': close},
+                          index=pd.bdate_range(end='2024-06-28', periods=n))
+        if k % 5 == 0:
+            df.iloc[rng.integers(0, n, 2), rng.integers(0, 4)] = np.nan
+        frames[f"S{k:03d}"] = df
+    return frames
+
+
+@pytest.mark.parametrize('fill', FILLS)
+def test_trades_match_loop(fill):
+    frames = universe(FILLS.index(fill))
+    result = run_backtest(frames, fill=fill, slippage_bps=5, fee_bps=2, chunk_size=7)
+    trades = result['trades'].reset_index(drop=True)
+
+    expected = pd.DataFrame([row for sym, df in frames.items()
+                             for row in loop_trades(sym, df, fill, 5, 2)])
+    assert len(expected) > 50
+    assert len(trades) == len(expected)
+    for col in ('symbol', 'bars', 'open'):
+        assert trades[col].tolist() == expected[col].tolist(), col
+    for col in ('signal_date', 'entry_date', 'exit_date'):
+        np.testing.assert_array_equal(trades[col].values.astype('datetime64[D]'),
+                                      expected[col].values.astype('datetime64[D]'))
+    for col in ('entry_price', 'exit_price', 'return'):
+        np.testing.assert_allclose(trades[col].values, expected[col].values, rtol=1e-12)
+
+    summary = result['summary']
+    closed = expected[~expected['open']]
+    assert summary['trades'] == len(closed)
+    assert summary['open_positions'] == int(expected['open'].sum())
+    assert summary['win_rate'] == pytest.approx((closed['return'] > 0).mean())
+
+
+def test_costs_lower_every_return():
+    frames = universe(9, count=10)
+    free = run_backtest(frames, fill='close')['trades']
+    costly = run_backtest(frames, fill='close', slippage_bps=10, fee_bps=5)['trades']
+    closed = ~free['open'].values
+    assert (costly['return'].values[closed] < free['return'].values[closed]).all()
+
+
+def test_rejects_unknown_fill():
+    with pytest.raises(ValueError):
+        run_backtest({}, fill='vwap')
@@ -0,0 +1,64 @@
+"""BarArchive round trip and zero-copy slicing."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bar_archive import COLUMNS, BarArchive, build_archive
+
+
+def _bars(seed, n, end=None):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({'Open': close + rng.normal(0, 0.5, n), 'High': close + 1, 'Low': close - 1,
+                         'Close': close, 'Volume': rng.integers(1, 10**6, n).astype(float)},
+                        index=pd.bdate_range(end=end or pd.Timestamp.today().normalize(), periods=n, name='Date'))
+
+
+@pytest.fixture(params=('float64', 'float32'))
+def archive(request, tmp_path):
+    drops = tmp_path / 'drops'
+    drops.mkdir()
+    frames = {'AAA': _bars(1, 800), 'BBB': _bars(2, 30), 'CCC': _bars(3, 300, end='2024-05-31')}
+    for sym, df in frames.items():
+        df.to_csv(drops / f"{sym}.csv")
+    stats = build_archive(str(tmp_path / 'archive'), [str(drops)], dtype=request.param)
+    assert stats['symbols'] == 3 and stats['rows'] == 1130
+    return BarArchive(str(tmp_path / 'archive')), frames, np.dtype(request.param)
+
+
+def test_round_trip(archive):
+    arc, frames, dtype = archive
+    assert sorted(arc.symbols()) == sorted(frames) and arc.columns == COLUMNS
+    for sym, df in frames.items():
+        got = arc.frame(sym)
+        assert list(got.columns) == list(COLUMNS)
+        np.testing.assert_array_equal(got.index.values.astype('datetime64[D]'),
+                                      df.index.values.astype('datetime64[D]'))
+        np.testing.assert_allclose(got.values, df[list(COLUMNS)].to_numpy(dtype=dtype), rtol=1e-15)
+        assert arc.last_date(sym) == df.index[-1]
+
+
+def test_frames_and_arrays_share_the_mapping(archive):
+    arc, _, _ = archive
+    df = arc.frame('AAA', period='1y')
+    cols = arc.arrays('AAA', period='1y')
+    for name in COLUMNS:
+        assert np.shares_memory(df[name].values, arc._bars)
+        assert np.shares_memory(cols[name], arc._bars)
+    assert np.shares_memory(df.values, arc._bars)
+    assert not df.values.flags.writeable
+
+
+def test_trimming_and_matrix(archive):
+    arc, frames, _ = archive
+    assert len(arc.frame('AAA', bars=100)) == 100
+    year = arc.frame('AAA', period='1y')
+    assert 240 < len(year) < 270
+    assert year.index[-1] == frames['AAA'].index[-1]
+    assert len(arc.frame('CCC', period='5d')) == 0
+
+    symbols, cols, lengths = arc.matrix(['AAA', 'BBB', 'ZZZ'], bars=50)
+    assert symbols == ['AAA', 'BBB'] and lengths.tolist() == [50, 30]
+    np.testing.assert_allclose(cols['Close'][0], frames['AAA']['Close'].values[-50:], rtol=1e-6)
+    assert np.isnan(cols['Close'][1, :20]).all()
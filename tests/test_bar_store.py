@@ -0,0 +1,103 @@
+"""BarStore top-ups across upstream split/dividend re-adjustments."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bar_store import BarStore, readjusted, since_period
+
+
+def _bars(n, end=None, scale=1.0, **actions):
+    close = (100 + np.arange(n, dtype=float)) * scale
+    df = pd.DataFrame({'Open': close - 0.5, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                       'Volume': np.full(n, 1000.0), 'Dividends': 0.0, 'Stock Splits': 0.0},
+                      index=pd.bdate_range(end=end or pd.Timestamp.today().normalize(), periods=n, name='Date'))
+    for col, date in actions.items():
+        df.loc[pd.Timestamp(date), 'Stock Splits' if col == 'split' else 'Dividends'] = 2.0
+    return df
+
+
+def test_plain_top_up_is_not_readjusted():
+    full = _bars(40)
+    stored, new = full.iloc[:-3], full.iloc[-4:].copy()
+    # The last stored bar was a partial session: only its close moved
+    new.iloc[0, new.columns.get_loc('Close')] += 3
+    assert not readjusted(stored, new)
+    assert not readjusted(None, new) and not readjusted(stored, new.iloc[:0])
+
+
+def test_actions_after_the_stored_bars_are_readjusted():
+    full = _bars(40)
+    assert readjusted(full.iloc[:-3], _bars(40, split=full.index[-1]).iloc[-4:])
+    assert readjusted(full.iloc[:-3], _bars(40, dividend=full.index[-2]).iloc[-4:])
+    # An action on the overlapping bar was already in the stored prices
+    assert not readjusted(full.iloc[:-3], _bars(40, split=full.index[-4]).iloc[-4:])
+
+
+def test_rescaled_overlap_is_readjusted():
+    # yf.download returns no action columns; the overlapping Open gives it away
+    stored = _bars(40).iloc[:-3]
+    new = _bars(40, scale=0.98).iloc[-4:].drop(columns=['Dividends', 'Stock Splits'])
+    assert readjusted(stored, new)
+
+
+def test_since_period():
+    assert since_period('max') == since_period(None) == 'max'
+    assert since_period(pd.Timestamp.today().normalize() - pd.Timedelta(days=9)) == '10d'
+
+
+def test_append_replace_keeps_since(tmp_path):
+    store = BarStore(str(tmp_path))
+    since = pd.Timestamp('2020-01-01')
+    store.append('AAA', _bars(40), since=since)
+    merged = store.append('AAA', _bars(10, scale=0.5), replace=True)
+    assert len(merged) == 10
+    stored, stored_since = store.read('AAA')
+    assert len(stored) == 10 and stored_since == since
+    np.testing.assert_allclose(stored['Close'].to_numpy(), _bars(10, scale=0.5)['Close'].to_numpy())
+
+
+def test_prefetch_refetches_readjusted_history(tmp_path, monkeypatch):
+    app = pytest.importorskip('app')
+    store = BarStore(str(tmp_path))
+    store.append('AAA', _bars(60).iloc[:-3], since='max')
+    store.append('BBB', _bars(60).iloc[:-3], since='max')
+    monkeypatch.setattr(app, 'BAR_STORE', store)
+    monkeypatch.setattr(app.CACHE, 'ttl', 0)
+    split = _bars(60, scale=0.5, split=_bars(60).index[-1])
+    calls = []
+
+    def downloader(symbols, period):
+        calls.append((tuple(symbols), period))
+        frames = {'AAA': split, 'BBB': _bars(60)}
+        return {s: frames[s] if period == 'max' else frames[s].iloc[-4:] for s in symbols}
+
+    assert app.prefetch_cached_data(['AAA', 'BBB'], period='60d', downloader=downloader) == 2
+    assert calls[-1] == (('AAA',), 'max')
+    aaa, _ = store.read('AAA')
+    np.testing.assert_allclose(aaa['Close'].to_numpy(), split['Close'].to_numpy())
+    bbb, _ = store.read('BBB')
+    np.testing.assert_allclose(bbb['Close'].to_numpy(), _bars(60)['Close'].to_numpy())
+
+
+def test_load_bars_refetches_readjusted_history(tmp_path, monkeypatch):
+    app = pytest.importorskip('app')
+    store = BarStore(str(tmp_path))
+    store.append('AAA', _bars(60).iloc[:-3], since=pd.Timestamp.today().normalize() - pd.Timedelta(days=200))
+    monkeypatch.setattr(app, 'BAR_STORE', store)
+    monkeypatch.setattr(app.CACHE, 'ttl', 0)
+    split = _bars(60, scale=0.5, split=_bars(60).index[-1])
+    calls = []
+
+    class Ticker:
+        def __init__(self, symbol, session=None):
+            pass
+
+        def history(self, period=None, start=None, interval='1d'):
+            calls.append(period or 'start')
+            return split if period else split[split.index >= pd.Timestamp(start)]
+
+    monkeypatch.setattr(app.yf, 'Ticker', Ticker)
+    df = app._load_bars('AAA', '60d')
+    assert calls == ['start', '201d']
+    np.testing.assert_allclose(df['Close'].to_numpy(), app.trim(split, '60d')['Close'].to_numpy())
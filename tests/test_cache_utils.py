@@ -0,0 +1,45 @@
+"""BoundedCache eviction hook."""
+
+from cache_utils import BoundedCache
+
+
+def test_on_evict_sees_entries_pushed_out():
+    evicted = []
+    cache = BoundedCache(ttl=60, max_entries=2, sweep_interval=0, on_evict=lambda k, v: evicted.append((k, v)))
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.set('a', 3)       # replacing a key is not an eviction
+    assert evicted == []
+    cache.set('c', 4)
+    assert evicted == [('b', 2)]
+    assert cache.pop('a') == 3 and evicted == [('b', 2)]
+    assert cache.stats()['evictions'] == 1
+
+
+def test_on_evict_runs_after_the_entry_is_gone():
+    seen = []
+    cache = BoundedCache(ttl=60, max_entries=1, sweep_interval=0,
+                         on_evict=lambda k, v: seen.append((k in cache, len(cache))))
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert seen == [(False, 1)]
+
+
+def test_refresh_remeasures_and_retimes():
+    sizes = {'a': 10, 'b': 10}
+    evicted = []
+    cache = BoundedCache(ttl=0.05, max_bytes=25, sweep_interval=0, sizeof=lambda k: sizes[k],
+                         on_evict=lambda k, v: evicted.append(k))
+    cache.set('a', 'a', ttl=float('inf'))
+    cache.set('b', 'b')
+    assert not cache.refresh('missing')
+
+    # 'a' grows: refreshing it pushes out the least recently used entry
+    sizes['a'] = 20
+    assert cache.refresh('a', ttl=float('inf'))
+    assert evicted == ['b'] and cache.stats()['bytes'] == 20
+
+    # Grown past the whole budget: dropped and reported like any eviction
+    sizes['a'] = 30
+    assert cache.refresh('a')
+    assert evicted == ['b', 'a'] and 'a' not in cache and cache.stats()['bytes'] == 0
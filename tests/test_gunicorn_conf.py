@@ -0,0 +1,54 @@
+"""gunicorn.conf.py: SIGTERM drains running scans before the worker stops."""
+
+import os
+import runpy
+import signal
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from cache_utils import BoundedCache
+from scan_jobs import ScanJob
+
+app = pytest.importorskip('app')
+
+CONF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    monkeypatch.setattr(app, 'SCAN_JOBS', BoundedCache(ttl=60, max_entries=10))
+    monkeypatch.setattr(app, '_DRAINING', threading.Event())
+    timeouts = []
+    drain = app.drain_scans
+    monkeypatch.setattr(app, 'drain_scans', lambda timeout=None: timeouts.append(timeout) or drain(timeout))
+    exited = threading.Event()
+    w = SimpleNamespace(handle_exit=lambda sig, frame: exited.set())
+    previous = signal.getsignal(signal.SIGTERM)
+    conf = runpy.run_path(CONF)
+    conf['post_worker_init'](w)
+    yield w, exited, timeouts, conf
+    signal.signal(signal.SIGTERM, previous)
+
+
+def test_sigterm_drains_before_the_worker_exits(worker):
+    w, exited, timeouts, conf = worker
+    gate = threading.Event()
+
+    def run():
+        gate.wait(5)
+        yield {'ticker': 'AAA'}
+    job = ScanJob(run).start()
+    app.SCAN_JOBS.set(job.id, job, ttl=float('inf'))
+
+    signal.getsignal(signal.SIGTERM)(signal.SIGTERM, None)
+    w.handle_exit(signal.SIGTERM, None)         # a second SIGTERM changes nothing
+    assert not exited.wait(0.3)
+    # Still serving: new scans are turned away instead of being cut off later
+    resp = app.app.test_client().post('/api/scan_start', json={'tickers': ['AAA']})
+    assert resp.status_code == 503
+
+    gate.set()
+    assert exited.wait(5) and job.done
+    assert timeouts == [conf['graceful_timeout'] - conf['drain_margin']]
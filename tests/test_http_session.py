@@ -0,0 +1,94 @@
+"""PooledSession retries and RateLimiter spacing against a local HTTP stub."""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_session import PooledSession, RateLimiter
+
+
+class _Stub(BaseHTTPRequestHandler):
+    # (status, headers) per request in order; 200 once the script runs out
+    script = []
+    hits = []
+
+    def do_GET(self):
+        self.hits.append(time.monotonic())
+        status, headers = self.script.pop(0) if self.script else (200, {})
+        body = b'ok' if status == 200 else b'slow down'
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Stub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    _Stub.script, _Stub.hits = [], []
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_retries_429_then_succeeds(stub):
+    _Stub.script = [(429, {'Retry-After': '120'}), (429, {})]
+    session = PooledSession(pool_size=2, max_retries=3, backoff=0.05, max_backoff=0.2)
+    start = time.monotonic()
+    response = session.get(stub, timeout=5)
+    elapsed = time.monotonic() - start
+
+    assert response.status_code == 200 and response.text == 'ok'
+    assert session.retries == 2
+    assert len(_Stub.hits) == 3
+    # Retry-After is capped at max_backoff; the second wait is at most backoff * 2
+    assert elapsed < 0.2 + 0.1 + 1.0
+
+
+def test_gives_up_after_max_retries(stub):
+    _Stub.script = [(429, {})] * 5
+    session = PooledSession(pool_size=2, max_retries=2, backoff=0.01)
+    response = session.get(stub, timeout=5)
+
+    assert response.status_code == 429
+    assert session.retries == 2
+    assert len(_Stub.hits) == 3
+
+
+def test_rate_limiter_spaces_requests(stub):
+    rate = 20.0
+    session = PooledSession(pool_size=4, max_retries=0, rate_limiter=RateLimiter(rate, burst=1))
+    threads = [threading.Thread(target=lambda: session.get(stub, timeout=5).close()) for _ in range(8)]
+    start = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - start
+
+    assert len(_Stub.hits) == 8
+    # A burst of one: after the first token, one request per 1/rate seconds
+    assert elapsed >= 7 / rate * 0.9
+    hits = sorted(_Stub.hits)
+    assert hits[-1] - hits[0] >= 7 / rate * 0.9
+
+
+def test_rate_limiter_allows_a_burst():
+    limiter = RateLimiter(10.0, burst=5)
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - start < 0.1
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.1 * 0.9
@@ -0,0 +1,133 @@
+"""IndicatorState against the batch indicators it streams."""
+
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicator_state import IndicatorState
+
+app = pytest.importorskip('app')
+
+MA_TYPES = ('EMA', 'SMA', 'RMA', 'NONE')
+
+
+def bars(seed, n=110):
+    rng = np.random.default_rng(seed)
+    close = 50 + np.cumsum(rng.normal(0, 1, n))
+    opens = close + rng.normal(0, 0.6, n)
+    df = pd.DataFrame({'Open': opens, 'High': np.maximum(opens, close) + rng.random(n),
+                       'Low': np.minimum(opens, close) - rng.random(n), 'Close': close},
+                      index=pd.date_range('2024-01-01', periods=n, freq='D'))
+    df.iloc[17, 1] = np.nan
+    df.iloc[40, 3] = np.inf
+    return df
+
+
+def assert_same(state, df, params):
+    candles, signal, buy_idx, sell_idx, pivots = state.candle_arrays()
+    e_candles, e_signal, e_buy, e_sell, e_pivots = app.linreg_arrays(
+        df, params['signal_length'], params['sma_signal'], True, params['linreg_length'])
+    assert len(candles) == len(e_candles)
+    for name in ('open', 'high', 'low', 'close'):
+        # Both sides are rounded to 4 places, so allow one step for ties
+        np.testing.assert_allclose(candles[name], e_candles[name], rtol=0, atol=1.0001e-4)
+    np.testing.assert_array_equal(candles['green'], e_candles['green'])
+    np.testing.assert_allclose(signal, e_signal, rtol=1e-10, atol=1e-10, equal_nan=True)
+    assert (buy_idx, sell_idx, pivots) == (e_buy, e_sell, e_pivots)
+
+    main, sig, length = state.tmo()
+    e_main, e_sig, e_length = app.calculate_tmo(
+        df, params['tmo_length'], params['tmo_calc'], params['tmo_smooth'],
+        calc_type=params['tmo_calc_type'], smooth_type=params['tmo_smooth_type'])
+    np.testing.assert_allclose(main, e_main, rtol=1e-10, atol=1e-10, equal_nan=True)
+    np.testing.assert_allclose(sig, e_sig, rtol=1e-10, atol=1e-10, equal_nan=True)
+    assert length == e_length
+    assert state.count == len(df) and state.last_index == df.index[-1]
+
+
+@pytest.mark.parametrize('calc_type,smooth_type', list(itertools.product(MA_TYPES, MA_TYPES)))
+@pytest.mark.parametrize('sma_signal', (True, False))
+def test_updates_match_batch(calc_type, smooth_type, sma_signal):
+    params = {'signal_length': 5, 'sma_signal': sma_signal, 'linreg_length': 11,
+              'tmo_length': 14, 'tmo_calc': 5, 'tmo_smooth': 3,
+              'tmo_calc_type': calc_type, 'tmo_smooth_type': smooth_type}
+    df = bars(MA_TYPES.index(calc_type) * 10 + MA_TYPES.index(smooth_type))
+
+    state = IndicatorState.from_frame(df.iloc[:80], **params)
+    assert_same(state, df.iloc[:80], params)
+
+    # Revise the newest bar straight after from_frame()
+    revised = df.iloc[:80].copy()
+    revised.iloc[-1] = revised.iloc[-1] * 1.03
+    state.replace_last(revised.iloc[-1])
+    assert_same(state, revised, params)
+
+    live = revised
+    for i in range(80, len(df)):
+        state.update(df.iloc[i])
+        live = pd.concat([live, df.iloc[i:i + 1]])
+        assert_same(state, live, params)
+
+    # An intraday bar revised twice: each revision replaces, never appends
+    for factor in (0.97, 1.05):
+        changed = live.copy()
+        changed.iloc[-1] = live.iloc[-1] * factor
+        state.replace_last(changed.iloc[-1])
+        assert_same(state, changed, params)
+
+
+def test_replace_last_needs_a_bar():
+    with pytest.raises(ValueError):
+        IndicatorState().replace_last({'Open': 1.0, 'High': 1.0, 'Low': 1.0, 'Close': 1.0})
+
+
+def test_symbol_pool_pins_symbols():
+    pool = app.SymbolPool(3)
+    try:
+        assert all(pool.shard(sym) is pool.shard(sym) for sym in ('AAPL', 'MSFT', 'RELIANCE.NS'))
+        assert len({id(pool.shard(f"S{i}")) for i in range(60)}) == 3
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.parametrize('n', (0, 1, 4, 9, 30, 110))
+def test_from_frame_matches_replay(n):
+    params = {'signal_length': 5, 'sma_signal': False, 'linreg_length': 11, 'tmo_length': 14,
+              'tmo_calc': 5, 'tmo_smooth': 3, 'tmo_calc_type': 'RMA', 'tmo_smooth_type': 'SMA'}
+    df = bars(7)
+    bulk = IndicatorState.from_frame(df.iloc[:n], **params)
+    replay = IndicatorState(**params)
+    for i in range(n):
+        replay.update(df.iloc[i])
+    # Carry on past the seeded bars: the moving averages must resume from the same place
+    for i in range(n, len(df)):
+        bulk.update(df.iloc[i])
+        replay.update(df.iloc[i])
+    for got, want in zip(bulk.candle_arrays() + bulk.tmo(), replay.candle_arrays() + replay.tmo()):
+        if isinstance(got, np.ndarray) and got.dtype.names:
+            for name in got.dtype.names:
+                np.testing.assert_allclose(got[name], want[name], rtol=0, atol=1.0001e-4)
+        elif isinstance(got, np.ndarray):
+            np.testing.assert_allclose(got, want, rtol=1e-10, atol=1e-10, equal_nan=True)
+        else:
+            assert got == want
+
+
+def test_indicator_state_updates_are_serialized():
+    params = ({'signal_length': 5, 'sma_signal': True, 'linreg_length': 11},
+              {'length': 14, 'calc_length': 5, 'smooth_length': 3, 'calc_type': 'EMA', 'smooth_type': 'EMA'})
+    df = bars(3)
+    revisions = [df.copy() for _ in range(24)]
+    for k, frame in enumerate(revisions):
+        frame.iloc[-1] = df.iloc[-1] * (1 + k / 100)
+    app._indicator_state('LOCKTEST', df, *params)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda frame: app._indicator_state('LOCKTEST', frame, *params), revisions))
+    # Every caller sees its own revision of the last bar, never another thread's
+    for frame, ((candles, *_), (main, sig, _)) in zip(revisions, results):
+        e_main, _, _ = app.calculate_tmo(frame)
+        np.testing.assert_allclose(main, e_main, rtol=1e-10, atol=1e-10, equal_nan=True)
+        assert len(candles) == 60
@@ -0,0 +1,67 @@
+"""iter_scan concurrency limits with hung fetches."""
+
+import threading
+import time
+
+import pytest
+
+app = pytest.importorskip('app')
+
+
+@pytest.fixture
+def thread_pools(monkeypatch):
+    app._shutdown_scan_pools()
+    monkeypatch.setattr(app, 'SCAN_CPU_WORKERS', 0)
+    yield
+    app._shutdown_scan_pools()
+
+
+def _analyze(symbol, df, earnings_date, **kwargs):
+    return {'success': True, 'ticker': symbol, 'signal': df}
+
+
+def _fake_fetch(monkeypatch, release, hang=()):
+    lock = threading.Lock()
+    stats = {'active': 0, 'peak': 0}
+
+    def fetch(symbol, kwargs):
+        with lock:
+            stats['active'] += 1
+            stats['peak'] = max(stats['peak'], stats['active'])
+        try:
+            if symbol in hang:
+                release.wait(10)
+            return symbol.lower(), None
+        finally:
+            with lock:
+                stats['active'] -= 1
+
+    monkeypatch.setattr(app, '_fetch_ticker', fetch)
+    return stats
+
+
+def test_timed_out_fetches_keep_their_slot(monkeypatch, thread_pools):
+    release = threading.Event()
+    stats = _fake_fetch(monkeypatch, release, hang={'H1', 'H2'})
+    threading.Timer(0.45, release.set).start()
+
+    results = list(app.iter_scan(['H1', 'H2', 'A', 'B', 'C'], ordered=True, ticker_timeout=0.3,
+                                 max_in_flight=2, analyzer=_analyze))
+
+    assert [r['ticker'] for r in results] == ['H1', 'H2', 'A', 'B', 'C']
+    assert [r.get('error') for r in results[:2]] == ['Timed out', 'Timed out']
+    assert [r['signal'] for r in results[2:]] == ['a', 'b', 'c']
+    assert stats['peak'] <= 2
+
+
+def test_gives_up_when_hung_work_never_ends(monkeypatch, thread_pools):
+    release = threading.Event()
+    _fake_fetch(monkeypatch, release, hang={'H1'})
+    try:
+        started = time.monotonic()
+        results = list(app.iter_scan(['H1', 'A', 'B'], ticker_timeout=0.2, max_in_flight=1, analyzer=_analyze))
+        assert time.monotonic() - started < 2
+        assert sorted(r['ticker'] for r in results) == ['A', 'B', 'H1']
+        assert all(r.get('error') == 'Timed out' for r in results)
+    finally:
+        release.set()
@@ -0,0 +1,92 @@
+"""Vectorized LinReg against the per-window np.polyfit loop it replaced."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from linreg_signals import _rolling_linreg, _safe_linreg
+
+LENGTHS = range(1, 21)
+
+
+def polyfit_linreg(series, length):
+    """The original _safe_linreg: one np.polyfit per trailing window."""
+    s = pd.Series(series).replace([np.inf, -np.inf], np.nan)
+    result = np.full(len(s), np.nan)
+    for i in range(len(s)):
+        start = max(0, i - length + 1)
+        window = s.iloc[start:i + 1].dropna()
+        if len(window) < 2:
+            result[i] = s.iloc[i] if not pd.isna(s.iloc[i]) else np.nan
+            continue
+        x = np.arange(len(window))
+        y = window.values
+        try:
+            slope, intercept = np.polyfit(x, y, 1)
+            result[i] = slope * (len(window) - 1) + intercept
+        except np.linalg.LinAlgError:
+            result[i] = y[-1]
+    return pd.Series(result, index=s.index)
+
+
+def gappy(rng, n, scale=100.0):
+    """A random walk with NaN, +inf and -inf holes, including runs of them."""
+    values = scale + np.cumsum(rng.normal(0, 1, n))
+    holes = rng.random(n)
+    values[holes < 0.08] = np.nan
+    values[(holes >= 0.08) & (holes < 0.11)] = np.inf
+    values[(holes >= 0.11) & (holes < 0.13)] = -np.inf
+    if n > 12:
+        start = rng.integers(0, n - 6)
+        values[start:start + rng.integers(2, 6)] = np.nan
+    return values
+
+
+def assert_matches(actual, expected):
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    np.testing.assert_allclose(actual, expected, rtol=1e-13, atol=1e-10, equal_nan=True)
+
+
+@pytest.mark.parametrize('length', LENGTHS)
+def test_safe_linreg_matches_polyfit(length):
+    rng = np.random.default_rng(length)
+    for n in (0, 1, 2, 3, length, length + 1, 90):
+        values = gappy(rng, n)
+        actual = _safe_linreg(values, length)
+        assert isinstance(actual, pd.Series) and len(actual) == n
+        assert_matches(actual.values, polyfit_linreg(values, length).values)
+
+
+@pytest.mark.parametrize('length', LENGTHS)
+def test_rolling_linreg_columns_match_polyfit(length):
+    rng = np.random.default_rng(100 + length)
+    a = np.column_stack([gappy(rng, 120, scale) for scale in (10.0, 100.0, 1000.0, 5.0)])
+    actual = _rolling_linreg(a, length)
+    assert actual.shape == a.shape
+    for j in range(a.shape[1]):
+        assert_matches(actual[:, j], polyfit_linreg(a[:, j], length).values)
+
+
+def test_rolling_linreg_leaves_input_alone():
+    a = np.array([1.0, np.inf, 3.0, np.nan, 5.0])
+    _rolling_linreg(a, 3)
+    assert np.isinf(a[1]) and np.isnan(a[3])
+
+
+@pytest.mark.parametrize('length', (1, 2, 5, 11, 20))
+def test_linreg_candles_match_polyfit(length):
+    app = pytest.importorskip('app')
+    rng = np.random.default_rng(200 + length)
+    df = pd.DataFrame({name: gappy(rng, 150) for name in ('Open', 'High', 'Low', 'Close')})
+    candles, signal, _, _, _ = app.linreg_candles(df, signal_length=5, linreg_length=length)
+
+    ref = {name: polyfit_linreg(df[name].values, length).values for name in df.columns}
+    assert len(candles) == 60
+    for key, name in (('open', 'Open'), ('high', 'High'), ('low', 'Low'), ('close', 'Close')):
+        expected = np.where(np.isnan(ref[name]), 0.0, np.round(ref[name], 4))[-60:]
+        # Both sides are rounded to 4 places, so allow one step for ties
+        np.testing.assert_allclose([c[key] for c in candles], expected, rtol=0, atol=1.0001e-4)
+    green = (ref['Open'] < ref['Close'])[-60:]
+    assert [c['color'] for c in candles] == [app.GREEN if g else app.WHITE for g in green]
+    expected_signal = pd.Series(ref['Close']).rolling(5, min_periods=1).mean().values[-60:]
+    np.testing.assert_allclose(signal, expected_signal, rtol=1e-12, atol=1e-10, equal_nan=True)
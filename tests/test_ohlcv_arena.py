@@ -0,0 +1,78 @@
+"""OHLCVArena round trip, matches() and worker-side mapping lifetime."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ohlcv_arena
+from ohlcv_arena import COLUMNS, OHLCVArena, with_frame
+
+
+def _frame(seed, n, unit='ns', tz=None):
+    rng = np.random.default_rng(seed)
+    stamps = (np.datetime64('2024-01-02') + np.arange(n)).astype(f'M8[{unit}]')
+    index = pd.DatetimeIndex(stamps)
+    if tz:
+        index = index.tz_localize(tz)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({'Volume': 1.0, 'Close': close, 'Open': close + 0.5, 'High': close + 1, 'Low': close - 1},
+                        index=index)
+
+
+@pytest.fixture
+def frames():
+    out = {}
+    for i, unit in enumerate(('s', 'ms', 'us', 'ns')):
+        for j, tz in enumerate((None, 'America/New_York', 'Asia/Kolkata')):
+            out[f"{unit}-{tz}"] = _frame(i * 3 + j, 40 + i * 3 + j, unit, tz)
+    out['EMPTY'] = _frame(99, 0)
+    out['NOCLOSE'] = _frame(98, 10).drop(columns='Close')
+    out['NOINDEX'] = _frame(97, 10).reset_index(drop=True)
+    out['NONE'] = None
+    return out
+
+
+def test_round_trip_and_matches(frames):
+    with OHLCVArena(frames) as arena:
+        assert len(arena) == 12
+        for key in ('EMPTY', 'NOCLOSE', 'NOINDEX', 'NONE'):
+            assert key not in arena and not arena.matches(key, frames[key])
+        for key, df in frames.items():
+            if key not in arena:
+                continue
+            assert arena.matches(key, df)
+            assert not arena.matches(key, df.iloc[:-1])
+            shifted = df.copy()
+            shifted.index = shifted.index + pd.Timedelta(days=1)
+            assert not arena.matches(key, shifted)
+
+            got = with_frame(arena.handle(key), lambda view: view.copy())
+            assert list(got.columns) == list(COLUMNS)
+            assert (got.index == df.index).all() and str(got.index.tz) == str(df.index.tz)
+            np.testing.assert_array_equal(got.values, df[list(COLUMNS)].values)
+
+
+def test_with_frame_maps_only_for_the_call(frames):
+    with OHLCVArena(frames) as arena:
+        handle = arena.handle('ns-None')
+
+        def check(view):
+            assert not view.values.flags.writeable
+            return float(view['Close'].iloc[-1])
+
+        assert with_frame(handle, check) == frames['ns-None']['Close'].iloc[-1]
+        assert ohlcv_arena._MAPPED == []
+
+        # A view that outlives the call keeps its mapping (and stays readable) until it is dropped
+        kept = with_frame(handle, lambda view: view['Close'].values)
+        assert len(ohlcv_arena._MAPPED) == 1
+        with_frame(handle, len)
+        assert len(ohlcv_arena._MAPPED) == 1
+        np.testing.assert_array_equal(kept, frames['ns-None']['Close'].values)
+        del kept
+        with_frame(handle, len)
+        assert ohlcv_arena._MAPPED == []
+
+    # Once the parent has closed the arena a worker cannot reach it
+    with pytest.raises(FileNotFoundError):
+        with_frame(handle, len)
@@ -0,0 +1,70 @@
+"""OrderTracker gives up on orders it cannot look up."""
+
+import datetime
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+alpaca_wrapper = pytest.importorskip('alpaca_wrapper')
+from alpaca.trading.enums import OrderStatus  # noqa: E402
+
+
+def _order(order_id, status=OrderStatus.NEW):
+    return SimpleNamespace(id=order_id, symbol='AAPL', status=status, qty='1', notional=None, filled_qty='0',
+                           filled_avg_price=None, submitted_at=datetime.datetime.now(datetime.timezone.utc))
+
+
+class FakeTrading:
+    def __init__(self):
+        self.broken = set()
+        self.orders = {}
+
+    def get_orders(self, req):
+        return []
+
+    def get_order_by_id(self, order_id):
+        if order_id in self.broken:
+            raise RuntimeError("order not found")
+        return self.orders[order_id]
+
+
+def test_failing_lookups_end_as_unknown():
+    client = FakeTrading()
+    done = []
+    tracker = alpaca_wrapper.OrderTracker(client, poll_interval=3600, on_done=done.append, max_failures=3)
+    good, bad = str(uuid.uuid4()), str(uuid.uuid4())
+    client.orders[good] = _order(good)
+    tracker.track(client.orders[good])
+    tracker.track(_order(bad))
+    client.broken.add(bad)
+
+    tracker.poll()
+    tracker.poll()
+    assert tracker.status(bad)['status'] == 'new' and not done
+    tracker.poll()
+    status = tracker.status(bad)
+    assert (status['status'], status['done'], status['symbol']) == ('unknown', True, 'AAPL')
+    assert 'not found' in status['error'] and done == [status]
+
+    # The healthy order is still polled; the dead one no longer is
+    client.orders[good] = _order(good, OrderStatus.FILLED)
+    tracker.poll()
+    assert tracker.status(good)['status'] == 'filled' and len(done) == 2
+    assert tracker.polls == 4
+    tracker.poll()
+    assert tracker.polls == 4
+
+
+def test_a_successful_lookup_resets_the_count():
+    client = FakeTrading()
+    tracker = alpaca_wrapper.OrderTracker(client, poll_interval=3600, max_failures=2)
+    oid = str(uuid.uuid4())
+    client.orders[oid] = _order(oid)
+    tracker.track(client.orders[oid])
+    for _ in range(3):
+        client.broken.add(oid)
+        tracker.poll()
+        client.broken.discard(oid)
+        tracker.poll()
+    assert tracker.status(oid)['status'] == 'new'
@@ -0,0 +1,62 @@
+"""Scan job table: running jobs stay reachable, finished ones age out."""
+
+import threading
+import time
+
+import pytest
+
+from scan_jobs import ScanJob
+
+app = pytest.importorskip('app')
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    from cache_utils import BoundedCache
+    table = BoundedCache(ttl=0.2, max_entries=3, max_bytes=1000, sweep_interval=0,
+                         sizeof=lambda job: job.nbytes, on_evict=app._evict_job)
+    monkeypatch.setattr(app, 'SCAN_JOBS', table)
+    return table
+
+
+def _start(table, items, gate=None):
+    def run():
+        for item in items:
+            if gate is not None:
+                gate.wait(5)
+            yield item
+    job = ScanJob(run, on_done=app._finish_job, on_result=app._track_job)
+    table.set(job.id, job, ttl=float('inf'))
+    return job.start()
+
+
+def test_running_job_outlives_the_ttl(jobs):
+    gate = threading.Event()
+    job = _start(jobs, ['x' * 10] * 3, gate)
+    time.sleep(0.3)
+    assert jobs.get(job.id) is job
+    gate.set()
+    job.join(5)
+    assert job.done and jobs.get(job.id) is job and job.nbytes == 30
+    time.sleep(0.3)
+    assert jobs.get(job.id) is None
+
+
+def test_byte_budget_evicts_finished_before_running(jobs):
+    finished = _start(jobs, ['f' * 500])
+    finished.join(5)
+    gate = threading.Event()
+    running = _start(jobs, ['r' * 300] * 2, gate)
+    gate.set()
+    running.join(5)
+    assert jobs.get(finished.id) is None
+    assert jobs.get(running.id) is running and len(running.results) == 2
+
+
+def test_job_over_the_budget_is_cancelled(jobs):
+    gate = threading.Event()
+    job = _start(jobs, ['y' * 600] * 5, gate)
+    gate.set()
+    job.join(5)
+    assert job.done and len(job.results) == 2
+    assert jobs.get(job.id) is None
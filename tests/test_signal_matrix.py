@@ -0,0 +1,100 @@
+"""Matrix scan and last-bar rules against the per-ticker loop."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from linreg_signals import _rolling_linreg
+
+app = pytest.importorskip('app')
+
+
+def loop_last_signal(df, lin_reg=True, linreg_length=11):
+    """BUY/SELL of the last bar as the original linreg_candles loop decided it."""
+    o, h, c = df['Open'].values, df['High'].values, df['Close'].values
+    if lin_reg:
+        bopen, bhigh, bclose = _rolling_linreg(np.column_stack([o, h, c]), linreg_length).T
+    else:
+        bopen, bhigh, bclose = o, h, c
+    r = bopen < bclose
+    buy = sell = False
+    i = len(r) - 1
+    if i >= 5:
+        last_five_red = not r[i-1] and not r[i-2] and not r[i-3] and not r[i-4] and not r[i-5]
+        last_three_green = r[i-1] and r[i-2] and r[i-3]
+        buy = bool(r[i] and not r[i-1] and c[i] > bhigh[i-1] and last_five_red)
+        sell = bool(not r[i] and r[i-1] and c[i] < bclose[i-1] and last_three_green)
+    return buy, sell
+
+
+def universe(seed, count=600):
+    """Ragged histories of trending/reversing walks, some with NaN bars."""
+    rng = np.random.default_rng(seed)
+    frames = {}
+    for k in range(count):
+        n = int(rng.integers(20, 160))
+        drift = np.where(np.arange(n) < n - rng.integers(1, 8), -0.4, 0.6) * rng.choice([1, -1])
+        close = 100 + np.cumsum(drift + rng.normal(0, 0.7, n))
+        opens = close - drift + rng.normal(0, 0.3, n)
+        df = pd.DataFrame({'Open': opens, 'High': np.maximum(opens, close) + rng.random(n),
+                           'Low': np.minimum(opens, close) - rng.random(n), 'Close': close,
+                           'Volume': rng.integers(1, 10**6, n).astype(float)})
+        if k % 7 == 0:
+            df.iloc[rng.integers(0, n, 3), rng.integers(0, 4)] = np.nan
+        frames[f"S{k:04d}"] = df
+    return frames
+
+
+@pytest.mark.parametrize('linreg_length', (2, 5, 11, 20))
+def test_signal_matrix_matches_per_ticker(linreg_length):
+    frames = universe(linreg_length)
+    buy, sell = app.signal_matrix(frames, linreg_length=linreg_length, min_bars=30)
+
+    e_buy, e_sell = [], []
+    for sym, df in frames.items():
+        if len(df) < 30:
+            continue
+        _, _, buy_idx, sell_idx, _ = app.linreg_arrays(df, 5, True, True, linreg_length)
+        assert (bool(buy_idx), bool(sell_idx)) == loop_last_signal(df, linreg_length=linreg_length)
+        assert app.linreg_last_signal(df, linreg_length=linreg_length)[:2] == (bool(buy_idx), bool(sell_idx))
+        if buy_idx:
+            e_buy.append(sym)
+        if sell_idx:
+            e_sell.append(sym)
+    assert e_buy and e_sell, "universe should produce both signals"
+    assert buy == e_buy and sell == e_sell
+
+
+def test_signal_matrix_without_linreg():
+    frames = universe(3, count=300)
+    buy, sell = app.signal_matrix(frames, lin_reg=False)
+    expected = {sym: loop_last_signal(df, lin_reg=False) for sym, df in frames.items() if len(df) >= 30}
+    assert buy == [s for s, (b, _) in expected.items() if b]
+    assert sell == [s for s, (_, s_) in expected.items() if s_]
+
+
+def test_signal_matrix_skips_short_and_missing():
+    frames = universe(4, count=20)
+    frames['SHORT'] = frames['S0000'].iloc[:10]
+    frames['NONE'] = None
+    buy, sell = app.signal_matrix(frames)
+    assert 'SHORT' not in buy + sell and 'NONE' not in buy + sell
+    assert app.signal_matrix({}) == ([], [])
+
+
+@pytest.mark.parametrize('linreg_length', (5, 11))
+def test_signals_only_matches_full_analysis(linreg_length):
+    frames = universe(20 + linreg_length, count=300)
+    kwargs = {'linreg_length': linreg_length, 'lazy_charts': True}
+    app.INDICATOR_STATES.clear()
+    hits = 0
+    for sym, df in frames.items():
+        full = app._analyze_frame(sym, df, None, **kwargs)
+        fast = app._analyze_frame(sym, df, None, signals_only=True, **kwargs)
+        assert (fast['success'], fast['signal'], fast['price']) == (full['success'], full['signal'], full['price'])
+        if len(df) < 30:
+            continue
+        buy, sell, price, _ = app._signal_phase(sym, df, {**kwargs, 'signals_only': True})
+        assert (buy, sell, price) == app._signal_phase(sym, df, kwargs)[:3]
+        hits += buy or sell
+    assert hits > 0
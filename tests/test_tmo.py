@@ -0,0 +1,89 @@
+"""Vectorized TMO against the per-bar loop it replaced."""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import calculate_tmo, calculate_tmo_batch
+
+MA_TYPES = ('EMA', 'SMA')
+
+
+def loop_ma(series, length, ma_type='EMA'):
+    if ma_type == 'EMA':
+        return series.ewm(span=length, adjust=False).mean()
+    if ma_type == 'SMA':
+        return series.rolling(length, min_periods=1).mean()
+    if ma_type == 'RMA':
+        return series.ewm(alpha=1/length, adjust=False).mean()
+    return series
+
+
+def loop_tmo(df, length=14, calc_length=5, smooth_length=3,
+             length_type='EMA', calc_type='EMA', smooth_type='EMA'):
+    """The original calculate_tmo: every close against each open in its window."""
+    o = df['Open'].values
+    c = df['Close'].values
+    n = len(c)
+    data = np.zeros(n)
+
+    for i in range(n):
+        start = max(0, i - length + 1)
+        window_o = o[start:i+1]
+        window_c = c[i]
+        s = 0
+        for open_price in window_o:
+            if window_c > open_price:   s += 1
+            elif window_c < open_price: s -= 1
+        data[i] = s
+
+    data_series = pd.Series(data, index=df.index)
+    MA = loop_ma(data_series, calc_length, calc_type)
+    Main = loop_ma(MA, smooth_length, smooth_type)
+    Signal = loop_ma(Main, smooth_length, smooth_type)
+
+    return Main.values[-60:], Signal.values[-60:], length
+
+
+def bars(rng, n):
+    close = 40 + np.cumsum(rng.normal(0, 1, n))
+    df = pd.DataFrame({'Open': close + rng.normal(0, 0.8, n), 'Close': close})
+    df.iloc[rng.integers(0, n, max(n // 15, 1)), 0] = np.nan
+    # Flat bars: close equal to an open counts as neither above nor below
+    df.iloc[n // 2, 1] = df.iloc[n // 2, 0]
+    return df
+
+
+@pytest.mark.parametrize('calc_type,smooth_type', list(itertools.product(MA_TYPES, MA_TYPES)))
+@pytest.mark.parametrize('length', (1, 5, 14))
+def test_calculate_tmo_matches_loop(calc_type, smooth_type, length):
+    rng = np.random.default_rng(length)
+    for n in (3, 30, 150):
+        df = bars(rng, n)
+        main, signal, out_len = calculate_tmo(df, length, 5, 3, calc_type=calc_type, smooth_type=smooth_type)
+        e_main, e_signal, e_len = loop_tmo(df, length, 5, 3, calc_type=calc_type, smooth_type=smooth_type)
+        np.testing.assert_allclose(main, e_main, rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(signal, e_signal, rtol=1e-12, atol=1e-12)
+        assert out_len == e_len
+
+
+@pytest.mark.parametrize('calc_type,smooth_type', list(itertools.product(MA_TYPES, MA_TYPES)))
+def test_calculate_tmo_batch_matches_loop_per_ticker(calc_type, smooth_type):
+    rng = np.random.default_rng(7)
+    frames = [bars(rng, n) for n in (150, 90, 61, 45, 12)]
+    width = max(len(df) for df in frames)
+    opens = np.full((len(frames), width), np.nan)
+    closes = np.full((len(frames), width), np.nan)
+    for i, df in enumerate(frames):
+        opens[i, width - len(df):] = df['Open'].values
+        closes[i, width - len(df):] = df['Close'].values
+
+    main, signal, _ = calculate_tmo_batch(opens, closes, 14, 5, 3, calc_type=calc_type, smooth_type=smooth_type)
+    assert main.shape == signal.shape == (len(frames), 60)
+    for i, df in enumerate(frames):
+        e_main, e_signal, _ = loop_tmo(df, 14, 5, 3, calc_type=calc_type, smooth_type=smooth_type)
+        np.testing.assert_allclose(main[i, 60 - len(e_main):], e_main, rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(signal[i, 60 - len(e_signal):], e_signal, rtol=1e-12, atol=1e-12)
+        assert np.isnan(main[i, :60 - len(e_main)]).all()
@@ -0,0 +1,10 @@
+"""
+wsgi.py
+Production entry point: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from app import app, drain_scans
+
+application = app
+
+__all__ = ['app', 'application', 'drain_scans']